@@ -0,0 +1,379 @@
+import os
+import sys
+import time
+import logging
+import argparse
+import subprocess
+import datetime
+import resource
+import tempfile
+import importlib
+import traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s: %(message)s',
+)
+
+def sample_frame(rows):
+    '''Build a DataFrame shaped like a typical mapper output (strings, timestamps, flags, scores and nulls)'''
+    rng = np.random.default_rng(42)
+    now = datetime.datetime(2025, 1, 1)
+    seen = pd.Series(pd.to_datetime(now) - pd.to_timedelta(rng.integers(0, 86400 * 90, rows), unit='s'))
+    seen[rng.random(rows) < 0.1] = pd.NaT
+    return pd.DataFrame({
+        'id'            : [f"{i:032x}" for i in range(rows)],
+        'hostname'      : [f"host-{i % 5000}.example.com" for i in range(rows)],
+        'description'   : np.where(rng.random(rows) < 0.2, None, 'Lorem ipsum dolor sit amet, "consectetur" adipiscing elit\nsed do eiusmod'),
+        'severity'      : rng.choice(['low', 'medium', 'high', 'critical'], rows),
+        'last_seen'     : seen,
+        'has_patch'     : rng.random(rows) < 0.5,
+        'base_score'    : rng.random(rows) * 10,
+        'exploit_status': rng.integers(0, 100, rows),
+        'tenancy'       : 'benchmark',
+        'upload_timestamp' : pd.to_datetime(now),
+    })
+
+def benchmark_postgres(rows, methods):
+    from collector import UploadPostgress
+
+    uploader = UploadPostgress(None)
+    if not uploader.is_available():
+        logging.error("PostgreSQL is not configured - set POSTGRES_ENDPOINT, POSTGRES_DATABASE, POSTGRES_USERNAME and POSTGRES_PASSWORD")
+        return 1
+
+    df = sample_frame(rows)
+    schema = os.environ.get('POSTGRES_SCHEMA', 'public')
+    results = []
+    for method in methods:
+        table = f"benchmark_{method}"
+        os.environ['POSTGRES_LOAD_METHOD'] = method
+        with uploader.engine.connect() as conn:
+            conn.execute(text(f'DROP TABLE IF EXISTS "{schema}"."{table}"'))
+            conn.commit()
+
+        start = time.perf_counter()
+        uploader.upload_data(table, df)
+        elapsed = time.perf_counter() - start
+
+        with uploader.engine.connect() as conn:
+            loaded = conn.execute(text(f'SELECT COUNT(*) FROM "{schema}"."{table}"')).scalar()
+            conn.execute(text(f'DROP TABLE IF EXISTS "{schema}"."{table}"'))
+            conn.commit()
+        results.append((method, loaded, elapsed))
+
+    uploader.close()
+
+    logging.info("------------------------------------------")
+    for method, loaded, elapsed in results:
+        logging.info(f"{method:<10} - {loaded} rows in {elapsed:.2f}s ({loaded / elapsed:,.0f} rows/sec)")
+    return 0
+
+def benchmark_duckdb(rows, methods):
+    import duckdb
+    from collector import UploadDuckDB, DuckDBWriter
+
+    if not os.environ.get('DUCKDB_FILE'):
+        logging.error("DuckDB is not configured - set DUCKDB_FILE")
+        return 1
+
+    df = sample_frame(rows)
+    schema = os.environ.get('DUCKDB_SCHEMA', 'source')
+    results = []
+    for method in methods:
+        table = f"benchmark_{method}"
+        os.environ['DUCKDB_LOAD_METHOD'] = method
+        uploader = UploadDuckDB(None)
+
+        start = time.perf_counter()
+        uploader.upload_data(table, df)
+        elapsed = time.perf_counter() - start
+        uploader.close()
+        DuckDBWriter.shutdown()
+
+        with duckdb.connect(os.environ['DUCKDB_FILE']) as conn:
+            loaded = conn.execute(f'SELECT COUNT(*) FROM "{schema}"."{table}"').fetchone()[0]
+            conn.execute(f'DROP TABLE IF EXISTS "{schema}"."{table}"')
+        results.append((method, loaded, elapsed))
+
+    logging.info("------------------------------------------")
+    for method, loaded, elapsed in results:
+        logging.info(f"{method:<10} - {loaded} rows in {elapsed:.2f}s ({loaded / elapsed:,.0f} rows/sec)")
+    return 0
+
+def sample_okta_users(rows):
+    '''Build Okta Users API records, with some optional profile fields left out'''
+    rng = np.random.default_rng(42)
+    users = []
+    for i in range(rows):
+        profile = {
+            'login'         : f"user{i}@example.com",
+            'firstName'     : f"First{i}",
+            'lastName'      : f"Last{i}",
+            'email'         : f"user{i}@example.com",
+            'title'         : ['Engineer', 'Analyst', 'Manager'][i % 3],
+            'department'    : ['IT', 'Finance', 'Sales'][i % 4 % 3],
+            'countryCode'   : 'AU',
+        }
+        if rng.random() < 0.5:
+            profile.update({'displayName': f"First{i} Last{i}", 'mobilePhone': '+61 400 000 000', 'employeeNumber': str(i), 'costCenter': 'CC01'})
+        users.append({
+            'id'            : f"00u{i:017x}",
+            'status'        : 'ACTIVE',
+            'created'       : '2024-01-01T00:00:00.000Z',
+            'activated'     : '2024-01-02T00:00:00.000Z',
+            'statusChanged' : '2024-01-02T00:00:00.000Z',
+            'lastLogin'     : '2025-01-01T08:30:00.000Z' if rng.random() < 0.9 else None,
+            'lastUpdated'   : '2024-06-01T00:00:00.000Z',
+            'passwordChanged' : '2024-03-01T00:00:00.000Z',
+            'type'          : {'id': 'oty000000000000000'},
+            'profile'       : profile,
+        })
+    return users
+
+# -- Okta user attribute -> key in the Users API records, as mapped before the USERS spec
+LEGACY_OKTA_USER = {'id': 'id', 'status': 'status', 'created': 'created', 'activated': 'activated', 'status_changed': 'statusChanged',
+    'last_login': 'lastLogin', 'last_updated': 'lastUpdated', 'password_changed': 'passwordChanged'}
+LEGACY_OKTA_PROFILE = {'login': 'login', 'first_name': 'firstName', 'last_name': 'lastName', 'nick_name': 'nickName', 'display_name': 'displayName',
+    'email': 'email', 'secondEmail': 'secondEmail', 'profile_url': 'profileUrl', 'preferred_language': 'preferredLanguage', 'user_type': 'userType',
+    'organization': 'organization', 'title': 'title', 'division': 'division', 'department': 'department', 'cost_center': 'costCenter',
+    'employee_number': 'employeeNumber', 'mobile_phone': 'mobilePhone', 'primary_phone': 'primaryPhone', 'street_address': 'streetAddress',
+    'city': 'city', 'state': 'state', 'zip_code': 'zipCode', 'country_code': 'countryCode'}
+
+def legacy_okta_user(data):
+    '''The previous mapping of an Okta user - an object (and two classes) per user, read back with getattr'''
+    class UserObject:
+        def __init__(self, data):
+            for attr, key in LEGACY_OKTA_USER.items():
+                setattr(self, attr, data.get(key))
+            self.type = type('obj', (object,), {'id': data.get('type', {}).get('id')})() if data.get('type') else None
+            profile_data = data.get('profile', {})
+            self.profile = type('obj', (object,), {attr: profile_data.get(key) for attr, key in LEGACY_OKTA_PROFILE.items()})() if data.get('profile') else None
+
+    user = UserObject(data)
+    record = {attr: getattr(user, attr, None) for attr in LEGACY_OKTA_USER}
+    record['type_id'] = getattr(getattr(user, 'type', None), 'id', None)
+    for attr in LEGACY_OKTA_PROFILE:
+        record['profile_url' if attr == 'profile_url' else f"profile_{attr}"] = getattr(getattr(user, 'profile', None), attr, None)
+    return record
+
+def benchmark_okta_users(rows):
+    from mapping import Mapper
+    from source.okta_extract import USERS
+
+    users = sample_okta_users(rows)
+    mapper = Mapper(USERS)
+
+    start = time.perf_counter()
+    legacy = pd.DataFrame([legacy_okta_user(u) for u in users])
+    legacy_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    df = mapper.frame(users)
+    seconds = time.perf_counter() - start
+
+    identical = legacy.equals(df)
+    logging.info("------------------------------------------")
+    logging.info(f"{'objects':<10} - {rows} users in {legacy_seconds:.2f}s ({rows / legacy_seconds:,.0f} users/sec)")
+    logging.info(f"{'spec':<10} - {rows} users in {seconds:.2f}s ({rows / seconds:,.0f} users/sec), {legacy_seconds / seconds:.1f}x faster")
+    logging.info(f"Columns and values identical: {identical}")
+    return 0 if identical else 1
+
+def spill_segments():
+    '''Pages whose types disagree: a column that is all null and then text, int and then float, and one that only appears later'''
+    return [
+        pd.DataFrame({'id': ['a', 'b'], 'name': [None, None], 'score': [1, 2]}),
+        pd.DataFrame({'id': ['c', 'd'], 'name': ['x', 'y'], 'score': [1.5, None]}),
+        pd.DataFrame({'id': ['e', 'f'], 'name': [None, 'z'], 'score': [3, 4], 'extra': [True, False]}),
+    ]
+
+def check_spill():
+    '''Write the same pages with and without spilling every page to disk, and check the Parquet files and DuckDB tables match'''
+    from collector import Collector, SinkRegistry
+
+    folder = tempfile.mkdtemp(prefix='spill_')
+    os.environ['PARQUET_PATH'] = os.path.join(folder, '$TAG.parquet')
+    os.environ['DUCKDB_FILE'] = os.path.join(folder, 'spill.duckdb')
+    os.environ['COLLECTOR_WRITE_BEHIND'] = 'false'
+    for k in ('POSTGRES_ENDPOINT', 'BQ_PROJECT_ID', 'UPLOAD_TARGET'):
+        os.environ.pop(k, None)
+
+    C = Collector()
+    for tag, spill in (('spill_memory', False), ('spill_disk', True)):
+        for df in spill_segments():
+            C.store_df(tag, df)
+            if spill:
+                C.buffer(tag).spill()
+        C.write_df(tag)
+    C.cleanup()
+    SinkRegistry.close()
+    if C.write_errors:
+        logging.error(f"Write errors: {C.write_errors}")
+        return 1
+
+    import duckdb
+    with duckdb.connect(os.environ['DUCKDB_FILE']) as con:
+        tables = {tag: con.execute(f'SELECT * FROM source.{tag} ORDER BY id').df() for tag in ('spill_memory', 'spill_disk')}
+    files = {tag: pd.read_parquet(os.path.join(folder, f"{tag}.parquet")) for tag in ('spill_memory', 'spill_disk')}
+
+    ok = True
+    for name, result in (('parquet', files), ('duckdb', tables)):
+        try:
+            pd.testing.assert_frame_equal(result['spill_memory'], result['spill_disk'])
+            logging.info(f"{name:<10} - spilled segments identical to the unspilled table")
+        except AssertionError as e:
+            logging.error(f"{name:<10} - spilled segments differ from the unspilled table\n{e}")
+            ok = False
+    return 0 if ok else 1
+
+def check_standalone(plugins):
+    '''Run plugins on their own (python source/<plugin>.py) and check their tables are in DuckDB when the process exits.
+    Without credentials a plugin writes its BLANK records, which is enough to check the writes finish'''
+    import duckdb
+
+    results = []
+    for plugin in plugins:
+        folder = tempfile.mkdtemp(prefix='standalone_')
+        env = {**os.environ, 'DUCKDB_FILE': os.path.join(folder, f"{plugin}.duckdb"), 'COLLECTOR_STATE_FILE': os.path.join(folder, 'state.json')}
+        for k in ('PARQUET_PATH', 'UPLOAD_TARGET', 'POSTGRES_ENDPOINT', 'BQ_PROJECT_ID'):
+            env.pop(k, None)
+        run = subprocess.run([sys.executable, os.path.join('source', f"{plugin}.py")], env=env, capture_output=True, text=True)
+        tables = []
+        if os.path.exists(env['DUCKDB_FILE']):
+            with duckdb.connect(env['DUCKDB_FILE'], read_only=True) as con:
+                tables = [t for (t,) in con.execute('SELECT table_name FROM information_schema.tables ORDER BY table_name').fetchall()]
+        ok = run.returncode == 0 and len(tables) > 0
+        if not ok:
+            logging.error(f"{plugin} exited with {run.returncode}\n{run.stderr[-2000:]}")
+        results.append((plugin, ok, run.returncode, tables))
+
+    logging.info("------------------------------------------")
+    for plugin, ok, code, tables in results:
+        logging.info(f"{plugin:<20} - {'OK' if ok else 'FAILED':<8} exit {code}, {len(tables)} tables: {', '.join(tables)}")
+    return 0 if all(ok for _, ok, _, _ in results) else 1
+
+def replay_plugin(plugin):
+    '''Run one plugin (in its own process) against the replay server.  Returns its rows, run time, peak memory and sink times'''
+    from collector import Collector, SinkRegistry
+    from http_client import HttpClient
+
+    start = time.perf_counter()
+    C = Collector(managed=True)
+    status = 'OK'
+    try:
+        getattr(importlib.import_module(f"source.{plugin}"), "Source")(C)
+        C.flush()
+        if C.write_errors:
+            status = 'WRITE_FAILED'
+    except Exception:
+        logging.error(f"{plugin} failed\n{traceback.format_exc()}")
+        status = 'FAILED'
+    finally:
+        C.cleanup()
+        SinkRegistry.close()
+        HttpClient.close()
+
+    sinks = {}
+    for timings in C.sink_timings.values():
+        for sink, seconds in timings.items():
+            sinks[sink] = sinks.get(sink, 0.0) + seconds
+    return {
+        'plugin'    : plugin,
+        'status'    : status,
+        'rows'      : sum(C.row_count.values()),
+        'seconds'   : time.perf_counter() - start,
+        'peak_mb'   : resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'sinks'     : sinks,
+    }
+
+# -- plugins whose requests go through their vendor SDK's own session instead of HttpClient, so they are never recorded
+SDK_PLUGINS = ('crowdstrike', 'tenable_extract')
+
+def benchmark_replay(fixtures, plugins, latency, jitter, rate_limit_every, page_size=0):
+    from replay import ReplayServer
+
+    sdk = [p for p in plugins if p in SDK_PLUGINS]
+    if sdk:
+        logging.error(f"{', '.join(sdk)} call their vendor SDK, whose requests are not recorded - they can't be replayed")
+        return 1
+
+    if not os.path.isdir(fixtures):
+        logging.error(f"Fixture directory {fixtures} not found - record one with COLLECTOR_HTTP_RECORD={fixtures}")
+        return 1
+
+    # -- the plugin settings (with dummy secrets) that go with the recording
+    load_dotenv(os.path.join(fixtures, '.env'))
+    if not any(k in os.environ for k in ('PARQUET_PATH', 'UPLOAD_TARGET', 'DUCKDB_FILE', 'POSTGRES_ENDPOINT', 'BQ_PROJECT_ID')):
+        os.environ['PARQUET_PATH'] = os.path.join(tempfile.mkdtemp(prefix='replay_'), '$TAG.parquet')
+        logging.info(f"No target configured - writing Parquet files to {os.path.dirname(os.environ['PARQUET_PATH'])}")
+
+    server = ReplayServer(fixtures, latency=latency, jitter=jitter, rate_limit_every=rate_limit_every, page_size=page_size).start()
+    os.environ['COLLECTOR_HTTP_REPLAY'] = server.url
+    os.environ.pop('COLLECTOR_HTTP_RECORD', None)
+
+    results = []
+    try:
+        for plugin in plugins:
+            # -- a fresh process per plugin, so the peak memory is the plugin's own
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+                results.append(pool.submit(replay_plugin, plugin).result())
+    finally:
+        server.stop()
+
+    logging.info("------------------------------------------")
+    for r in results:
+        logging.info(f"{r['plugin']:<20} - {r['status']:<12} {r['rows']:>10} rows {r['seconds']:>8.2f}s ({r['rows'] / r['seconds']:,.0f} rows/sec) peak {r['peak_mb']:,.0f} MB")
+        for sink, seconds in sorted(r['sinks'].items()):
+            logging.info(f"{'':<20}   {sink:<12} {seconds:>19.2f}s ({r['rows'] / seconds if seconds else 0:,.0f} rows/sec)")
+    logging.info(f"Replay server - {server.requests} requests, {server.rate_limited} rate limited, {server.misses} not recorded")
+    return 0 if all(r['status'] == 'OK' for r in results) and not server.misses else 1
+
+if __name__ == '__main__':
+    load_dotenv('../.env')
+
+    parser = argparse.ArgumentParser(description='Collector benchmarks')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    pg = sub.add_parser('postgres', help='Compare the PostgreSQL load methods (rows/sec)')
+    pg.add_argument('--rows', type=int, default=100000)
+    pg.add_argument('--methods', default='insert,copy', help='comma separated list of POSTGRES_LOAD_METHOD values')
+
+    dd = sub.add_parser('duckdb', help='Compare the DuckDB load methods (rows/sec)')
+    dd.add_argument('--rows', type=int, default=100000)
+    dd.add_argument('--methods', default='insert,native', help='comma separated list of DUCKDB_LOAD_METHOD values')
+
+    ok = sub.add_parser('okta-users', help='Compare the Okta user mapping with the previous per-user objects (users/sec)')
+    ok.add_argument('--rows', type=int, default=100000)
+
+    st = sub.add_parser('standalone', help='Check that plugins run on their own leave their tables in DuckDB')
+    st.add_argument('--plugins', required=True, help='comma separated list of plugins to run, e.g. azure_entra,knowbe4')
+
+    sub.add_parser('spill', help='Check that spilled segments with mismatched types are written like an unspilled table')
+
+    rp = sub.add_parser('replay', help='Run plugins against recorded API responses (rows/sec, peak memory and time per sink)')
+    rp.add_argument('--fixtures', required=True, help='directory recorded with COLLECTOR_HTTP_RECORD')
+    rp.add_argument('--plugins', required=True, help='comma separated list of plugins to run, e.g. okta_extract,knowbe4')
+    rp.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    rp.add_argument('--jitter', type=float, default=0.0, help='random extra latency, up to this many seconds')
+    rp.add_argument('--rate-limit-every', type=int, default=0, help='answer every n-th request with a 429')
+    rp.add_argument('--page-size', type=int, default=0, help='serve the recorded pages again in pages of this many records')
+
+    args = parser.parse_args()
+    if args.command == 'postgres':
+        sys.exit(benchmark_postgres(args.rows, args.methods.split(',')))
+    if args.command == 'duckdb':
+        sys.exit(benchmark_duckdb(args.rows, args.methods.split(',')))
+    if args.command == 'okta-users':
+        sys.exit(benchmark_okta_users(args.rows))
+    if args.command == 'standalone':
+        sys.exit(check_standalone(args.plugins.split(',')))
+    if args.command == 'spill':
+        sys.exit(check_spill())
+    if args.command == 'replay':
+        sys.exit(benchmark_replay(args.fixtures, args.plugins.split(','), args.latency, args.jitter, args.rate_limit_every, args.page_size))
@@ -0,0 +1,125 @@
+import os
+import logging
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+class ChangeDetector:
+    """Finds the rows of a table that changed since the last run.
+
+    Every row gets a 64 bit hash of its values (upload_timestamp is left out, as it changes
+    on every run).  The hashes and keys of the rows that were written are kept in a Parquet
+    file per tenancy and table, and the next run compares against them:
+
+    * rows whose hash was seen last run are unchanged, and are not written again (the sinks
+      only move their upload_timestamp to this run's)
+    * rows with a new hash are new or changed, and are merged on the key
+    * keys that were seen last run but are now missing have disappeared from the source,
+      and are deleted (the tombstones)
+
+    The hashes are kept once per key, and the number of rows the run wrote (keys can repeat) is
+    kept in the file's metadata, to check the databases against.  The hash files are kept in
+    COLLECTOR_HASH_DIR (default collector_hashes).
+    """
+
+    def __init__(self, tag, keys, tenancy=None):
+        self.tag = tag
+        self.keys = [k for k in keys if k != 'tenancy']
+        self.tenancy = tenancy or os.environ.get('TENANCY', 'default')
+        self.path = os.path.join(os.environ.get('COLLECTOR_HASH_DIR', 'collector_hashes'), self.tenancy, f"{tag}.parquet")
+        self.hashes = []
+        self.stats = {}
+        # -- rows written by the last run, set by previous()
+        self.previous_rows = None
+
+    @staticmethod
+    def configured():
+        """Tables with change detection, from COLLECTOR_CHANGE_DETECTION - a comma separated list of table:key pairs
+        (use + to join the columns of a compound key)"""
+        tables = {}
+        for pair in os.environ.get('COLLECTOR_CHANGE_DETECTION', '').split(','):
+            if ':' in pair:
+                tag, keys = pair.split(':', 1)
+                tables[tag.strip()] = [k.strip() for k in keys.split('+') if k.strip()]
+        return tables
+
+    @staticmethod
+    def row_hash(df):
+        """Stable hash of each row, ignoring upload_timestamp"""
+        data = df[sorted(c for c in df.columns if c != 'upload_timestamp')]
+        try:
+            return pd.util.hash_pandas_object(data, index=False)
+        except TypeError:
+            # -- nested values (dicts, lists) can't be hashed, so hash their text instead
+            data = data.apply(lambda col: col.astype(str) if col.dtype == object else col)
+            return pd.util.hash_pandas_object(data, index=False)
+
+    def previous(self):
+        """The keys and hashes written by the last run, or None when there is no baseline yet"""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            table = pq.read_table(self.path)
+            # -- baselines saved before the row count was kept only have the hashes to go by
+            rows = (table.schema.metadata or {}).get(b'rows')
+            self.previous_rows = int(rows) if rows is not None else table.num_rows
+            return table.to_pandas()
+        except Exception as e:
+            logging.warning(f"{self.tag} - unable to read the row hashes from {self.path} ({e}) - loading the table in full")
+            return None
+
+    def changed(self, df, previous):
+        """The rows of a segment that are new or changed.  The hashes are kept for save()"""
+        hashes = self.row_hash(df)
+        self.hashes.append(pd.DataFrame({**{k: df[k].values for k in self.keys}, '_hash': hashes.values}))
+        if previous is None:
+            return df
+        return df[~hashes.isin(previous['_hash']).values]
+
+    def removed(self, previous):
+        """Keys from the last run that are missing from this run, with the tenancy, ready to be deleted"""
+        if previous is None or not self.hashes:
+            return pd.DataFrame()
+        current = pd.concat(self.hashes, ignore_index=True)[self.keys]
+        gone = previous[self.keys].merge(current.drop_duplicates(), on=self.keys, how='left', indicator=True)
+        gone = gone[gone['_merge'] == 'left_only'][self.keys]
+        gone.insert(0, 'tenancy', self.tenancy)
+        return gone.reset_index(drop=True)
+
+    def repeated(self):
+        """Number of this run's rows whose key is shared with another row"""
+        if not self.hashes:
+            return 0
+        return int(pd.concat(self.hashes, ignore_index=True)[self.keys].duplicated(keep=False).sum())
+
+    def report(self, total, changed, removed):
+        skipped = total - changed
+        self.stats = {
+            'rows'      : total,
+            'changed'   : changed,
+            'skipped'   : skipped,
+            'removed'   : removed,
+            'skipped_fraction' : round(skipped / total, 4) if total else 0.0,
+        }
+        logging.info(f"{self.tag} - change detection: {skipped} of {total} rows unchanged ({self.stats['skipped_fraction']:.1%}), {changed} new or changed, {removed} removed")
+        return self.stats
+
+    def reset(self):
+        """Drop the baseline (and this run's hashes), so the next run loads the table in full"""
+        self.hashes = []
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def save(self):
+        """Keep this run's hashes as the baseline for the next run.  Only called once every sink has the data"""
+        if not self.hashes:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        current = pd.concat(self.hashes, ignore_index=True)
+        rows = len(current)
+        current = current.drop_duplicates(subset=self.keys, keep='last')
+        table = pa.Table.from_pandas(current, preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), b'rows': str(rows).encode()})
+        tmp = f"{self.path}.tmp"
+        pq.write_table(table, tmp)
+        os.replace(tmp, self.path)
@@ -1,4 +1,5 @@
 import os
+import re
 import pandas as pd
 import importlib
 import datetime
@@ -13,8 +14,17 @@ import uuid
 import traceback
 import duckdb
 from alert import Alert
+from state import StateStore
+from scheduler import Scheduler
+from changes import ChangeDetector
+from http_client import HttpClient
+from mapping import Mapper
 import warnings
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import tempfile
+import threading
+import time
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
 
 # Suppress DuckDB engine warning about index reflection
 warnings.filterwarnings("ignore", message="duckdb-engine doesn't yet support reflection on indices")
@@ -24,22 +34,201 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s: %(message)s',
 )
 
+class TableBuffer:
+    """In-memory buffer for a single tag.
+
+    Each page handed to store_df is kept as its own chunk, and the chunks are
+    only joined once when the data is written.  This avoids re-copying the
+    whole table on every page of a large extraction.
+
+    When COLLECTOR_MEMORY_BUDGET_MB is set, the bytes buffered by every
+    TableBuffer in the process are tracked together.  Once the total goes over
+    the budget, the buffer that is growing is flushed to a temporary Parquet
+    segment on disk, and write_df streams the segments back one at a time.
+    """
+
+    _lock = threading.Lock()
+    _buffered = 0
+
+    def __init__(self, tag=None):
+        self.tag = tag
+        self.chunks = []
+        self.segments_on_disk = []
+        self.rows = 0
+        self.memory = 0
+
+    @staticmethod
+    def budget():
+        return int(float(os.environ.get('COLLECTOR_MEMORY_BUDGET_MB', 0) or 0) * 1048576)
+
+    @classmethod
+    def buffered(cls):
+        """Bytes currently held in memory by all buffers in this process"""
+        return cls._buffered
+
+    def _track(self, delta):
+        self.memory += delta
+        with TableBuffer._lock:
+            TableBuffer._buffered += delta
+
+    def append(self, df):
+        if df.empty:
+            return
+        self.chunks.append(df)
+        self.rows += len(df)
+        self._track(int(df.memory_usage(index=True, deep=True).sum()))
+
+        budget = self.budget()
+        if budget and TableBuffer.buffered() > budget:
+            self.spill()
+
+    def spill(self):
+        """Flush the in-memory chunks to a temporary segment file"""
+        if not self.chunks:
+            return
+        df = pd.concat(self.chunks, ignore_index=True) if len(self.chunks) > 1 else self.chunks[0]
+        fd, path = tempfile.mkstemp(prefix=f"{self.tag or 'buffer'}_", suffix='.segment', dir=os.environ.get('COLLECTOR_SPILL_DIR'))
+        os.close(fd)
+        try:
+            df.to_parquet(path, index=False)
+            fmt = 'parquet'
+        except Exception as e:
+            # -- columns holding mixed python objects can't always be mapped to Arrow
+            logging.debug(f"{self.tag} - segment can't be written as Parquet ({e}), using pickle")
+            df.to_pickle(path)
+            fmt = 'pickle'
+        self.segments_on_disk.append((path, fmt))
+        logging.info(f"{self.tag} - spilled {len(df)} rows ({self.memory / 1048576:.1f} MB) to {path}")
+        self.chunks = []
+        self._track(-self.memory)
+
+    def join(self):
+        """Join the in-memory chunks into one frame, so we only pay for the concat once"""
+        if len(self.chunks) > 1:
+            self.chunks = [pd.concat(self.chunks, ignore_index=True)]
+
+    def segments(self):
+        """Yield the buffered data as DataFrames, one segment at a time.  Once the buffer has spilled, every segment is
+        given the same columns and types (see schema), so the sinks see one table rather than segments that disagree"""
+        schema = self.schema() if self.spilled else None
+        for path, fmt in self.segments_on_disk:
+            df = pd.read_parquet(path) if fmt == 'parquet' else pd.read_pickle(path)
+            yield self.conform(df, schema)
+        if self.chunks:
+            self.join()
+            yield self.conform(self.chunks[0], schema)
+
+    def schema(self):
+        """The columns and types of the segments once joined, as a {column: dtype} dict.  A column that is e.g. int in one
+        segment and float in the next, or all null in one and text in the next, gets the type pandas gives it when the
+        segments are concatenated.  Only the segments' schemas are read, not their data"""
+        import pyarrow.parquet as pq
+
+        heads = []
+        for path, fmt in self.segments_on_disk:
+            if fmt == 'parquet':
+                heads.append(pq.read_schema(path).empty_table().to_pandas())
+            else:
+                heads.append(pd.read_pickle(path).head(0))
+        heads += [df.head(0) for df in self.chunks]
+        return pd.concat(heads).dtypes.to_dict() if heads else {}
+
+    def streamable(self):
+        """Whether a database can load the segments one at a time.  A new table takes its column types from the first
+        segment, so each column that has values in any segment must have them in the first one"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        try:
+            schemas = [pq.read_schema(path) if fmt == 'parquet' else pa.Schema.from_pandas(pd.read_pickle(path), preserve_index=False)
+                for path, fmt in self.segments_on_disk]
+            schemas += [pa.Schema.from_pandas(df, preserve_index=False) for df in self.chunks]
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            return False
+        if len(schemas) < 2:
+            return True
+        first = {f.name: f.type for f in schemas[0]}
+        typed = {f.name for schema in schemas[1:] for f in schema if not pa.types.is_null(f.type)}
+        return all(name in first and not pa.types.is_null(first[name]) for name in typed)
+
+    @staticmethod
+    def conform(df, schema):
+        if not schema:
+            return df
+        if list(df.columns) != list(schema):
+            df = df.reindex(columns=list(schema))
+        for column, dtype in schema.items():
+            if df[column].dtype != dtype:
+                df[column] = df[column].astype(dtype)
+        return df
+
+    def to_frame(self):
+        """Join all segments into a single DataFrame"""
+        frames = list(self.segments())
+        if not frames:
+            return pd.DataFrame()
+        if len(frames) == 1:
+            return frames[0]
+        return pd.concat(frames, ignore_index=True)
+
+    def clear(self):
+        for path, _ in self.segments_on_disk:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.segments_on_disk = []
+        self.chunks = []
+        self.rows = 0
+        self._track(-self.memory)
+
+    @property
+    def spilled(self):
+        return len(self.segments_on_disk) > 0
+
+    @property
+    def empty(self):
+        return self.rows == 0
+
+    def __len__(self):
+        return self.rows
+
 class Collector:
-    def __init__(self):
+    def __init__(self, managed=False):
         load_dotenv('../.env')
+        # -- run by run_plugin, which waits for the queued writes (see write_behind)
+        self.managed = managed
         self.name = None
         self.sync_time = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         self.collection_start = datetime.datetime.now()
         self.alert = Alert()
         self.df = {}
+        self._buffers = {}
         self.schema_created = {}
         self.row_count = {}
         self.write_errors: list[str] = []
+        self.sink_timings: dict[str, dict[str, float]] = {}
+        self.pending_writes = []
+        self._write_queue = None
+        self.modes = {}
+        self.indexes = {}
+        self.timestamps = {}
+        self.retention = {}
+        self.change_stats = {}
+        self._blank = set()
+        self.state = StateStore()
+        self._watermarks = {}
+        self._state_updates = {}
+        self._store_lock = threading.Lock()
         
-        # Initialize database uploaders
-        self.postgres_uploader = UploadPostgress(self)
-        self.duckdb_uploader = UploadDuckDB(self)
-        self.bigquery_uploader = UploadBigQuery(self)
+        # Database uploaders are shared by every collector in the process
+        uploaders = SinkRegistry.get()
+        self.postgres_uploader = uploaders['postgres']
+        self.duckdb_uploader = uploaders['duckdb']
+        self.bigquery_uploader = uploaders['bigquery']
+
+        # Pooled HTTP sessions for the source plugins, shared by every collector in the process
+        self.http = HttpClient.shared()
         
     '''Check if the environment variables are available'''
     def env(self,X):
@@ -65,25 +254,64 @@ class Collector:
         else:
             return False
     
-    # when setting 'index', the data is not deleted.  Any data record that matches the index is overwritten, and anything else is added
+    # when setting 'index' (see set_mode), the data is not deleted.  Any data record that matches the index is overwritten, and anything else is added
     # nothing gets deleted in this mode
 
     def store_df(self,tag,df):
+        """Buffer a page of a table until write_df.  Plugins may call this from several threads at once"""
         table_name = tag
 
-        if not tag in self.row_count:
-            self.row_count[tag] = 0
-        self.row_count[tag] += len(df)
-        logging.info(f"Storing dataframe {tag} - (total of {self.row_count[tag]} rows)")
+        # -- convert the timestamp columns (see set_timestamps) a whole column at a time
+        if tag in self.timestamps:
+            self.parse_timestamps(df, self.timestamps[tag])
 
         # -- add the fields required in every table
         df['tenancy'] = os.environ.get('TENANCY', 'default')
         df['upload_timestamp'] = pd.to_datetime(self.sync_time)
 
         # -- store the data in memory until we write it
-        if not tag in self.df:
-            self.df[tag] = pd.DataFrame()
-        self.df[tag] = pd.concat([self.df[tag],df],ignore_index=True)
+        with self._store_lock:
+            if not tag in self.row_count:
+                self.row_count[tag] = 0
+            self.row_count[tag] += len(df)
+            buf = self.buffer(tag)
+            buf.append(df)
+            logging.info(f"Storing dataframe {tag} - (total of {self.row_count[tag]} rows, {buf.memory / 1048576:.1f} MB buffered)")
+
+    def buffer(self,tag):
+        '''Return the TableBuffer for a tag, creating it when needed'''
+        buf = self.df.get(tag)
+        if not isinstance(buf, TableBuffer):
+            # -- plugins may reset a tag by assigning a DataFrame to self.df[tag].  The buffer it replaced still counts
+            #    towards the memory budget and may have segments on disk, so release it first
+            replaced = self._buffers.get(tag)
+            if replaced is not None:
+                replaced.clear()
+            seed = buf
+            buf = self._new_buffer(tag)
+            if isinstance(seed, pd.DataFrame):
+                buf.append(seed)
+        return buf
+
+    def _new_buffer(self,tag):
+        buf = self.df[tag] = self._buffers[tag] = TableBuffer(tag)
+        return buf
+
+    def reset(self,tag):
+        '''Drop the data buffered for a tag (e.g. when a plugin restarts its extraction), including any spilled segments'''
+        with self._store_lock:
+            buf = self.df.get(tag)
+            if isinstance(buf, TableBuffer):
+                buf.clear()
+            self._new_buffer(tag)
+            self.row_count[tag] = 0
+
+    def buffer_stats(self):
+        '''Row count and memory use (bytes) of the data currently buffered for each tag'''
+        return {
+            tag : { 'rows' : self.buffer(tag).rows, 'memory' : self.buffer(tag).memory, 'segments' : len(self.buffer(tag).segments_on_disk) }
+            for tag in list(self.df)
+        }
 
     def target_path(self,path,tag):
         VARS = {
@@ -101,90 +329,428 @@ class Collector:
     
     def write_blank(self,tag,record):
         if self.row_count.get(tag,0) == 0:
+            if self.mode(tag) != 'replace':
+                # -- nothing new, the rows from earlier runs are kept as they are
+                logging.info(f"{tag} - No new records since the last run")
+                return
+
             logging.info(f"{tag} - Writing a BLANK record")
     
             df = pd.DataFrame([ record ])
             self.store_df(tag,df)
+            self._blank.add(tag)
             self.write_df(tag)
     
     def write_df(self,tag):
-        # Get the data to upload
-        data_to_upload = self.df.get(tag, pd.DataFrame())
-        
-        # Upload to PostgreSQL if available and has data
-        if (self.postgres_uploader.is_available() and not data_to_upload.empty):
-            try:
-                self.postgres_uploader.upload_data(tag, data_to_upload)
-            except Exception as e:
-                logging.error(f"Failed to upload PostgreSQL data for tag '{tag}': {e}")
-                self.write_errors.append(f"{tag} (postgres): {e}")
+        # -- hand the buffered data over to the write, and start a new buffer for the tag
+        with self._store_lock:
+            buf = self.buffer(tag)
+            self._new_buffer(tag)
+        mode = self.mode(tag)
+        index = self.indexes.get(tag)
+        watermark = self._watermarks.pop(tag, None)
+        updates = self._state_updates.pop(tag, [])
 
-        # Upload to DuckDB if available and has data
-        if (self.duckdb_uploader.is_available() and not data_to_upload.empty):
-            try:
-                self.duckdb_uploader.upload_data(tag, data_to_upload)
-            except Exception as e:
-                logging.error(f"Failed to upload DuckDB data for tag '{tag}': {e}")
-                self.write_errors.append(f"{tag} (duckdb): {e}")
+        # -- change detection only applies to full loads.  A BLANK record has no key to compare, so the
+        #    baseline is dropped and the next run with data loads the table in full
+        detector = None
+        keys = ChangeDetector.configured().get(tag)
+        if keys and mode == 'replace':
+            detector = ChangeDetector(tag, keys)
+            if tag in self._blank:
+                detector.reset()
+                detector = None
+        self._blank.discard(tag)
+
+        if self.write_behind():
+            # -- queue the write so the plugin can carry on fetching.  One writer per collector keeps the writes in order
+            with self._store_lock:
+                if self._write_queue is None:
+                    self._write_queue = ThreadPoolExecutor(max_workers=1, thread_name_prefix='write-behind')
+                self.pending_writes.append((tag, self._write_queue.submit(self._write, tag, buf, mode, watermark, index, detector, updates)))
+        else:
+            self._write(tag, buf, mode, watermark, index, detector, updates)
+
+    @staticmethod
+    def incremental():
+        """Collect only what changed since the last run, for the plugins that support it (off by default)"""
+        return os.environ.get('COLLECTOR_INCREMENTAL', 'false').lower() in ('1', 'true', 'yes')
+
+    def set_mode(self, tag, mode, index=None):
+        """How the sinks load a tag - 'replace' deletes the tenancy's rows before loading (the default), 'append' keeps them,
+        and 'index' overwrites the rows whose index columns match (within the tenancy) and adds the rest.  Apart from the
+        rows past the tag's retention (see set_retention), nothing gets deleted in the 'index' mode."""
+        if mode not in ('replace', 'append', 'index'):
+            raise ValueError(f"Unknown write mode '{mode}' for {tag}")
+        if mode == 'index':
+            if not index:
+                raise ValueError(f"The 'index' write mode for {tag} needs the index column(s)")
+            self.indexes[tag] = [index] if isinstance(index, str) else list(index)
+        self.modes[tag] = mode
+
+    @staticmethod
+    def mapper(spec):
+        """Compile a plugin's declarative {column: path} spec into a fast extractor - see mapping.Mapper"""
+        return Mapper(spec)
+
+    def set_timestamps(self, tag, columns):
+        """Columns of a tag that the plugin stores as the API's timestamp strings, as a {column: format} dict.  store_df
+        converts them to timestamps a whole column at a time, which is much faster than parsing every value in the mapper."""
+        self.timestamps[tag] = dict(columns)
+
+    @staticmethod
+    def parse_timestamps(df, columns):
+        """Convert string columns to (timezone naive, UTC) timestamps.  The format only has to match the start of the
+        value, so e.g. '%Y-%m-%dT%H:%M:%S' drops any fraction of a second.  Empty or invalid values become NaT"""
+        for column, format in columns.items():
+            if column not in df.columns:
+                continue
+            if format in ('ISO8601', 'mixed'):
+                values = pd.to_datetime(df[column], format=format, errors='coerce', utc=True)
+            else:
+                values = pd.to_datetime(df[column], format=format, exact=False, errors='coerce')
+            if values.dt.tz is not None:
+                values = values.dt.tz_convert('UTC').dt.tz_localize(None)
+            df[column] = values.astype('datetime64[us]')
+        return df
 
-        # Upload to BigQuery if available and has data
-        if (self.bigquery_uploader.is_available() and not data_to_upload.empty):
+    def mode(self, tag):
+        return self.modes.get(tag, 'replace')
+
+    def since(self, tag, default=None):
+        """The watermark stored for the tenancy and tag by the last successful write, or the default.
+
+        When incremental collection is on and there is a watermark, the tag is switched to append mode,
+        so the new rows are added to the ones loaded by earlier runs.
+        """
+        if not self.incremental():
+            return default
+        watermark = self.state.get('watermarks', f"{os.environ.get('TENANCY', 'default')}:{tag}")
+        if watermark is None:
+            return default
+        if self.mode(tag) == 'replace':
+            self.set_mode(tag, 'append')
+        logging.info(f"{tag} - Collecting records since {watermark}")
+        return watermark
+
+    def set_retention(self, tag, column, age):
+        """Keep only the rows of an appended (or indexed) tag whose column is within age (a timedelta).  Once the new rows
+        are loaded, the databases delete the tenancy's older rows, so incremental collection doesn't grow the table without bound"""
+        self.retention[tag] = (column, age)
+
+    def expiry(self, tag):
+        """The retention column of a tag and the (UTC) time before which its rows are deleted, or None"""
+        if tag not in self.retention:
+            return None
+        column, age = self.retention[tag]
+        return column, datetime.datetime.now(datetime.UTC).replace(tzinfo=None) - age
+
+    def set_watermark(self, tag, value):
+        """Advance the tag's watermark once the next write_df for the tag succeeds in every sink"""
+        if self.incremental() and value is not None:
+            self._watermarks[tag] = str(value)
+
+    def set_state_on_write(self, tag, section, key, value):
+        """Keep a value in the state file once the next write_df for the tag succeeds in every sink, like a watermark"""
+        self._state_updates.setdefault(tag, []).append((section, key, value))
+
+    def write_behind(self):
+        """Queue writes in the background, or write before write_df returns.  Unless COLLECTOR_WRITE_BEHIND says otherwise,
+        writes are only queued when run_plugin drives the collector, as it always waits for them.  A plugin run on its own
+        writes each table before carrying on, so nothing is left queued if its __main__ exits early"""
+        setting = os.environ.get('COLLECTOR_WRITE_BEHIND')
+        if setting is None:
+            return self.managed
+        return setting.lower() not in ('0', 'false', 'no')
+
+    def flush(self):
+        """Wait for all queued writes to finish.  Their failures are recorded in write_errors"""
+        pending, self.pending_writes = self.pending_writes, []
+        for tag, future in pending:
             try:
-                self.bigquery_uploader.upload_data(tag, data_to_upload)
+                future.result()
             except Exception as e:
-                logging.error(f"Error uploading to BigQuery for tag '{tag}': {e}")
-                self.write_errors.append(f"{tag} (bigquery): {e}")
-        
-        # Handle other file outputs only if self.df[tag] has data
-        if tag in self.df and not self.df[tag].empty:
-            if 'PARQUET_PATH' in os.environ:
-                path = self.target_path(os.environ['PARQUET_PATH'],tag)
-                logging.info(f"Writing Parquet file ({len(self.df[tag])}) : {path}")
-                os.makedirs(os.path.dirname(path), exist_ok=True)
-                try:
-                    self.df[tag].to_parquet(path)
-                    logging.info(f"SUCCESS writing Parquet : {path}")
-                except Exception as e:
-                    logging.error(f"ERROR writing Parquet : {e}")
-                    self.write_errors.append(f"{tag} (parquet): {e}")
+                logging.error(f"Failed to write data for tag '{tag}': {e}")
+                self.write_errors.append(f"{tag}: {e}")
 
-            # -- create local json file
-            if 'UPLOAD_TARGET' in os.environ:
-                path = self.target_path(os.environ['UPLOAD_TARGET'],tag)
-                try:
-                    os.makedirs(os.path.dirname(path),exist_ok = True)
-                    self.df[tag].to_json(path, orient='records', lines=False, indent=2)
-                    logging.info(f" - SUCCESS writing JSON : {path}")
-                except Exception as e:
-                    logging.error(f" - ERROR writing JSON : {e}")
-                    self.write_errors.append(f"{tag} (json): {e}")
+    def _write(self, tag, buf, mode='replace', watermark=None, index=None, detector=None, updates=()):
+        delta, removed = buf, None
+        try:
+            ok = True
+            if not buf.empty:
+                refresh = None
+                if detector is not None:
+                    delta, removed = self.detect_changes(tag, buf, detector)
+                    if delta is not buf:
+                        # -- only the changed rows go to the databases, merged on the key.  The unchanged rows are
+                        #    still part of this run, so their upload_timestamp is moved to this run's
+                        mode, index = 'index', detector.keys
+                        refresh = pd.to_datetime(self.sync_time).to_pydatetime()
+                sinks = self.sinks(buf, mode, index, delta, removed, refresh)
+                # -- join the in-memory chunks once, before the sinks read them
+                buf.join()
+                if len(sinks) > 1 and self.fanout():
+                    # -- every sink is independent, so write them all at the same time
+                    with ThreadPoolExecutor(max_workers=len(sinks), thread_name_prefix=f"write-{tag}") as executor:
+                        ok = all(list(executor.map(lambda sink: self.write_sink(tag, *sink), sinks)))
+                else:
+                    ok = all([self.write_sink(tag, *sink) for sink in sinks])
+
+            # -- only move the watermark once every sink has the data, otherwise the next run collects it again
+            if watermark is not None and ok:
+                self.state.set('watermarks', f"{os.environ.get('TENANCY', 'default')}:{tag}", watermark)
+                logging.info(f"{tag} - Watermark advanced to {watermark}")
+            if ok:
+                for section, key, value in updates:
+                    self.state.set(section, key, value)
+
+            # -- the same goes for the row hashes, or the next run would skip rows that never made it
+            if detector is not None and ok:
+                detector.save()
+        finally:
+            # Clear the buffer
+            buf.clear()
+            if delta is not buf:
+                delta.clear()
+
+    def detect_changes(self, tag, buf, detector):
+        """Split the buffered rows into the new or changed rows, and the keys that disappeared since the last run.
+        Without a baseline from an earlier run, the whole table is loaded as usual"""
+        previous = detector.previous()
+        if previous is not None and not self.baseline_matches(tag, detector.previous_rows):
+            previous = None
+        delta = None if previous is None else TableBuffer(tag)
+        for df in buf.segments():
+            changed = detector.changed(df, previous)
+            if delta is not None:
+                delta.append(changed)
 
-        # Clear the dataframe
-        if tag in self.df:
-            self.df[tag] = pd.DataFrame()
+        # -- the changed rows are merged on the key, which would fold the rows sharing a key into one
+        repeated = detector.repeated()
+        if repeated:
+            logging.warning(f"{tag} - the change detection key ({', '.join(detector.keys)}) repeats in {repeated} of {len(buf)} rows - loading the table in full")
+            detector.reset()
+            if delta is not None:
+                delta.clear()
+            previous = None
+        if previous is None:
+            self.change_stats[tag] = detector.report(len(buf), len(buf), 0)
+            return buf, None
+
+        removed = detector.removed(previous)
+        self.change_stats[tag] = detector.report(len(buf), len(delta), len(removed))
+        return delta, removed
+
+    def baseline_matches(self, tag, rows):
+        """Check the row hashes against the databases.  When a table was truncated or rebuilt since the last run, the rows
+        it lost would never be loaded again, so the table is loaded in full instead"""
+        for name, uploader in (('postgres', self.postgres_uploader), ('duckdb', self.duckdb_uploader), ('bigquery', self.bigquery_uploader)):
+            if not uploader.is_available():
+                continue
+            count = uploader.count_rows(tag)
+            if count != rows:
+                logging.warning(f"{tag} - {name} has {count} rows for the tenancy, but the last run wrote {rows} - loading the table in full")
+                return False
+        return True
+
+    @staticmethod
+    def fanout():
+        """Write to all configured sinks concurrently (the default), or one after another"""
+        return os.environ.get('COLLECTOR_WRITE_FANOUT', 'true').lower() not in ('0', 'false', 'no')
+
+    def sinks(self, buf, mode='replace', index=None, delta=None, removed=None, refresh=None):
+        """The configured targets for a table, as (name, function(tag)) pairs.  With change detection, the databases
+        only get the changed rows (delta) and the removed keys, while the files still get every row"""
+        rows = buf if delta is None else delta
+        sinks = []
+        if self.postgres_uploader.is_available():
+            sinks.append(('postgres', lambda tag: self.upload_segments(self.postgres_uploader, tag, rows, mode, index, removed, refresh)))
+        if self.duckdb_uploader.is_available():
+            sinks.append(('duckdb', lambda tag: self.upload_segments(self.duckdb_uploader, tag, rows, mode, index, removed, refresh)))
+        if self.bigquery_uploader.is_available():
+            sinks.append(('bigquery', lambda tag: self.upload_segments(self.bigquery_uploader, tag, rows, mode, index, removed, refresh)))
+        if 'PARQUET_PATH' in os.environ:
+            sinks.append(('parquet', lambda tag: self.parquet_sink(tag, buf)))
+        if 'UPLOAD_TARGET' in os.environ:
+            sinks.append(('json', lambda tag: self.json_sink(tag, buf)))
+        return sinks
+
+    def write_sink(self, tag, name, write):
+        """Write a table to one sink, recording how long it took and any error"""
+        start = time.perf_counter()
+        try:
+            write(tag)
+            ok = True
+        except Exception as e:
+            logging.error(f"Failed to write {name} data for tag '{tag}': {e}")
+            self.write_errors.append(f"{tag} ({name}): {e}")
+            ok = False
+        elapsed = time.perf_counter() - start
+        self.sink_timings.setdefault(tag, {})[name] = elapsed
+        logging.info(f"{tag} - {name} {'written' if ok else 'FAILED'} in {elapsed:.2f}s")
+        return ok
+
+    def parquet_sink(self, tag, buf):
+        path = self.target_path(os.environ['PARQUET_PATH'],tag)
+        logging.info(f"Writing Parquet file ({len(buf)}) : {path}")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.write_parquet(path, buf)
+        logging.info(f"SUCCESS writing Parquet : {path}")
+
+    def json_sink(self, tag, buf):
+        # -- create local json file
+        path = self.target_path(os.environ['UPLOAD_TARGET'],tag)
+        os.makedirs(os.path.dirname(path),exist_ok = True)
+        self.write_json(path, buf)
+        logging.info(f" - SUCCESS writing JSON : {path}")
+
+    def upload_segments(self, uploader, tag, buf, mode='replace', index=None, removed=None, refresh=None):
+        '''Stream the buffered segments into a database uploader.  In replace mode, only the first segment replaces the tenancy data.
+        Any removed keys are deleted afterwards, and so are the rows of an appended or indexed tag that are past its retention (see set_retention).
+        With refresh (change detection), the tenancy's rows are then given that upload_timestamp, as they all came from this run'''
+        replace = mode == 'replace'
+        segments = buf.segments()
+        if buf.spilled and not buf.streamable():
+            logging.warning(f"{tag} - some columns only have values after the first spilled segment - joining the segments in memory to load them")
+            segments = [buf.to_frame()]
+        for df in segments:
+            if mode == 'index':
+                # -- a key can only be merged once per statement, so keep the last record for each key.  A row with a
+                #    missing key never matches an existing row, so it would be added again on every run
+                keys = ['tenancy'] + [c for c in index if c != 'tenancy']
+                missing = df[keys].isna().any(axis=1)
+                if missing.any():
+                    logging.warning(f"{tag} - skipping {int(missing.sum())} rows without a value for the key ({', '.join(keys)})")
+                    df = df[~missing]
+                df = df.drop_duplicates(subset=keys, keep='last')
+                uploader.upload_data(tag, df, replace=False, index=index)
+            else:
+                uploader.upload_data(tag, df, replace=replace)
+            replace = False
+        if removed is not None and not removed.empty:
+            uploader.delete_rows(tag, removed, index)
+        expiry = self.expiry(tag)
+        if mode in ('append', 'index') and expiry is not None:
+            uploader.delete_before(tag, *expiry)
+        if refresh is not None:
+            uploader.refresh_timestamp(tag, refresh)
+
+    def write_parquet(self, path, buf):
+        if not buf.spilled:
+            buf.to_frame().to_parquet(path)
+            return
+
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        # -- the segments share their pandas types, but Arrow can still type them apart (e.g. a column that is all null
+        #    in one segment), so unify them first.  Values that Arrow can't put in one column are written the way an
+        #    unbuffered table would be
+        try:
+            schema = pa.unify_schemas(
+                [pa.Schema.from_pandas(df, preserve_index=False).remove_metadata() for df in buf.segments()],
+                promote_options='permissive'
+            )
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+            logging.warning(f"Segments of {path} can't be written one at a time ({e}) - joining them in memory")
+            buf.to_frame().to_parquet(path)
+            return
+        with pq.ParquetWriter(path, schema) as writer:
+            for df in buf.segments():
+                df = df.reindex(columns=schema.names)
+                writer.write_table(pa.Table.from_pandas(df, preserve_index=False).cast(schema))
+
+    def write_json(self, path, buf):
+        if not buf.spilled:
+            buf.to_frame().to_json(path, orient='records', lines=False, indent=2)
+            return
+
+        # -- write each segment's records into the one JSON array
+        with open(path, 'w') as f:
+            f.write('[\n  ')
+            first = True
+            for df in buf.segments():
+                records = df.to_json(orient='records', lines=False, indent=2).strip()[1:-1].strip()
+                if not records:
+                    continue
+                if not first:
+                    f.write(',\n  ')
+                f.write(records)
+                first = False
+            f.write('\n]')
 
     def cleanup(self):
         """Clean up resources"""
         try:
-            # Close PostgreSQL connection
-            if hasattr(self, 'postgres_uploader'):
-                self.postgres_uploader.close()
-                
-            # Close DuckDB connection
-            if hasattr(self, 'duckdb_uploader'):
-                self.duckdb_uploader.close()
-                
-            # Close BigQuery connection
-            if hasattr(self, 'bigquery_uploader'):
-                self.bigquery_uploader.close()
-                
+            # Wait for the queued writes
+            self.flush()
+            if self._write_queue is not None:
+                self._write_queue.shutdown(wait=True)
+                self._write_queue = None
+
+            # Remove any buffered data, including segments spilled to disk
+            for tag in list(self.df):
+                self.buffer(tag).clear()
+
+            # The database connections are shared with the other plugins, and closed by SinkRegistry.close()
+
         except Exception as e:
             logging.error(f"Error during cleanup: {e}")
 
+    def close(self):
+        """End a run of a single plugin (e.g. a plugin's __main__).  Waits for the queued writes, then closes the database
+        connections, the DuckDB writer and the HTTP sessions, so no write is left waiting on a writer thread when the
+        interpreter exits.  Returns the exit code for the run: 1 when a table failed to write, otherwise 0"""
+        self.cleanup()
+        SinkRegistry.close()
+        HttpClient.close()
+        if self.write_errors:
+            logging.error(f"{len(self.write_errors)} write(s) failed: {'; '.join(self.write_errors)}")
+            return 1
+        return 0
+
+class SinkRegistry:
+    """Process wide registry of the database uploaders.
+
+    Every Collector in the process shares the same uploaders, so each database gets one
+    connection pool (sized to COLLECTOR_THREADS) and the schemas are only created once per run.
+    """
+    _lock = threading.Lock()
+    _uploaders = None
+
+    @classmethod
+    def get(cls):
+        """Return the shared uploaders, creating them on first use"""
+        with cls._lock:
+            if cls._uploaders is None:
+                cls._uploaders = {
+                    'postgres' : UploadPostgress(),
+                    'duckdb'   : UploadDuckDB(),
+                    'bigquery' : UploadBigQuery(),
+                }
+            return cls._uploaders
+
+    @staticmethod
+    def pool_size():
+        """Connections to keep per database - one for each plugin that can be writing at the same time"""
+        return max(1, int(os.environ.get('COLLECTOR_THREADS', 3)))
+
+    @classmethod
+    def close(cls):
+        """Close the shared uploaders and the DuckDB writer"""
+        with cls._lock:
+            uploaders, cls._uploaders = cls._uploaders, None
+        for uploader in (uploaders or {}).values():
+            try:
+                uploader.close()
+            except Exception as e:
+                logging.error(f"Error closing {type(uploader).__name__}: {e}")
+        DuckDBWriter.shutdown()
+
 class UploadBigQuery:
     """BigQuery uploader class"""
     
-    def __init__(self, collector):
+    def __init__(self, collector=None):
         self.collector = collector
         self.available = False
         self.client = None
@@ -220,8 +786,9 @@ class UploadBigQuery:
             logging.error(f"Error connecting to BigQuery: {e}")
             self.available = False
             
-    def upload_data(self, tag, df):
-        """Upload data to BigQuery"""
+    def upload_data(self, tag, df, replace=True, index=None):
+        """Upload data to BigQuery.  With replace, the existing rows for the tenancy are deleted first.
+        With an index, the rows are MERGEd on the tenancy and index columns through a staging table instead"""
         if not self.available or df.empty:
             return
 
@@ -235,14 +802,15 @@ class UploadBigQuery:
             logging.info(f"Uploading {len(df)} rows to BigQuery table '{self.dataset_id}.{table_name}' for tenancy '{tenancy}'")
 
             # Delete existing rows for this tenant (no-op if table doesn't exist yet)
-            try:
-                delete_query = f"DELETE FROM `{table_id}` WHERE tenancy = @tenancy"
-                delete_config = bigquery.QueryJobConfig(
-                    query_parameters=[bigquery.ScalarQueryParameter("tenancy", "STRING", tenancy)]
-                )
-                self.client.query(delete_query, job_config=delete_config).result()
-            except Exception:
-                pass
+            if replace and not index:
+                try:
+                    delete_query = f"DELETE FROM `{table_id}` WHERE tenancy = @tenancy"
+                    delete_config = bigquery.QueryJobConfig(
+                        query_parameters=[bigquery.ScalarQueryParameter("tenancy", "STRING", tenancy)]
+                    )
+                    self.client.query(delete_query, job_config=delete_config).result()
+                except Exception:
+                    pass
 
             # Coerce object columns to str so pyarrow can serialise them, preserving nulls
             df = df.copy()
@@ -250,6 +818,11 @@ class UploadBigQuery:
                 if df[col].dtype == object:
                     df[col] = df[col].where(df[col].isna(), df[col].astype(str))
 
+            if index:
+                self._merge(table_id, df, index)
+                logging.info(f"Successfully merged {len(df)} rows into BigQuery table '{self.dataset_id}.{table_name}'")
+                return
+
             job_config = bigquery.LoadJobConfig(
                 write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
                 schema=self._df_to_bq_schema(df),
@@ -262,7 +835,80 @@ class UploadBigQuery:
             
         except Exception as e:
             logging.error(f"Error uploading to BigQuery for tag '{tag}': {e}")
+            raise
             
+    def delete_rows(self, tag, df, index):
+        """Delete the rows matching the tenancy and index columns of each row in df"""
+        if not self.available or df.empty:
+            return
+        self._merge(f"{self.project_id}.{self.dataset_id}.{tag}", df, index, delete=True)
+
+    def count_rows(self, tag):
+        """Rows of the tenancy in the table (0 when there is no table yet)"""
+        from google.cloud import bigquery
+        from google.api_core.exceptions import NotFound
+        job_config = bigquery.QueryJobConfig(query_parameters=[bigquery.ScalarQueryParameter("tenancy", "STRING", os.environ.get('TENANCY', 'default'))])
+        try:
+            return list(self.client.query(f"SELECT COUNT(*) FROM `{self.project_id}.{self.dataset_id}.{tag}` WHERE tenancy = @tenancy", job_config=job_config).result())[0][0]
+        except NotFound:
+            return 0
+
+    def refresh_timestamp(self, tag, upload_timestamp):
+        """Set the upload_timestamp of all the tenancy's rows"""
+        from google.cloud import bigquery
+        job_config = bigquery.QueryJobConfig(query_parameters=[
+            bigquery.ScalarQueryParameter("tenancy", "STRING", os.environ.get('TENANCY', 'default')),
+            bigquery.ScalarQueryParameter("upload_timestamp", "DATETIME", upload_timestamp),
+        ])
+        self.client.query(
+            f"UPDATE `{self.project_id}.{self.dataset_id}.{tag}` SET upload_timestamp = @upload_timestamp WHERE tenancy = @tenancy AND upload_timestamp != @upload_timestamp",
+            job_config=job_config
+        ).result()
+
+    def delete_before(self, tag, column, cutoff):
+        """Delete the tenancy's rows whose column is before the cutoff"""
+        if not self.available:
+            return
+        from google.cloud import bigquery
+        tenancy = os.environ.get('TENANCY', 'default')
+        job_config = bigquery.QueryJobConfig(query_parameters=[
+            bigquery.ScalarQueryParameter("tenancy", "STRING", tenancy),
+            bigquery.ScalarQueryParameter("cutoff", "DATETIME", cutoff),
+        ])
+        job = self.client.query(f"DELETE FROM `{self.project_id}.{self.dataset_id}.{tag}` WHERE tenancy = @tenancy AND `{column}` < @cutoff", job_config=job_config)
+        job.result()
+        logging.info(f"Deleted {job.num_dml_affected_rows} rows before {cutoff} from BigQuery table '{self.dataset_id}.{tag}'")
+
+    def _merge(self, table_id, df, index, delete=False):
+        """Load the rows into a staging table, then MERGE them into the table on the (tenancy, index) key.
+        With delete, the matching rows are deleted instead"""
+        from google.cloud import bigquery
+
+        stage_id = f"{table_id}_stage_{uuid.uuid4().hex[:8]}"
+        keys = ['tenancy'] + [c for c in index if c != 'tenancy']
+        columns = ', '.join(f'`{c}`' for c in df.columns)
+        try:
+            job_config = bigquery.LoadJobConfig(
+                write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE,
+                schema=self._df_to_bq_schema(df),
+            )
+            self.client.load_table_from_dataframe(df, stage_id, job_config=job_config).result()
+
+            on = ' AND '.join(f'T.`{c}` = S.`{c}`' for c in keys)
+            if delete:
+                self.client.query(f"MERGE `{table_id}` T USING `{stage_id}` S ON {on} WHEN MATCHED THEN DELETE").result()
+                return
+
+            self.client.query(f"CREATE TABLE IF NOT EXISTS `{table_id}` LIKE `{stage_id}`").result()
+            updates = ', '.join(f'`{c}` = S.`{c}`' for c in df.columns if c not in keys)
+            merge = f"MERGE `{table_id}` T USING `{stage_id}` S ON {on} "
+            if updates:
+                merge += f"WHEN MATCHED THEN UPDATE SET {updates} "
+            merge += f"WHEN NOT MATCHED THEN INSERT ({columns}) VALUES ({', '.join(f'S.`{c}`' for c in df.columns)})"
+            self.client.query(merge).result()
+        finally:
+            self.client.delete_table(stage_id, not_found_ok=True)
+
     def _df_to_bq_schema(self, df):
         from google.cloud import bigquery
         fields = []
@@ -293,56 +939,62 @@ class UploadBigQuery:
             logging.info("BigQuery connection closed")
 
 class UploadPostgress:
-    def __init__(self, collector):
+    def __init__(self, collector=None):
         self.collector = collector
         self._engine = None
         self._schema_created = False
+        self._lock = threading.RLock()
         logging.getLogger('sqlalchemy.engine').setLevel(logging.WARNING)
         
     @property
     def engine(self):
         """Create and return a singleton PostgreSQL engine with connection pooling"""
-        if self._engine is None:
-            try:
-                connection_string = f"postgresql+psycopg://{os.environ['POSTGRES_USERNAME']}:{quote(os.environ['POSTGRES_PASSWORD'])}@{os.environ['POSTGRES_ENDPOINT']}:{os.environ.get('POSTGRES_PORT','5432')}/{os.environ['POSTGRES_DATABASE']}?options=-csearch_path%3D{os.environ.get('POSTGRES_SCHEMA','public')}"
-                
-                self._engine = create_engine(
-                    connection_string, 
-                    pool_pre_ping=True,
-                    pool_size=10,
-                    max_overflow=20,
-                    pool_recycle=3600,
-                    echo=False
-                )
-                
-                # Test the connection
-                with self._engine.connect() as conn:
-                    conn.execute(text("SELECT 1"))
+        with self._lock:
+            if self._engine is None:
+                try:
+                    connection_string = f"postgresql+psycopg://{os.environ['POSTGRES_USERNAME']}:{quote(os.environ['POSTGRES_PASSWORD'])}@{os.environ['POSTGRES_ENDPOINT']}:{os.environ.get('POSTGRES_PORT','5432')}/{os.environ['POSTGRES_DATABASE']}?options=-csearch_path%3D{os.environ.get('POSTGRES_SCHEMA','public')}"
+
+                    # -- one connection for each plugin that can be writing, shared by all the plugins
+                    self._engine = create_engine(
+                        connection_string, 
+                        pool_pre_ping=True,
+                        pool_size=SinkRegistry.pool_size(),
+                        max_overflow=SinkRegistry.pool_size(),
+                        pool_recycle=3600,
+                        echo=False
+                    )
                     
-                logging.info("PostgreSQL connection pool initialized successfully")
-                
-            except Exception as e:
-                logging.critical(f"Failed to initialize PostgreSQL connection pool: {e}")
-                raise
+                    # Test the connection
+                    with self._engine.connect() as conn:
+                        conn.execute(text("SELECT 1"))
+                        
+                    logging.info(f"PostgreSQL connection pool initialized successfully (pool size {SinkRegistry.pool_size()})")
+                    
+                except Exception as e:
+                    self._engine = None
+                    logging.critical(f"Failed to initialize PostgreSQL connection pool: {e}")
+                    raise
                 
         return self._engine
     
     def ensure_schema_exists(self):
-        """Ensure the PostgreSQL schema exists, create if it doesn't"""
-        if not self._schema_created:
-            try:
-                schema = os.environ.get('POSTGRES_SCHEMA', 'public')
-                with self.engine.connect() as conn:
-                    conn.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{schema}"'))
-                    conn.commit()
-                logging.info(f"PostgreSQL schema '{schema}' ensured to exist")
-                self._schema_created = True
-            except Exception as e:
-                logging.error(f"Failed to create PostgreSQL schema: {e}")
-                raise
+        """Ensure the PostgreSQL schema exists, create if it doesn't.  Only done once per run"""
+        with self._lock:
+            if not self._schema_created:
+                try:
+                    schema = os.environ.get('POSTGRES_SCHEMA', 'public')
+                    with self.engine.connect() as conn:
+                        conn.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{schema}"'))
+                        conn.commit()
+                    logging.info(f"PostgreSQL schema '{schema}' ensured to exist")
+                    self._schema_created = True
+                except Exception as e:
+                    logging.error(f"Failed to create PostgreSQL schema: {e}")
+                    raise
     
-    def upload_data(self, tag, df):
-        """Upload DataFrame data using chunked approach"""
+    def upload_data(self, tag, df, replace=True, index=None):
+        """Upload DataFrame data using chunked approach.  With replace, the existing rows for the tenancy are deleted first.
+        With an index, the rows are merged on the tenancy and index columns instead"""
         if df.empty:
             logging.debug(f"No data to upload for PostgreSQL tag '{tag}'")
             return
@@ -357,25 +1009,34 @@ class UploadPostgress:
 
             logging.info(f"Uploading {len(df)} rows to PostgreSQL table '{table_name}' for tenancy '{tenancy}'")
 
+            if index:
+                self._upsert(table_name, schema, df, index)
+                logging.info(f"Successfully merged {len(df)} rows into PostgreSQL table '{table_name}'")
+                return
+
             # Delete existing rows for this tenant (no-op if table doesn't exist yet)
-            with self.engine.connect() as conn:
-                try:
-                    conn.execute(text(f'DELETE FROM "{schema}"."{table_name}" WHERE tenancy = :tenancy'), {'tenancy': tenancy})
-                    conn.commit()
-                except Exception:
-                    conn.rollback()
+            if replace:
+                with self.engine.connect() as conn:
+                    try:
+                        conn.execute(text(f'DELETE FROM "{schema}"."{table_name}" WHERE tenancy = :tenancy'), {'tenancy': tenancy})
+                        conn.commit()
+                    except Exception:
+                        conn.rollback()
 
-            dtype_map = self._null_dtype_map(df)
-            df.to_sql(
-                table_name,
-                self.engine,
-                if_exists='append',
-                index=False,
-                schema=schema,
-                method='multi',
-                chunksize=1000,
-                dtype=dtype_map if dtype_map else None,
-            )
+            if self.load_method() == 'copy':
+                self._copy(table_name, schema, df)
+            else:
+                dtype_map = self._null_dtype_map(df)
+                df.to_sql(
+                    table_name,
+                    self.engine,
+                    if_exists='append',
+                    index=False,
+                    schema=schema,
+                    method='multi',
+                    chunksize=1000,
+                    dtype=dtype_map if dtype_map else None,
+                )
 
             logging.info(f"Successfully uploaded {len(df)} rows to PostgreSQL table '{table_name}'")
 
@@ -383,6 +1044,170 @@ class UploadPostgress:
             logging.error(f"Failed to upload data to PostgreSQL for tag '{tag}': {e}")
             raise
 
+    def load_method(self):
+        """How rows are loaded - 'copy' (COPY FROM STDIN, the default) or 'insert' (multi-row INSERT via to_sql)"""
+        return os.environ.get('POSTGRES_LOAD_METHOD', 'copy').lower()
+
+    def _create_table(self, table_name, schema, df):
+        """Create the table with the column types pandas would infer for to_sql.  Columns with only nulls become TEXT"""
+        ddl = pd.io.sql.get_schema(df, table_name, con=self.engine, schema=schema)
+        ddl = ddl.replace('CREATE TABLE ', 'CREATE TABLE IF NOT EXISTS ', 1)
+        with self.engine.connect() as conn:
+            conn.execute(text(ddl))
+            conn.commit()
+
+    def _copy(self, table_name, schema, df, chunksize=50000):
+        """Stream the DataFrame into the table with COPY FROM STDIN (CSV format)"""
+        from sqlalchemy import inspect
+
+        if not inspect(self.engine).has_table(table_name, schema=schema):
+            self._create_table(table_name, schema, df)
+
+        raw = self.engine.raw_connection()
+        try:
+            with raw.driver_connection.cursor() as cur:
+                self._copy_into(cur, f'"{schema}"."{table_name}"', df, chunksize)
+            raw.commit()
+        except Exception:
+            raw.rollback()
+            raise
+        finally:
+            raw.close()
+
+    def _copy_into(self, cur, target, df, chunksize=50000):
+        columns = ', '.join(f'"{c}"' for c in df.columns)
+        with cur.copy(f'COPY {target} ({columns}) FROM STDIN WITH (FORMAT csv, NULL \'\\N\')') as copy:
+            for start in range(0, len(df), chunksize):
+                # -- \\N marks a NULL, so empty strings stay empty strings
+                copy.write(self._integral(df.iloc[start:start + chunksize]).to_csv(header=False, index=False, na_rep='\\N'))
+
+    @staticmethod
+    def _integral(df):
+        """Write float columns that only hold whole numbers as integers.  pandas keeps integers with missing values as
+        floats, and COPY won't load '123.0' into a BIGINT column (to_sql used to cast it).  '123' loads into either type"""
+        columns = {}
+        for column in df.columns:
+            values = df[column]
+            if values.dtype.kind != 'f':
+                continue
+            present = values.dropna()
+            if len(present) and (present % 1 == 0).all() and present.abs().max() < 2 ** 53:
+                columns[column] = values.astype('Int64')
+        return df.assign(**columns) if columns else df
+
+    def _upsert(self, table_name, schema, df, index, chunksize=50000):
+        """COPY the rows into a temporary stage table, then INSERT ... ON CONFLICT on the (tenancy, index) key"""
+        from sqlalchemy import inspect
+
+        if not inspect(self.engine).has_table(table_name, schema=schema):
+            self._create_table(table_name, schema, df)
+
+        target = f'"{schema}"."{table_name}"'
+        keys = ['tenancy'] + [c for c in index if c != 'tenancy']
+        key_columns = ', '.join(f'"{c}"' for c in keys)
+        columns = ', '.join(f'"{c}"' for c in df.columns)
+        updates = ', '.join(f'"{c}" = EXCLUDED."{c}"' for c in df.columns if c not in keys)
+
+        raw = self.engine.raw_connection()
+        try:
+            with raw.driver_connection.cursor() as cur:
+                # -- ON CONFLICT needs a unique index on the key
+                self._ensure_upsert_key(cur, table_name, schema, keys)
+                cur.execute(f'CREATE TEMPORARY TABLE "_stage_{table_name}" (LIKE {target}) ON COMMIT DROP')
+                self._copy_into(cur, f'"_stage_{table_name}"', df, chunksize)
+                cur.execute(
+                    f'INSERT INTO {target} ({columns}) SELECT {columns} FROM "_stage_{table_name}" '
+                    f'ON CONFLICT ({key_columns}) DO ' + (f'UPDATE SET {updates}' if updates else 'NOTHING')
+                )
+            raw.commit()
+        except Exception:
+            raw.rollback()
+            raise
+        finally:
+            raw.close()
+
+    def _ensure_upsert_key(self, cur, table_name, schema, keys):
+        """Create the unique index on the key the first time a table is merged into.  A table loaded in the replace or
+        append mode can hold the same key more than once, which would fail the index, so only the most recently
+        uploaded copy of each key is kept (by upload_timestamp)"""
+        cur.execute('SELECT 1 FROM pg_indexes WHERE schemaname = %s AND indexname = %s', (schema, f"{table_name}_upsert_key"))
+        if cur.fetchone():
+            return
+
+        target = f'"{schema}"."{table_name}"'
+        key_columns = ', '.join(f'"{c}"' for c in keys)
+        match = ' AND '.join(f'a."{c}" = b."{c}"' for c in keys)
+        cur.execute(f'DELETE FROM {target} a USING {target} b WHERE {match} AND (a.upload_timestamp, a.ctid) < (b.upload_timestamp, b.ctid)')
+        if cur.rowcount:
+            logging.warning(f"Removed {cur.rowcount} duplicate rows on ({', '.join(keys)}) from PostgreSQL table '{table_name}' before adding its upsert key")
+        cur.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS "{table_name}_upsert_key" ON {target} ({key_columns})')
+
+    def delete_rows(self, tag, df, index):
+        """Delete the rows matching the tenancy and index columns of each row in df"""
+        if df.empty:
+            return
+        from sqlalchemy import inspect
+
+        table_name = tag
+        schema = os.environ.get('POSTGRES_SCHEMA', 'public')
+        if not inspect(self.engine).has_table(table_name, schema=schema):
+            return
+
+        target = f'"{schema}"."{table_name}"'
+        keys = ['tenancy'] + [c for c in index if c != 'tenancy']
+        match = ' AND '.join(f'{target}."{c}" = _delete."{c}"' for c in keys)
+
+        raw = self.engine.raw_connection()
+        try:
+            with raw.driver_connection.cursor() as cur:
+                cur.execute(f'CREATE TEMPORARY TABLE "_delete_{table_name}" (LIKE {target}) ON COMMIT DROP')
+                self._copy_into(cur, f'"_delete_{table_name}"', df[keys])
+                cur.execute(f'DELETE FROM {target} USING "_delete_{table_name}" AS _delete WHERE {match}')
+                logging.info(f"Deleted {cur.rowcount} rows from PostgreSQL table '{table_name}'")
+            raw.commit()
+        except Exception:
+            raw.rollback()
+            raise
+        finally:
+            raw.close()
+
+    def count_rows(self, tag):
+        """Rows of the tenancy in the table (0 when there is no table yet)"""
+        from sqlalchemy import inspect
+
+        schema = os.environ.get('POSTGRES_SCHEMA', 'public')
+        if not inspect(self.engine).has_table(tag, schema=schema):
+            return 0
+        with self.engine.connect() as conn:
+            return conn.execute(text(f'SELECT COUNT(*) FROM "{schema}"."{tag}" WHERE tenancy = :tenancy'), {'tenancy': os.environ.get('TENANCY', 'default')}).scalar()
+
+    def refresh_timestamp(self, tag, upload_timestamp):
+        """Set the upload_timestamp of all the tenancy's rows"""
+        schema = os.environ.get('POSTGRES_SCHEMA', 'public')
+        with self.engine.connect() as conn:
+            result = conn.execute(
+                text(f'UPDATE "{schema}"."{tag}" SET upload_timestamp = :upload_timestamp WHERE tenancy = :tenancy AND upload_timestamp <> :upload_timestamp'),
+                {'tenancy': os.environ.get('TENANCY', 'default'), 'upload_timestamp': upload_timestamp}
+            )
+            conn.commit()
+        logging.info(f"Refreshed the upload_timestamp of {result.rowcount} unchanged rows in PostgreSQL table '{tag}'")
+
+    def delete_before(self, tag, column, cutoff):
+        """Delete the tenancy's rows whose column is before the cutoff"""
+        from sqlalchemy import inspect
+
+        table_name = tag
+        schema = os.environ.get('POSTGRES_SCHEMA', 'public')
+        if not inspect(self.engine).has_table(table_name, schema=schema):
+            return
+        with self.engine.connect() as conn:
+            result = conn.execute(
+                text(f'DELETE FROM "{schema}"."{table_name}" WHERE tenancy = :tenancy AND "{column}" < :cutoff'),
+                {'tenancy': os.environ.get('TENANCY', 'default'), 'cutoff': cutoff}
+            )
+            conn.commit()
+        logging.info(f"Deleted {result.rowcount} rows before {cutoff} from PostgreSQL table '{table_name}'")
+
     def _null_dtype_map(self, df):
         from sqlalchemy import types as sa_types
         return {
@@ -408,23 +1233,87 @@ class UploadPostgress:
             self._engine = None
             logging.info("PostgreSQL connection pool closed")
 
+class DuckDBWriter:
+    """Single writer for the DuckDB file.
+
+    DuckDB does not allow concurrent writes, so every plugin hands its DuckDB work to one
+    writer thread that owns the connection and runs the jobs one at a time, in the order
+    they were queued.  Plugins keep extracting in parallel while their writes wait their turn.
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self, path):
+        self.path = path
+        self._connection = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='duckdb-writer')
+
+    @classmethod
+    def get(cls):
+        """Return the process wide writer, starting it on first use"""
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = cls(os.environ['DUCKDB_FILE'])
+                logging.info(f"DuckDB writer started: {cls._instance.path}")
+            return cls._instance
+
+    @property
+    def connection(self):
+        """The native DuckDB connection - only used from the writer thread"""
+        if self._connection is None:
+            self._connection = duckdb.connect(self.path)
+        return self._connection
+
+    def submit(self, fn, *args):
+        """Queue fn(*args) on the writer thread and return a Future for its result"""
+        return self._executor.submit(fn, *args)
+
+    def run(self, fn, *args):
+        """Queue fn(*args) on the writer thread and wait for its result.  Exceptions are raised in the caller"""
+        return self.submit(fn, *args).result()
+
+    def _close(self):
+        if self._connection:
+            self._connection.close()
+            self._connection = None
+
+    @classmethod
+    def shutdown(cls):
+        """Wait for the queued writes, then close the connection"""
+        with cls._lock:
+            writer, cls._instance = cls._instance, None
+        if writer:
+            writer._executor.submit(writer._close).result()
+            writer._executor.shutdown(wait=True)
+            logging.info("DuckDB writer closed")
+
 class UploadDuckDB:
-    def __init__(self, collector):
+    def __init__(self, collector=None):
         self.collector = collector
         self._engine = None
         self._schema_created = False
+        self._lock = threading.Lock()
+
+    @property
+    def writer(self):
+        """The process wide DuckDB writer that runs all DuckDB work"""
+        return DuckDBWriter.get()
+
+    def load_method(self):
+        """How rows are loaded - 'native' (DuckDB scans the DataFrame, the default) or 'insert' (multi-row INSERT via to_sql)"""
+        return os.environ.get('DUCKDB_LOAD_METHOD', 'native').lower()
         
     @property
     def engine(self):
-        """Create and return a singleton DuckDB engine with connection pooling"""
+        """Create and return a singleton DuckDB engine.  It is only used from the DuckDB writer thread, so one connection is enough"""
         if self._engine is None:
             try:
                 duckdb_file = os.environ['DUCKDB_FILE']
                 self._engine = create_engine(
                     f'duckdb:///{duckdb_file}',
                     pool_pre_ping=True,
-                    pool_size=5,
-                    max_overflow=10,
+                    pool_size=1,
+                    max_overflow=1,
                     pool_recycle=3600,
                     echo=False
                 )
@@ -442,22 +1331,21 @@ class UploadDuckDB:
         return self._engine
     
     def ensure_schema_exists(self):
-        """Ensure the DuckDB schema exists, create if it doesn't"""
-        if not self._schema_created:
-            try:
-                schema = os.environ.get('DUCKDB_SCHEMA', 'source')
-                # Use native DuckDB connection for schema creation to avoid reflection warnings
-                duckdb_file = os.environ['DUCKDB_FILE']
-                with duckdb.connect(duckdb_file) as conn:
-                    conn.execute(f'CREATE SCHEMA IF NOT EXISTS "{schema}"')
-                logging.info(f"DuckDB schema '{schema}' ensured to exist")
-                self._schema_created = True
-            except Exception as e:
-                logging.error(f"Failed to create DuckDB schema: {e}")
-                raise
+        """Ensure the DuckDB schema exists, create if it doesn't.  Only done once per run"""
+        with self._lock:
+            if not self._schema_created:
+                try:
+                    schema = os.environ.get('DUCKDB_SCHEMA', 'source')
+                    self.writer.run(self._create_schema, schema)
+                    logging.info(f"DuckDB schema '{schema}' ensured to exist")
+                    self._schema_created = True
+                except Exception as e:
+                    logging.error(f"Failed to create DuckDB schema: {e}")
+                    raise
     
-    def upload_data(self, tag, df):
-        """Upload DataFrame data using chunked approach"""
+    def upload_data(self, tag, df, replace=True, index=None):
+        """Upload DataFrame data using chunked approach.  With replace, the existing rows for the tenancy are deleted first.
+        With an index, the rows matching the tenancy and index columns are replaced instead"""
         if df.empty:
             logging.debug(f"No data to upload for DuckDB tag '{tag}'")
             return
@@ -472,7 +1360,129 @@ class UploadDuckDB:
 
             logging.info(f"Uploading {len(df)} rows to DuckDB table '{table_name}' for tenancy '{tenancy}'")
 
-            # Delete existing rows for this tenant (no-op if table doesn't exist yet)
+            # -- the write itself is queued on the single DuckDB writer
+            load = self._native if self.load_method() == 'native' else self._insert
+            self.writer.run(load, table_name, schema, df, tenancy, replace, index)
+
+            logging.info(f"Successfully uploaded {len(df)} rows to DuckDB table '{table_name}'")
+
+        except Exception as e:
+            logging.error(f"Failed to upload data to DuckDB for tag '{tag}': {e}")
+            raise
+    
+    def delete_rows(self, tag, df, index):
+        """Delete the rows matching the tenancy and index columns of each row in df"""
+        if df.empty:
+            return
+        self.ensure_schema_exists()
+        schema = os.environ.get('DUCKDB_SCHEMA', 'source')
+        keys = ['tenancy'] + [c for c in index if c != 'tenancy']
+        self.writer.run(self._delete, tag, schema, df[keys], index)
+
+    def count_rows(self, tag):
+        """Rows of the tenancy in the table (0 when there is no table yet)"""
+        self.ensure_schema_exists()
+        schema = os.environ.get('DUCKDB_SCHEMA', 'source')
+        return self.writer.run(self._statement, tag, schema, f'SELECT COUNT(*) FROM "{schema}"."{tag}" WHERE tenancy = :tenancy',
+            {'tenancy': os.environ.get('TENANCY', 'default')}, 0)
+
+    def refresh_timestamp(self, tag, upload_timestamp):
+        """Set the upload_timestamp of all the tenancy's rows"""
+        self.ensure_schema_exists()
+        schema = os.environ.get('DUCKDB_SCHEMA', 'source')
+        self.writer.run(self._statement, tag, schema, f'UPDATE "{schema}"."{tag}" SET upload_timestamp = :upload_timestamp WHERE tenancy = :tenancy AND upload_timestamp <> :upload_timestamp',
+            {'tenancy': os.environ.get('TENANCY', 'default'), 'upload_timestamp': upload_timestamp})
+
+    def _statement(self, table_name, schema, statement, parameters, missing=None):
+        """Run one statement against a table, on the connection of the load method.  Returns the first value of a query,
+        or missing when the table doesn't exist"""
+        if self.load_method() == 'native':
+            conn = self.writer.connection.cursor()
+            try:
+                exists = conn.execute('SELECT COUNT(*) FROM information_schema.tables WHERE table_schema = ? AND table_name = ?', [schema, table_name]).fetchone()[0]
+                if not exists:
+                    return missing
+                # -- the native connection names its parameters $name rather than :name
+                row = conn.execute(re.sub(r':(\w+)', r'$\1', statement), parameters).fetchone()
+                return row[0] if row else None
+            finally:
+                conn.close()
+        with self.engine.connect() as conn:
+            exists = conn.execute(text('SELECT COUNT(*) FROM information_schema.tables WHERE table_schema = :schema AND table_name = :table'), {'schema': schema, 'table': table_name}).scalar()
+            if not exists:
+                return missing
+            try:
+                result = conn.execute(text(statement), parameters)
+                value = result.scalar() if result.returns_rows else None
+                conn.commit()
+                return value
+            except Exception:
+                conn.rollback()
+                raise
+
+    def delete_before(self, tag, column, cutoff):
+        """Delete the tenancy's rows whose column is before the cutoff"""
+        self.ensure_schema_exists()
+        schema = os.environ.get('DUCKDB_SCHEMA', 'source')
+        self.writer.run(self._statement, tag, schema, f'DELETE FROM "{schema}"."{tag}" WHERE tenancy = :tenancy AND "{column}" < :cutoff',
+            {'tenancy': os.environ.get('TENANCY', 'default'), 'cutoff': cutoff})
+
+    def _delete(self, table_name, schema, df, index):
+        if self.load_method() == 'native':
+            conn = self.writer.connection.cursor()
+            try:
+                conn.register('_upload', df)
+                exists = conn.execute('SELECT COUNT(*) FROM information_schema.tables WHERE table_schema = ? AND table_name = ?', [schema, table_name]).fetchone()[0]
+                if exists:
+                    conn.execute(self._merge_delete(table_name, schema, '_upload', index))
+            finally:
+                conn.close()
+        else:
+            stage = f"_delete_{table_name}"
+            df.to_sql(stage, self.engine, if_exists='replace', index=False, schema=schema, method='multi', chunksize=1000)
+            with self.engine.connect() as conn:
+                try:
+                    conn.execute(text(self._merge_delete(table_name, schema, f'"{schema}"."{stage}"', index)))
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                finally:
+                    conn.execute(text(f'DROP TABLE IF EXISTS "{schema}"."{stage}"'))
+                    conn.commit()
+
+    def _create_schema(self, schema):
+        # Use native DuckDB connection for schema creation to avoid reflection warnings.  The insert
+        # method goes through the engine, as DuckDB won't mix connections with different configurations
+        if self.load_method() == 'native':
+            self.writer.connection.execute(f'CREATE SCHEMA IF NOT EXISTS "{schema}"')
+        else:
+            with self.engine.connect() as conn:
+                conn.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{schema}"'))
+                conn.commit()
+
+    def _insert(self, table_name, schema, df, tenancy, replace, index=None):
+        """Multi-row INSERT via to_sql on the SQLAlchemy engine"""
+        if index:
+            # -- load a stage table, then swap the matching rows for the staged ones in one transaction
+            stage = f"_stage_{table_name}"
+            df.to_sql(stage, self.engine, if_exists='replace', index=False, schema=schema, method='multi', chunksize=1000)
+            with self.engine.connect() as conn:
+                try:
+                    conn.execute(text(f'CREATE TABLE IF NOT EXISTS "{schema}"."{table_name}" AS SELECT * FROM "{schema}"."{stage}" LIMIT 0'))
+                    conn.execute(text(self._merge_delete(table_name, schema, f'"{schema}"."{stage}"', index)))
+                    conn.execute(text(f'INSERT INTO "{schema}"."{table_name}" BY NAME SELECT * FROM "{schema}"."{stage}"'))
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                finally:
+                    conn.execute(text(f'DROP TABLE IF EXISTS "{schema}"."{stage}"'))
+                    conn.commit()
+            return
+
+        # Delete existing rows for this tenant (no-op if table doesn't exist yet)
+        if replace:
             with self.engine.connect() as conn:
                 try:
                     conn.execute(text(f'DELETE FROM "{schema}"."{table_name}" WHERE tenancy = :tenancy'), {'tenancy': tenancy})
@@ -480,22 +1490,49 @@ class UploadDuckDB:
                 except Exception:
                     conn.rollback()
 
-            df.to_sql(
-                table_name,
-                self.engine,
-                if_exists='append',
-                index=False,
-                schema=schema,
-                method='multi',
-                chunksize=1000
-            )
+        df.to_sql(
+            table_name,
+            self.engine,
+            if_exists='append',
+            index=False,
+            schema=schema,
+            method='multi',
+            chunksize=1000
+        )
 
-            logging.info(f"Successfully uploaded {len(df)} rows to DuckDB table '{table_name}'")
+    def _merge_delete(self, table_name, schema, source, index):
+        """DELETE the rows of the table that have the same tenancy and index as a row in source"""
+        keys = ['tenancy'] + [c for c in index if c != 'tenancy']
+        match = ' AND '.join(f'"{schema}"."{table_name}"."{c}" = _merge."{c}"' for c in keys)
+        return f'DELETE FROM "{schema}"."{table_name}" USING (SELECT * FROM {source}) AS _merge WHERE {match}'
+
+    def _native(self, table_name, schema, df, tenancy, replace, index=None):
+        """Let DuckDB scan the DataFrame directly.  The table creation, tenancy delete and insert run in one transaction.
+        With an index, only the rows that match a new row are deleted, which makes it a merge"""
+        # -- DuckDB would type a column with only nulls as INTEGER, so keep those as VARCHAR like to_sql does
+        nulls = [col for col in df.columns if df[col].dtype == object and df[col].isna().all()]
+        select = 'SELECT * FROM _upload'
+        if nulls:
+            select = 'SELECT * REPLACE (' + ', '.join(f'CAST("{col}" AS VARCHAR) AS "{col}"' for col in nulls) + ') FROM _upload'
+
+        conn = self.writer.connection.cursor()
+        try:
+            conn.register('_upload', df)
+            conn.execute('BEGIN TRANSACTION')
+            try:
+                conn.execute(f'CREATE TABLE IF NOT EXISTS "{schema}"."{table_name}" AS {select} LIMIT 0')
+                if index:
+                    conn.execute(self._merge_delete(table_name, schema, '_upload', index))
+                elif replace:
+                    conn.execute(f'DELETE FROM "{schema}"."{table_name}" WHERE tenancy = ?', [tenancy])
+                conn.execute(f'INSERT INTO "{schema}"."{table_name}" BY NAME {select}')
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        finally:
+            conn.close()
 
-        except Exception as e:
-            logging.error(f"Failed to upload data to DuckDB for tag '{tag}': {e}")
-            raise
-    
     def is_available(self):
         """Check if DuckDB configuration is available"""
         try:
@@ -504,12 +1541,36 @@ class UploadDuckDB:
             return False
     
     def close(self):
-        """Clean up resources"""
+        """Clean up resources.  The DuckDB writer is shared by all plugins and is shut down by the runner"""
         if self._engine:
             self._engine.dispose()
             self._engine = None
             logging.info("DuckDB connection pool closed")
 
+def run_plugin(src: str, p: str, isolated: bool = False) -> tuple[str, str, str | None, int, float]:
+    """Run a single source plugin.  Returns the module name, its status, the error detail (if any), the rows
+    it collected and its run time in seconds.
+
+    With isolated, the plugin is running in its own worker process, which closes its database connections when it is done.
+    """
+    start = time.perf_counter()
+    C = Collector(managed=True)
+    m = p.replace('.py', '')
+    try:
+        getattr(importlib.import_module(f"{src}.{m}"), "Source")(C)
+        C.flush()
+        if C.write_errors:
+            detail = "; ".join(C.write_errors)
+            return m, "WRITE_FAILED", detail, sum(C.row_count.values()), time.perf_counter() - start
+        return m, "OK", None, sum(C.row_count.values()), time.perf_counter() - start
+    except Exception:
+        return m, "FAILED", traceback.format_exc(), sum(C.row_count.values()), time.perf_counter() - start
+    finally:
+        C.cleanup()
+        if isolated:
+            SinkRegistry.close()
+            HttpClient.close()
+
 if __name__=='__main__':
     load_dotenv('../.env')
     start_time = datetime.datetime.now()
@@ -517,42 +1578,63 @@ if __name__=='__main__':
     src = 'source'
 
     max_workers = int(os.environ.get('COLLECTOR_THREADS', 3))
-    if 'DUCKDB_FILE' in os.environ and os.environ['DUCKDB_FILE']:
-        if max_workers != 1:
-            logging.warning("DuckDB does not support concurrent writes. Limiting to 1 thread regardless of COLLECTOR_THREADS.")
-        max_workers = 1
 
-    logging.info(f"Running collector with {max_workers} thread(s).")
+    # -- plugins run on threads by default.  In process mode each plugin gets its own worker process, so CPU heavy
+    #    parsing in one plugin doesn't hold the GIL for the others
+    executor_mode = os.environ.get('COLLECTOR_EXECUTOR', 'thread').lower()
+    if executor_mode == 'process' and 'DUCKDB_FILE' in os.environ and os.environ['DUCKDB_FILE']:
+        logging.warning("DuckDB only allows one process to write to the database file. Running plugins on threads instead of processes.")
+        executor_mode = 'thread'
 
-    def run_plugin(p: str) -> tuple[str, str, str | None]:
-        C = Collector()
-        m = p.replace('.py', '')
-        try:
-            getattr(importlib.import_module(f"{src}.{m}"), "Source")(C)
-            if C.write_errors:
-                detail = "; ".join(C.write_errors)
-                return m, "WRITE_FAILED", detail
-            return m, "OK", None
-        except Exception:
-            return m, "FAILED", traceback.format_exc()
-        finally:
-            C.cleanup()
+    if executor_mode == 'process':
+        logging.info(f"Running collector with {max_workers} process(es).")
+        executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'), max_tasks_per_child=1)
+    else:
+        logging.info(f"Running collector with {max_workers} thread(s).")
+        executor = ThreadPoolExecutor(max_workers=max_workers)
 
-    plugins = sorted([f for f in os.listdir(src) if f.endswith('.py')])
+    plugins = sorted([f.replace('.py', '') for f in os.listdir(src) if f.endswith('.py')])
     table_status = []
     alert_instance = Alert()
 
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = {executor.submit(run_plugin, p): p for p in plugins}
-        for future in as_completed(futures):
-            m, status, tb = future.result()
-            table_status.append({"Module": m, "Status": status})
-            if status == "FAILED":
-                logging.error(f"Error running source: {m}\n{tb}")
-                alert_instance.send(f"Error running source: {m}\n{tb}", "ERROR")
-            elif status == "WRITE_FAILED":
-                logging.error(f"Write error in source: {m}: {tb}")
-                alert_instance.send(f"Write error in source: {m}: {tb}", "ERROR")
+    # -- start the longest plugins first, using the run times recorded by previous runs
+    state = StateStore()
+    if Collector.incremental() and not os.path.exists(state.path):
+        logging.warning(f"COLLECTOR_INCREMENTAL is set, but there is no state file at {state.path} yet - every table is loaded in full. "
+                        "If this shows up on every run, COLLECTOR_STATE_FILE is not on persistent storage")
+    scheduler = Scheduler(plugins, state, max_workers)
+    predicted = scheduler.predict()
+    scheduler.log_plan()
+
+    with executor:
+        futures = {}
+        while scheduler.pending or futures:
+            while len(futures) < max_workers:
+                p = scheduler.next()
+                if p is None:
+                    break
+                futures[executor.submit(run_plugin, src, f"{p}.py", executor_mode == 'process')] = p
+
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                p = futures.pop(future)
+                scheduler.done(p)
+                try:
+                    m, status, tb, rows, duration = future.result()
+                except Exception:
+                    # -- the worker process died before it could report back
+                    m, status, tb, rows, duration = p, "FAILED", traceback.format_exc(), 0, 0.0
+                state.record_plugin(m, status, duration, rows)
+                table_status.append({"Module": m, "Status": status, "Rows": rows, "Duration": duration})
+                if status == "FAILED":
+                    logging.error(f"Error running source: {m}\n{tb}")
+                    alert_instance.send(f"Error running source: {m}\n{tb}", "ERROR")
+                elif status == "WRITE_FAILED":
+                    logging.error(f"Write error in source: {m}: {tb}")
+                    alert_instance.send(f"Write error in source: {m}: {tb}", "ERROR")
+
+    SinkRegistry.close()
+    HttpClient.close()
 
     table_status.sort(key=lambda x: x["Module"])
     counter_total = len(table_status)
@@ -562,9 +1644,10 @@ if __name__=='__main__':
     time_elapsed = datetime.datetime.now() - start_time
     logging.info("------------------------------------------")
     for i in table_status:
-        logging.info(f"{i['Module']:<20} - {i['Status']}")
+        logging.info(f"{i['Module']:<20} - {i['Status']:<12} {i['Rows']:>10} rows {i['Duration']:>8.1f}s")
 
     elapsed = int(time_elapsed.total_seconds())
+    logging.info(f"Run time - predicted {predicted:.0f} seconds, actual {elapsed} seconds")
     if counter_total == counter_ok:
         logging.info("SUCCESS")
         logging.info("------------------------------------------")
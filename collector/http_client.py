@@ -0,0 +1,174 @@
+import os
+import time
+import logging
+import threading
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from ratelimit import RateLimiter, retry_after
+from replay import Recorder, fixture_key
+
+class HttpClient:
+    """Process wide HTTP client shared by the source plugins.
+
+    Each host gets its own requests.Session, so the TCP and TLS connections are kept alive
+    and reused from one page to the next.  The connection pool of each host is sized to
+    COLLECTOR_THREADS, and responses are requested gzip compressed.
+
+    The client also does the retrying:
+
+    * connection errors and timeouts are retried after 5 seconds
+    * 429 (too many requests) responses wait for Retry-After or X-Rate-Limit-Reset when the
+      API sends them, or back off exponentially when it doesn't
+
+    Requests can be paced with a ratelimit.RateLimiter (limiter=...), which is fed the rate
+    limit headers of every response, so the API's quota is spread over the workers calling it.
+
+    The number of requests, retries and the time spent on each host are logged by close().
+
+    For offline tests and benchmarks the responses can be recorded to a fixture directory
+    (COLLECTOR_HTTP_RECORD), and the requests sent to a replay.ReplayServer serving them
+    (COLLECTOR_HTTP_REPLAY, the url of the server) instead of the vendor.
+    """
+    _instance_lock = threading.Lock()
+    _instance = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._stats = {}
+        self.recorder = Recorder(os.environ['COLLECTOR_HTTP_RECORD']) if os.environ.get('COLLECTOR_HTTP_RECORD') else None
+        self.replay = os.environ.get('COLLECTOR_HTTP_REPLAY', '').rstrip('/') or None
+
+    @classmethod
+    def shared(cls):
+        """The client of this process, created on first use"""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    @staticmethod
+    def pool_size():
+        return max(1, int(os.environ.get('COLLECTOR_THREADS', 3)))
+
+    def session(self, url):
+        """The pooled session for the host of a URL"""
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._sessions:
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size())
+                s.mount('https://', adapter)
+                s.mount('http://', adapter)
+                s.headers['Accept-Encoding'] = 'gzip, deflate'
+                self._sessions[host] = s
+                self._stats[host] = {'requests': 0, 'retries': 0, 'rate_limited': 0, 'errors': 0, 'seconds': 0.0}
+            return self._sessions[host]
+
+    def _record(self, url, elapsed=0.0, retry=False, rate_limited=False, error=False):
+        host = urlparse(url).netloc
+        with self._lock:
+            stats = self._stats[host]
+            stats['requests'] += 1
+            stats['seconds'] += elapsed
+            stats['retries'] += retry
+            stats['rate_limited'] += rate_limited
+            stats['errors'] += error
+
+    def request(self, method, url, retries=5, connect_retries=2, backoff=15, raise_for_status=False, limiter=None, **kwargs):
+        """Send a request, retrying connection errors and 429 responses.  With a limiter, the request waits for its turn first.
+
+        Returns the response - after the last retry that can still be a 429, unless raise_for_status is set,
+        in which case any 4xx / 5xx response raises requests.exceptions.HTTPError.
+        """
+        kwargs.setdefault('timeout', 30)
+        session = self.session(url)
+        if self.recorder or self.replay:
+            # -- fixtures are keyed on the full url, including the query parameters
+            url = requests.Request(method, url, params=kwargs.pop('params', None)).prepare().url
+        target = url
+        if self.replay:
+            _, host, path = fixture_key(method, url)
+            target = f"{self.replay}/{host}{path}"
+        connect_attempts = 0
+        rate_limit_attempts = 0
+
+        while True:
+            if limiter is not None:
+                limiter.acquire()
+            start = time.perf_counter()
+            try:
+                response = session.request(method, target, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+                connect_attempts += 1
+                self._record(url, time.perf_counter() - start, retry=connect_attempts <= connect_retries, error=True)
+                if connect_attempts <= connect_retries:
+                    logging.warning(f"Connection error (attempt {connect_attempts}/{connect_retries + 1}). Retrying in 5s: {e}")
+                    time.sleep(5)
+                    continue
+                if connect_retries:
+                    logging.error(f"Connection failed after {connect_retries + 1} attempts for {url}: {e}")
+                raise
+
+            if self.recorder:
+                self.recorder.record(method, url, response)
+
+            rate_limited = response.status_code == 429
+            rate_limit_attempts += rate_limited
+            retry = rate_limited and rate_limit_attempts <= retries
+            self._record(url, time.perf_counter() - start, retry=retry, rate_limited=rate_limited)
+            if limiter is not None:
+                limiter.update(response.headers)
+
+            if retry:
+                wait = retry_after(response.headers, min(backoff * 2 ** (rate_limit_attempts - 1), 300))
+                logging.warning(f"Rate limit hit (429) on {urlparse(url).netloc}. Waiting {wait:.0f}s (attempt {rate_limit_attempts}/{retries}).")
+                if limiter is not None:
+                    # -- hold back every worker calling this API, not just this one
+                    limiter.pause(wait)
+                else:
+                    time.sleep(wait)
+                continue
+            if rate_limited and retries:
+                logging.error(f"Rate limit retries exhausted after {retries} attempts for {url}")
+
+            if raise_for_status:
+                response.raise_for_status()
+            return response
+
+    @staticmethod
+    def limiter(name, limits=(), **kwargs):
+        """The shared ratelimit.RateLimiter of an API - see RateLimiter.shared()"""
+        return RateLimiter.shared(name, limits, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def stats(self):
+        """Requests per host, with the average latency in seconds"""
+        with self._lock:
+            return {
+                host: {**s, 'seconds': round(s['seconds'], 3), 'average': round(s['seconds'] / s['requests'], 3) if s['requests'] else 0.0}
+                for host, s in self._stats.items()
+            }
+
+    def log_stats(self):
+        for host, s in sorted(self.stats().items()):
+            logging.info(f"HTTP {host:<40} - {s['requests']:>6} requests {s['average']:>7.3f}s average, {s['retries']} retries ({s['rate_limited']} rate limited)")
+
+    @classmethod
+    def close(cls):
+        """Log the per host statistics and close the pooled connections"""
+        with cls._instance_lock:
+            client, cls._instance = cls._instance, None
+        if client is None:
+            return
+        client.log_stats()
+        for s in client._sessions.values():
+            s.close()
+        if client.recorder:
+            client.recorder.close()
@@ -0,0 +1,100 @@
+import json
+import pandas as pd
+
+# -- conversions that can be named in a spec.  Any other function of one value can be used as well
+TYPES = {
+    'bool'          : lambda v: v == True,
+    'boolean'       : lambda v: pd.NA if v is None else bool(v),
+    'float'         : lambda v: float(v or 0),
+    'json'          : json.dumps,
+    'json_nonempty' : lambda v: json.dumps(v) if v else None,
+    'enabled'       : lambda v: str(v).lower() not in ('no', 'false', '', 'none'),
+}
+
+class Mapper:
+    """Turns API records (nested dicts) into the columns of a table, from a declarative spec.
+
+    The spec is a dict of column -> field, where the field is
+
+    * a path into the record, with a dot between the keys, e.g. 'plugin.cvss3.base_score'.
+      A number picks an item from a list, e.g. 'sources.0.name' (None when the list is empty)
+    * or a (path, type) or (path, type, default) tuple, where the type is the name of one of
+      the TYPES or a function, and is applied to the value (or to the default when the last
+      key is missing).  Use None as the type to only set a default
+
+    A missing key anywhere along the path gives None.  The spec is compiled once into a
+    function that walks each shared part of the paths (e.g. 'plugin') only once per record,
+    and appends the values straight to one list per column.
+    """
+
+    def __init__(self, spec):
+        self.spec = dict(spec)
+        self.columns = list(self.spec)
+        self._extract = self._compile()
+
+    @staticmethod
+    def _field(field):
+        if isinstance(field, str):
+            return field, None, None
+        path, convert, *default = field
+        return path, convert, default[0] if default else None
+
+    def _compile(self):
+        namespace = {}
+        nodes = {}
+        walk = []
+        values = []
+
+        def node(parts, next_part):
+            # -- local variable holding the value at a path, walked once for every column below it
+            key = tuple(parts)
+            if not key:
+                return 'item'
+            if key not in nodes:
+                parent = node(parts[:-1], parts[-1])
+                empty = '()' if next_part.isdigit() else '{}'
+                nodes[key] = name = f"n{len(nodes)}"
+                if parts[-1].isdigit():
+                    i = int(parts[-1])
+                    walk.append(f"        {name} = ({parent}[{i}] if len({parent}) > {i} else None) or {empty}")
+                else:
+                    walk.append(f"        {name} = {parent}.get({parts[-1]!r}) or {empty}")
+            return nodes[key]
+
+        for i, column in enumerate(self.columns):
+            path, convert, default = self._field(self.spec[column])
+            parts = path.split('.')
+            parent = node(parts[:-1], parts[-1])
+            namespace[f"d{i}"] = default
+            if parts[-1].isdigit():
+                index = int(parts[-1])
+                value = f"({parent}[{index}] if len({parent}) > {index} else d{i})"
+            else:
+                value = f"{parent}.get({parts[-1]!r}, d{i})"
+            if convert is not None:
+                namespace[f"c{i}"] = TYPES[convert] if isinstance(convert, str) else convert
+                value = f"c{i}({value})"
+            values.append(f"        a{i}({value})")
+
+        code = "\n".join(
+            ["def extract(items):"]
+            + [f"    v{i} = []; a{i} = v{i}.append" for i in range(len(self.columns))]
+            + ["    for item in items:"]
+            + walk
+            + values
+            + [f"    return [{', '.join(f'v{i}' for i in range(len(self.columns)))}]"]
+        )
+        exec(compile(code, f"<mapper {self.columns[0] if self.columns else ''}>", 'exec'), namespace)
+        return namespace['extract']
+
+    def columns_of(self, items):
+        """The values of every column, as a {column: list} dict"""
+        return dict(zip(self.columns, self._extract(items)))
+
+    def frame(self, items):
+        """A DataFrame with one row per record"""
+        return pd.DataFrame(self.columns_of(items), columns=self.columns)
+
+    def record(self, item):
+        """One record as a {column: value} dict - e.g. the blank record for write_blank"""
+        return {column: values[0] for column, values in self.columns_of([item]).items()}
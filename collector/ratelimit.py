@@ -0,0 +1,150 @@
+import time
+import logging
+import threading
+import email.utils
+
+def _header(headers, *names):
+    for name in names:
+        if headers.get(name) not in (None, ''):
+            return headers[name]
+    return None
+
+def _seconds_until(value, now):
+    """Seconds from now until an epoch timestamp.  Small values are already a number of seconds"""
+    value = float(value)
+    return value - now if value > 1e9 else value
+
+def retry_after(headers, default):
+    """Seconds to wait before retrying a 429, from the response headers when the API sends them"""
+    headers = {k.lower(): v for k, v in (headers or {}).items()}
+    now = time.time()
+    value = _header(headers, 'retry-after')
+    if value:
+        try:
+            return max(float(value), 1)
+        except ValueError:
+            try:
+                return max(email.utils.parsedate_to_datetime(value).timestamp() - now, 1)
+            except (TypeError, ValueError):
+                pass
+    value = _header(headers, 'x-ratelimit-retryafter', 'x-rate-limit-reset', 'x-ratelimit-reset')
+    if value:
+        try:
+            return max(_seconds_until(value, now) + 1, 1)
+        except ValueError:
+            pass
+    return default
+
+class TokenBucket:
+    """Allows `rate` requests every `per` seconds, refilling continuously"""
+
+    def __init__(self, rate, per):
+        self.rate = rate
+        self.per = per
+        self.tokens = float(rate)
+        self.updated = time.monotonic()
+
+    def wait_time(self, now):
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate / self.per)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) * self.per / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+class RateLimiter:
+    """Paces the requests to one API, shared by every thread that calls it.
+
+    Two things decide when the next request can go:
+
+    * fixed limits - a token bucket for each (requests, seconds) window the API documents,
+      e.g. [(4, 1), (50, 60)] for 4 per second and 50 per minute
+    * the rate limit headers of the API's responses - X-Rate-Limit-Remaining / Reset (Okta),
+      X-RateLimit-Remaining / Limit / RetryAfter (CrowdStrike) and Retry-After.  Once less than
+      half of the quota is left the remaining requests are spread out until the window resets,
+      and when only `reserve` requests are left the callers wait for the reset, so the API is
+      never pushed into returning 429s.
+
+    A 429 (or pause()) holds back every caller, not just the one that got it.
+    """
+    _registry_lock = threading.Lock()
+    _registry = {}
+    retry_after = staticmethod(retry_after)
+
+    def __init__(self, name, limits=(), reserve=1, window=60):
+        self.name = name
+        self.buckets = [TokenBucket(rate, per) for rate, per in limits]
+        self.reserve = reserve
+        self.window = window
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+        self._remaining = None
+        self._limit = None
+        self._reset = None
+        self._last = 0.0
+
+    @classmethod
+    def shared(cls, name, limits=(), **kwargs):
+        """The limiter of an API, created on first use.  Every caller of the API in the process gets the same one"""
+        with cls._registry_lock:
+            if name not in cls._registry:
+                cls._registry[name] = cls(name, limits, **kwargs)
+            return cls._registry[name]
+
+    def _delay(self, now):
+        delay = self._paused_until - now
+        for bucket in self.buckets:
+            delay = max(delay, bucket.wait_time(now))
+        if self._remaining is not None:
+            if now >= self._reset:
+                # -- the window has reset, so the quota is back until the API says otherwise
+                self._remaining = None
+            elif self._remaining <= self.reserve:
+                delay = max(delay, self._reset - now)
+            elif self._limit and self._remaining < self._limit / 2:
+                interval = (self._reset - now) / (self._remaining - self.reserve)
+                delay = max(delay, self._last + interval - now)
+        return delay
+
+    def acquire(self):
+        """Block until the next request can be sent.  Returns the number of seconds waited"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                delay = self._delay(now)
+                if delay <= 0:
+                    for bucket in self.buckets:
+                        bucket.take()
+                    if self._remaining is not None:
+                        self._remaining -= 1
+                    self._last = now
+                    return waited
+            if delay > 5:
+                logging.info(f"{self.name} - rate limit quota used up, waiting {delay:.0f}s")
+            time.sleep(delay)
+            waited += delay
+
+    def update(self, headers):
+        """Learn the remaining quota from the rate limit headers of a response"""
+        headers = {k.lower(): v for k, v in (headers or {}).items()}
+        remaining = _header(headers, 'x-rate-limit-remaining', 'x-ratelimit-remaining')
+        if remaining is None:
+            return
+        limit = _header(headers, 'x-rate-limit-limit', 'x-ratelimit-limit')
+        reset = _header(headers, 'x-rate-limit-reset', 'x-ratelimit-reset')
+        try:
+            remaining = int(remaining)
+            limit = int(limit) if limit is not None else None
+            reset_in = _seconds_until(reset, time.time()) if reset is not None else self.window
+        except ValueError:
+            return
+        with self._lock:
+            self._remaining = remaining
+            self._limit = limit
+            self._reset = time.monotonic() + max(reset_in, 0)
+
+    def pause(self, seconds):
+        """Hold back every caller for a number of seconds, e.g. after a 429"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
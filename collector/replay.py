@@ -0,0 +1,229 @@
+import os
+import re
+import gzip
+import json
+import time
+import random
+import logging
+import threading
+from urllib.parse import urlsplit
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# -- response headers that describe the encoding of the recorded body, and are set again when it is served
+SKIP_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection', 'keep-alive', 'set-cookie'}
+
+# -- query parameter of the next page links the replay server adds when it re-pages a response (<recording>.<page>)
+PAGE_PARAM = '_replay_page'
+
+def fixture_key(method, url):
+    """The method, host and path + query a response is recorded under"""
+    parts = urlsplit(url)
+    path = parts.path or '/'
+    return method.upper(), parts.netloc, f"{path}?{parts.query}" if parts.query else path
+
+class Recorder:
+    """Saves the API responses the collector receives, so they can be served again by ReplayServer.
+
+    Every response is appended to a gzip compressed JSON lines file per host and process in
+    the fixture directory (COLLECTOR_HTTP_RECORD), so plugins running in worker processes
+    never write to the same file.  Each file is kept open until close().  Request headers
+    (and so the API credentials) are not recorded, and neither are cookies.
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        self._lock = threading.Lock()
+        self._files = {}
+        os.makedirs(folder, exist_ok=True)
+
+    def path(self, host):
+        return os.path.join(self.folder, f"{host.replace(':', '_')}.{os.getpid()}.jsonl.gz")
+
+    def record(self, method, url, response):
+        method, host, path = fixture_key(method, url)
+        line = json.dumps({
+            'method'    : method,
+            'host'      : host,
+            'path'      : path,
+            'status'    : response.status_code,
+            'headers'   : {k: v for k, v in response.headers.items() if k.lower() not in SKIP_HEADERS},
+            'body'      : response.text,
+        })
+        with self._lock:
+            if host not in self._files:
+                # -- gzip members can be appended to, and are read back as one stream
+                self._files[host] = gzip.open(self.path(host), 'at', encoding='utf-8')
+            self._files[host].write(line + '\n')
+
+    def close(self):
+        with self._lock:
+            files, self._files = self._files, {}
+        for f in files.values():
+            f.close()
+
+class Fixtures:
+    """The recorded responses of a fixture directory, served in the order they were recorded.
+
+    A request is matched on its method, host, path and query.  When the query doesn't match
+    any recording (e.g. it holds a timestamp) the recordings of the same path are used instead.
+    When a request is repeated more often than it was recorded, the last response is repeated.
+    """
+
+    def __init__(self, folder):
+        self.recordings = []
+        self.exact = {}
+        self.by_path = {}
+        self._served = {}
+        self._lock = threading.Lock()
+        for name in sorted(os.listdir(folder)):
+            if not name.endswith('.jsonl.gz'):
+                continue
+            with gzip.open(os.path.join(folder, name), 'rt', encoding='utf-8') as f:
+                for line in f:
+                    r = json.loads(line)
+                    r['_id'] = len(self.recordings)
+                    self.recordings.append(r)
+                    self.exact.setdefault((r['method'], r['host'], r['path']), []).append(r)
+                    self.by_path.setdefault((r['method'], r['host'], r['path'].split('?')[0]), []).append(r)
+
+    def __len__(self):
+        return len(self.recordings)
+
+    def match(self, method, host, path):
+        key = (method, host, path)
+        recordings = self.exact.get(key)
+        if recordings is None:
+            key = (method, host, path.split('?')[0])
+            recordings = self.by_path.get(key)
+        if not recordings:
+            return None
+        with self._lock:
+            n = self._served.get(key, 0)
+            self._served[key] = n + 1
+        return recordings[min(n, len(recordings) - 1)]
+
+class ReplayServer:
+    """Local stand-in for the vendor APIs, serving the responses of a fixture directory.
+
+    The collector sends its requests to http://127.0.0.1:<port>/<host>/<path> when
+    COLLECTOR_HTTP_REPLAY is set to the server's url (see HttpClient).  The links to the next
+    page in the recorded responses still point to the vendor, and are rewritten the same way
+    when they are requested, so pagination follows the recording.
+
+    To test the collector against a slow or busy API, the server can add a latency (in
+    seconds, plus a random jitter) to every response, and answer every n-th request with a
+    429 and a Retry-After of `retry_after` seconds.
+
+    With a page_size, recorded pages with more records than that are served again in pages of
+    page_size records, with a link to the next one: a Link rel="next" header for a JSON list
+    (e.g. Okta), or @odata.nextLink for a {"value": [...]} body (e.g. Microsoft Graph).  The
+    last page keeps the recording's own link, so pagination carries on with the next recorded
+    page.  This turns a recording into many more, smaller pages.
+    """
+
+    def __init__(self, folder, latency=0.0, jitter=0.0, rate_limit_every=0, retry_after=1, page_size=0, port=0):
+        self.fixtures = Fixtures(folder)
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.page_size = page_size
+        self.requests = 0
+        self.misses = 0
+        self.rate_limited = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _serve(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                if length:
+                    self.rfile.read(length)
+                status, headers, body = server.respond(self.command, self.path)
+                body = body.encode('utf-8')
+                self.send_response(status)
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _serve
+
+            def log_message(self, format, *args):
+                logging.debug(f"replay - {format % args}")
+
+        return Handler
+
+    def respond(self, method, path):
+        """The status, headers and body for a request to /<host>/<path>"""
+        host, _, rest = path.lstrip('/').partition('/')
+        with self._lock:
+            self.requests += 1
+            throttle = self.rate_limit_every and self.requests % self.rate_limit_every == 0
+            self.rate_limited += bool(throttle)
+        if self.latency or self.jitter:
+            time.sleep(self.latency + random.uniform(0, self.jitter))
+        if throttle:
+            return 429, {'Retry-After': str(self.retry_after), 'Content-Type': 'application/json'}, '{"error": "rate limited by the replay server"}'
+
+        page = re.match(rf'^(.*)[?&]{PAGE_PARAM}=(\d+)\.(\d+)$', rest)
+        if page:
+            # -- a next page added by repage(), of the recording it names
+            rest, recording, n = page.group(1), self.fixtures.recordings[int(page.group(2))], int(page.group(3))
+        else:
+            recording, n = self.fixtures.match(method, host, f"/{rest}"), 0
+        if recording is None:
+            with self._lock:
+                self.misses += 1
+            logging.warning(f"replay - no recording for {method} {host}/{rest}")
+            return 404, {'Content-Type': 'application/json'}, '{"error": "not recorded"}'
+        if self.page_size:
+            return self.repage(recording, host, rest, n)
+        return recording['status'], recording['headers'], recording['body']
+
+    def repage(self, recording, host, path, n):
+        """Page n (from 0) of a recorded response, split in pages of page_size records"""
+        try:
+            body = json.loads(recording['body'])
+        except ValueError:
+            body = None
+        items = body if isinstance(body, list) else body.get('value') if isinstance(body, dict) else None
+        if not isinstance(items, list) or len(items) <= self.page_size:
+            return recording['status'], recording['headers'], recording['body']
+
+        start = n * self.page_size
+        headers = dict(recording['headers'])
+        page = items[start:start + self.page_size]
+        body = page if isinstance(body, list) else {**body, 'value': page}
+        if start + self.page_size < len(items):
+            # -- the link points to the vendor, like the recorded ones, and the collector sends it back here
+            link = f"https://{host}/{path}{'&' if '?' in path else '?'}{PAGE_PARAM}={recording['_id']}.{n + 1}"
+            if isinstance(body, list):
+                headers = {k: v for k, v in headers.items() if k.lower() != 'link'}
+                headers['Link'] = f'<{link}>; rel="next"'
+            else:
+                body['@odata.nextLink'] = link
+        return recording['status'], headers, json.dumps(body)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='replay-server', daemon=True)
+        self._thread.start()
+        logging.info(f"Replay server on {self.url} - {len(self.fixtures)} recorded responses")
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
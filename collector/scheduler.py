@@ -0,0 +1,84 @@
+import os
+import logging
+
+class Scheduler:
+    """Decides the order the plugins are started in.
+
+    Plugins are started longest first, using an exponential moving average (EMA) of their run
+    times from the state file, so a long plugin never starts last and sets the length of the
+    whole run.  Each run counts for half of the EMA, so it follows a plugin that got slower
+    (or faster) within a few runs.  Plugins
+    without any history are started first, as they could be the longest.
+
+    Plugins that share a concurrency class never run at the same time, e.g. two plugins
+    that call the same rate-limited API.  Classes are set with COLLECTOR_CONCURRENCY_CLASSES
+    as a comma separated list of plugin:class pairs.  Every other plugin is in a class of its own.
+    """
+
+    def __init__(self, plugins, state, workers):
+        self.workers = max(1, workers)
+        self.history = {p: state.plugin_stats(p).get('average') for p in plugins}
+        known = [d for d in self.history.values() if d is not None]
+        self.unknown = max(known) if known else 0
+        self.classes = self.concurrency_classes()
+        self.pending = sorted(plugins, key=lambda p: (-self.estimate(p), p))
+        self.running = set()
+
+    @staticmethod
+    def concurrency_classes():
+        classes = {}
+        for pair in os.environ.get('COLLECTOR_CONCURRENCY_CLASSES', '').split(','):
+            if ':' in pair:
+                plugin, cls = pair.split(':', 1)
+                classes[plugin.strip()] = cls.strip()
+        return classes
+
+    def concurrency_class(self, plugin):
+        return self.classes.get(plugin, plugin)
+
+    def estimate(self, plugin):
+        '''Expected run time (seconds) of a plugin'''
+        duration = self.history.get(plugin)
+        return self.unknown if duration is None else duration
+
+    def _pick(self, pending, running):
+        '''First plugin in the list whose concurrency class isn't running'''
+        busy = {self.concurrency_class(p) for p in running}
+        for plugin in pending:
+            if self.concurrency_class(plugin) not in busy:
+                return plugin
+        return None
+
+    def next(self):
+        '''The next plugin to start, or None when nothing can start until a running plugin finishes'''
+        plugin = self._pick(self.pending, self.running)
+        if plugin is not None:
+            self.pending.remove(plugin)
+            self.running.add(plugin)
+        return plugin
+
+    def done(self, plugin):
+        self.running.discard(plugin)
+
+    def predict(self):
+        '''Simulate the run with the estimated run times, and return the expected makespan (seconds)'''
+        pending = list(self.pending)
+        running = []
+        clock = 0
+        while pending or running:
+            while len(running) < self.workers:
+                plugin = self._pick(pending, [p for _, p in running])
+                if plugin is None:
+                    break
+                pending.remove(plugin)
+                running.append((clock + self.estimate(plugin), plugin))
+            running.sort()
+            clock, _ = running.pop(0)
+        return clock
+
+    def log_plan(self):
+        missing = [p for p, d in self.history.items() if d is None]
+        logging.info(f"Plugin order : {', '.join(self.pending)}")
+        if missing:
+            logging.info(f"No run history for {', '.join(missing)}")
+        logging.info(f"Predicted run time : {self.predict():.0f} seconds (from the EMA of each plugin's run times)")
@@ -15,6 +15,11 @@ class Source:
     def __init__(self,C):
         self.collector = C
 
+        # -- timestamps are kept as the API's strings in the records, and converted by the collector
+        C.set_timestamps('azure_entra_users', {'created_date_time': '%Y-%m-%dT%H:%M:%SZ', 'last_password_change_date_time': '%Y-%m-%dT%H:%M:%SZ'})
+        C.set_timestamps('azure_entra_users_signin', {'created_date_time': 'ISO8601'})
+        C.set_timestamps('azure_audit_logs', {'activity_date_time': '%Y-%m-%dT%H:%M:%S'})
+
         if C.env({
             'AZURE_TENANT_ID' : None,
             'AZURE_CLIENT_ID' : None,
@@ -53,8 +58,8 @@ class Source:
             "preferred_language"             : item.get("preferredLanguage"),
             "account_enabled"                : bool(item.get("accountEnabled")),
             "user_type"                      : item.get("userType"),
-            "created_date_time"              : datetime.strptime(item.get("createdDateTime"), '%Y-%m-%dT%H:%M:%SZ') if item.get("createdDateTime") else pd.NaT,
-            "last_password_change_date_time" : datetime.strptime(item.get("lastPasswordChangeDateTime"), '%Y-%m-%dT%H:%M:%SZ') if item.get("lastPasswordChangeDateTime") else pd.NaT,
+            "created_date_time"              : item.get("createdDateTime"),
+            "last_password_change_date_time" : item.get("lastPasswordChangeDateTime"),
         }
     
     def users(self):
@@ -69,16 +74,29 @@ class Source:
     def _signin(self,item):
         return {
             "user_principal_name" : item.get("userPrincipalName"),
-            "created_date_time"   : datetime.strptime(item.get("createdDateTime"), '%Y-%m-%dT%H:%M:%SZ') if item.get("createdDateTime") else pd.NaT,
+            "created_date_time"   : item.get("createdDateTime"),
         }
 
     def signin(self,days = 180):
         cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
         formatted_date = cutoff_date.strftime('%Y-%m-%dT%H:%M:%SZ')
-        data = self._paginate(f'https://graph.microsoft.com/v1.0/auditLogs/signIns?$select=userPrincipalName,createdDateTime&$filter=createdDateTime ge {formatted_date}')
+
+        # -- with incremental collection, only fetch the sign-ins from the newest one we loaded.  The sign-ins at the
+        #    watermark itself are fetched again, and merged on the user and time so they aren't loaded twice.  The
+        #    sign-ins older than the window are deleted from the table once the new ones are loaded
+        since = self.collector.since('azure_entra_users_signin')
+        self.collector.set_retention('azure_entra_users_signin', 'created_date_time', timedelta(days=days))
+        if since:
+            self.collector.set_mode('azure_entra_users_signin', 'index', ['user_principal_name', 'created_date_time'])
+            data = self._paginate(f'https://graph.microsoft.com/v1.0/auditLogs/signIns?$select=userPrincipalName,createdDateTime&$filter=createdDateTime ge {since}')
+        else:
+            data = self._paginate(f'https://graph.microsoft.com/v1.0/auditLogs/signIns?$select=userPrincipalName,createdDateTime&$filter=createdDateTime ge {formatted_date}')
         if data:
             df = pd.DataFrame([self._signin(item) for item in data ])
             self.collector.store_df('azure_entra_users_signin', df)
+            newest = df['created_date_time'].max()
+            if pd.notna(newest):
+                self.collector.set_watermark('azure_entra_users_signin', newest.strftime('%Y-%m-%dT%H:%M:%S.%fZ'))
             return df
         else:
             return pd.DataFrame()
@@ -87,7 +105,7 @@ class Source:
         return {
             "id"                    : item.get("id"),
             "activity_display_name" : item.get("activityDisplayName"),
-            "activity_date_time"    : datetime.strptime(item.get("activityDateTime").split('.')[0].replace('Z',''), '%Y-%m-%dT%H:%M:%S') if item.get("activityDateTime") else pd.NaT,
+            "activity_date_time"    : item.get("activityDateTime"),
             "user_principal_name"   : item.get("targetResources",[{}])[0].get("userPrincipalName"),
             "initiated_by"          : item.get("initiatedBy",{}).get("user",{}).get("userPrincipalName") if item.get("initiatedBy",{}).get("user") != None else item.get("initiatedBy",{}).get("app",{}).get("displayName") 
         }
@@ -102,7 +120,6 @@ class Source:
             return pd.DataFrame()
             
     def _authenticate(self,graph_url):
-        s = requests.Session()
         auth_url = f"https://login.microsoftonline.com/{os.environ['AZURE_TENANT_ID']}/oauth2/v2.0/token"
         auth_data = {
             "grant_type": "client_credentials",
@@ -114,28 +131,22 @@ class Source:
             "Content-Type": "application/x-www-form-urlencoded",
             "cache-control": "no-cache",
         }
-        res = s.post(auth_url, data=auth_data, headers=auth_headers)
+        res = self.collector.http.post(auth_url, data=auth_data, headers=auth_headers)
 
         if res.status_code != 200:
             logging.error(f"Azure auth failed: {res.status_code} - {res.json().get('error_description')}")
             raise RuntimeError(f"Azure authentication returned {res.status_code}")
 
         access_token = res.json().get("access_token")
-        s.headers = {"Authorization": f"Bearer {access_token}", "cache-control": "no-cache"}
-        return s
+        return {"Authorization": f"Bearer {access_token}", "cache-control": "no-cache"}
 
     def _paginate(self, graph_url, auth_url='https://graph.microsoft.com'):
         logging.info(f"=> {graph_url}")
-        session = self._authenticate(auth_url)
+        headers = self._authenticate(auth_url)
         data = []
         while True:
-            ret = session.get(graph_url)
-            if ret.status_code == 429:
-                wait = int(ret.headers.get('Retry-After', 60))
-                logging.warning(f"Azure rate limit hit. Waiting {wait}s.")
-                import time
-                time.sleep(wait)
-                continue
+            # -- the pooled client waits out 429s using Retry-After
+            ret = self.collector.http.get(graph_url, headers=headers, backoff=60)
             if ret.status_code != 200:
                 logging.error(f"Azure API error: {ret.status_code} - {ret.text}")
                 raise RuntimeError(f"Azure Graph API returned {ret.status_code}")
@@ -156,4 +167,5 @@ if __name__ == '__main__':
     sys.path.append("./")
     from collector import Collector
     C = Collector()
-    S = Source(C)
\ No newline at end of file
+    S = Source(C)
+    sys.exit(C.close())
@@ -1,4 +1,4 @@
-from falconpy import Hosts, SpotlightVulnerabilities, ZeroTrustAssessment, HostGroup
+from falconpy import OAuth2, Hosts, SpotlightVulnerabilities, ZeroTrustAssessment, HostGroup
 
 class SpotlightCursorExpiredError(Exception):
     """Raised when the Spotlight pagination cursor has expired (404)."""
@@ -9,6 +9,10 @@ from dotenv import load_dotenv
 import logging
 import sys
 import os
+import threading
+import functools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import requests
 
 logging.basicConfig(
@@ -16,14 +20,55 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s: %(message)s'
 )
 
+# -- column -> path into the device details of the Hosts API (see mapping.Mapper)
+HOSTS = {
+    "client_id"                  : "cid",
+    "device_id"                  : "device_id",
+    "hostname"                   : "hostname",
+    "kernel_version"             : "kernel_version",
+    "last_login_timestamp"       : "last_login_timestamp",
+    "local_ip"                   : "local_ip",
+    "mac_address"                : "mac_address",
+    "last_login_uid"             : "last_login_uid",
+    "last_login_user"            : "last_login_user",
+    "first_seen"                 : "first_seen",
+    "last_seen"                  : "last_seen",
+    "os_build"                   : "os_build",
+    "os_version"                 : "os_version",
+    "platform_name"              : "platform_name",
+    "provision_status"           : "provision_status",
+    "reduced_functionality_mode" : ("reduced_functionality_mode", "enabled"),
+    "serial_number"              : "serial_number",
+    "host_status"                : "status",
+    "system_manufacturer"        : "system_manufacturer",
+    "system_product_name"        : "system_product_name",
+}
+
 class Source:
     def __init__(self, C):
         self.collector = C
+        # -- every Falcon API call is paced on the X-RateLimit-* headers of the previous responses
+        self.limiter = C.http.limiter('crowdstrike')
+        self.host_mapper = C.mapper(HOSTS)
+
+        # -- timestamps are kept as the API's strings in the mappers, and converted by the collector
+        C.set_timestamps('crowdstrike_hosts', {c: '%Y-%m-%dT%H:%M:%SZ' for c in ('last_login_timestamp', 'first_seen', 'last_seen')})
+        C.set_timestamps('crowdstrike_host_groups', {'created_timestamp': '%Y-%m-%dT%H:%M:%S', 'modified_timestamp': '%Y-%m-%dT%H:%M:%S'})
+        C.set_timestamps('crowdstrike_vulnerabilities', {c: '%Y-%m-%dT%H:%M:%SZ' for c in ('created_at', 'updated_at', 'published_on', 'spotlight_published_at')})
+        C.set_timestamps('crowdstrike_zero_trust_assessment', {'modified_time': '%Y-%m-%dT%H:%M:%SZ'})
         
         if C.env({
                 'FALCON_CLIENT_ID': None,
                 'FALCON_SECRET': None
             }):
+            # -- one OAuth2 token for every service class, renewed shortly before it expires
+            self.auth = OAuth2(
+                client_id=os.environ["FALCON_CLIENT_ID"],
+                client_secret=os.environ["FALCON_SECRET"],
+                renew_window=int(os.environ.get('FALCON_TOKEN_RENEW_WINDOW', 300))
+            )
+            self._auth_lock = threading.Lock()
+            self.services = {}
             self.host_list = []
             if self.hosts().empty:
                 self.collector.write_blank('crowdstrike_hosts'                       , self._hosts({}))
@@ -47,16 +92,55 @@ class Source:
             self.collector.write_blank('crowdstrike_zero_trust_assessment'       , self._zero_trust_assessment({}))
             self.collector.write_blank('crowdstrike_zero_trust_assessment_items' , self._signals({},None,{}))
 
+    def service(self, service_class):
+        """The service class (e.g. Hosts), created once and authenticated with the shared OAuth2 token"""
+        with self._auth_lock:
+            if service_class not in self.services:
+                self.services[service_class] = service_class(auth_object=self.auth)
+            return self.services[service_class]
+
+    def authenticate(self):
+        """Get a new token when there is none yet, or when the current one is within the renew window of expiring"""
+        with self._auth_lock:
+            if self.auth.token_expired():
+                logging.info("crowdstrike - requesting an OAuth2 token")
+                self.auth.login()
+
+    @staticmethod
+    def threads():
+        """Detail and ZTA batches fetched at the same time (FALCON_THREADS)"""
+        return max(1, int(os.environ.get('FALCON_THREADS', 4)))
+
+    def ordered(self, calls):
+        """Run the calls on a pool of FALCON_THREADS workers, and yield their results in the order of the calls.
+        Only FALCON_THREADS calls are started ahead of the result that is used next"""
+        threads = self.threads()
+        if threads == 1:
+            for call in calls:
+                yield call()
+            return
+        with ThreadPoolExecutor(max_workers=threads, thread_name_prefix='crowdstrike') as executor:
+            pending = deque()
+            for call in calls:
+                pending.append(executor.submit(call))
+                if len(pending) >= threads:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
     def _call_with_retry(self, func, *args, **kwargs):
-        """Call a FalconPy function with connection retry and 429 backoff."""
+        """Call a FalconPy function with connection retry, paced by the shared CrowdStrike rate limiter.
+        The 429 retries are counted per call, so another worker's success doesn't reset this call's backoff.  A 429 pauses
+        the shared limiter, so every worker waits it out."""
         max_connect_retries = 2
         max_rate_limit_retries = 5
-        rate_limit_wait = 1
-        rate_limit_retries = 0
         connect_attempts = 0
+        rate_limit_retries = 0
 
         while True:
+            self.limiter.acquire()
             try:
+                self.authenticate()
                 result = func(*args, **kwargs)
             except (requests.exceptions.ConnectionError, requests.exceptions.Timeout, requests.exceptions.ChunkedEncodingError) as e:
                 connect_attempts += 1
@@ -67,12 +151,13 @@ class Source:
                 logging.error(f"Connection failed after {max_connect_retries + 1} attempts: {e}")
                 raise
 
+            self.limiter.update(result.get("headers"))
             if result["status_code"] == 429:
                 rate_limit_retries += 1
                 if rate_limit_retries <= max_rate_limit_retries:
-                    logging.warning(f"Rate limit hit (429). Retrying in {rate_limit_wait}s (attempt {rate_limit_retries}/{max_rate_limit_retries}).")
-                    time.sleep(rate_limit_wait)
-                    rate_limit_wait = min(rate_limit_wait * 2, 60)
+                    wait = self.limiter.retry_after(result.get("headers"), min(2 ** (rate_limit_retries - 1), 60))
+                    logging.warning(f"Rate limit hit (429). Retrying in {wait:.0f}s (attempt {rate_limit_retries}/{max_rate_limit_retries}).")
+                    self.limiter.pause(wait)
                     continue
                 logging.error(f"Rate limit retries exhausted after {max_rate_limit_retries} attempts.")
                 raise Exception("CrowdStrike rate limit retries exhausted")
@@ -87,17 +172,14 @@ class Source:
             "description"           : item.get("description"),
             "assignment_rule"       : item.get("assignment_rule",""),
             "created_by"            : item.get("created_by"),
-            "created_timestamp"     : datetime.datetime.strptime(item["created_timestamp"].split('.')[0], "%Y-%m-%dT%H:%M:%S") if item.get("created_timestamp") else pd.NaT,
+            "created_timestamp"     : item.get("created_timestamp"),
             "modified_by"           : item.get("modified_by"),
-            "modified_timestamp"    : datetime.datetime.strptime(item["modified_timestamp"].split('.')[0], "%Y-%m-%dT%H:%M:%S") if item.get("modified_timestamp") else pd.NaT,
+            "modified_timestamp"    : item.get("modified_timestamp"),
         }
 
     def host_groups(self):
         logging.info('crowdstrike - host_groups')
-        falcon = HostGroup(
-            client_id=os.environ["FALCON_CLIENT_ID"],
-            client_secret=os.environ["FALCON_SECRET"]
-        )
+        falcon = self.service(HostGroup)
         OFFSET = 0
         TOTAL = 1
         LIMIT = 500
@@ -126,58 +208,61 @@ class Source:
         return self.collector.df.get('crowdstrike_host_groups', pd.DataFrame())
 
     def _hosts(self,item):
-        return {
-            "client_id"                     : item.get("cid"),
-            "device_id"                     : item.get("device_id"),
-            "hostname"                      : item.get("hostname"),
-            "kernel_version"                : item.get("kernel_version"),
-            "last_login_timestamp"          : datetime.datetime.strptime(item["last_login_timestamp"], "%Y-%m-%dT%H:%M:%SZ") if item.get("last_login_timestamp") else pd.NaT,
-            "local_ip"                      : item.get("local_ip"),
-            "mac_address"                   : item.get("mac_address"),
-            "last_login_uid"                : item.get("last_login_uid"),
-            "last_login_user"               : item.get("last_login_user"),
-            "first_seen"                    : datetime.datetime.strptime(item["first_seen"], "%Y-%m-%dT%H:%M:%SZ") if item.get("first_seen") else pd.NaT,
-            "last_seen"                     : datetime.datetime.strptime(item["last_seen"], "%Y-%m-%dT%H:%M:%SZ") if item.get("last_seen") else pd.NaT,
-            "os_build"                      : item.get("os_build"),
-            "os_version"                    : item.get("os_version"),
-            "platform_name"                 : item.get("platform_name"),
-            "provision_status"              : item.get("provision_status"),
-            "reduced_functionality_mode"    : str(item.get("reduced_functionality_mode", "")).lower() not in ("no", "false", "", "none"),
-            "serial_number"                 : item.get("serial_number"),
-            "host_status"                   : item.get("status"),
-            "system_manufacturer"           : item.get("system_manufacturer"),
-            "system_product_name"           : item.get("system_product_name"),
-        }
-
-    def hosts(self):
-        logging.info('crowdstrike - hosts')
-        falcon = Hosts(
-            client_id=os.environ["FALCON_CLIENT_ID"],
-            client_secret=os.environ["FALCON_SECRET"]
-        )
-        OFFSET = 0
-        TOTAL = 1
+        return self.host_mapper.record(item)
+
+    @staticmethod
+    def host_filter():
+        """FQL filter on the hosts to collect: FALCON_HOST_FILTER, and the hosts seen in the last FALCON_HOST_LAST_SEEN_DAYS days"""
+        filters = [os.environ['FALCON_HOST_FILTER']] if os.environ.get('FALCON_HOST_FILTER') else []
+        if os.environ.get('FALCON_HOST_LAST_SEEN_DAYS'):
+            since = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=float(os.environ['FALCON_HOST_LAST_SEEN_DAYS']))
+            filters.append(f"last_seen:>='{since.strftime('%Y-%m-%dT%H:%M:%SZ')}'")
+        return '+'.join(filters)
+
+    def host_pages(self, falcon):
+        """Yield the pages of device ids, and keep them in host_list for the ZTA.  The ids are listed with the scroll
+        API, as offset pagination stops at 10,000 hosts"""
         LIMIT = 500
-        while OFFSET < TOTAL:
-            result = self._call_with_retry(falcon.query_devices_by_filter, limit=LIMIT, offset=OFFSET)
+        query_filter = self.host_filter()
+        if query_filter:
+            logging.info(f"crowdstrike - hosts matching {query_filter}")
+        kwargs = {'filter': query_filter} if query_filter else {}
+        retrieved = 0
+        while True:
+            result = self._call_with_retry(falcon.query_devices_by_filter_scroll, limit=LIMIT, **kwargs)
             if result["status_code"] != 200:
                 logging.error(f"crowdstrike hosts: API returned {result['status_code']}")
                 raise Exception(f"crowdstrike hosts API error: {result['status_code']}")
 
-            OFFSET = result["body"]["meta"]["pagination"]["offset"]
-            TOTAL = result["body"]["meta"]["pagination"]["total"]
-            returned_device_list = result["body"]["resources"]
+            pagination = result["body"]["meta"]["pagination"]
+            TOTAL = pagination.get("total", 0)
+            returned_device_list = result["body"]["resources"] or []
+            retrieved += len(returned_device_list)
 
             if returned_device_list:
+                logging.info(f"Hosts {retrieved}/{TOTAL}: {len(returned_device_list)} hosts")
                 self.host_list.append(returned_device_list)
-                detail_result = self._call_with_retry(falcon.get_device_details, ids=returned_device_list)
-                if detail_result["status_code"] != 200:
-                    logging.error(f"crowdstrike get_device_details: API returned {detail_result['status_code']}")
-                    raise Exception(f"crowdstrike get_device_details API error: {detail_result['status_code']}")
-                host_detail = detail_result["body"]["resources"]
-                logging.info(f"Offset {OFFSET}/{TOTAL}: retrieved {len(host_detail)} records")
-                df = pd.DataFrame([self._hosts(item) for item in host_detail])
-                self.collector.store_df('crowdstrike_hosts', df)
+                yield returned_device_list
+
+            # -- the continuation token of the next page
+            kwargs['offset'] = pagination.get("offset")
+            if not kwargs['offset'] or not returned_device_list or retrieved >= TOTAL:
+                break
+
+    def host_details(self, falcon, ids):
+        detail_result = self._call_with_retry(falcon.get_device_details, ids=ids)
+        if detail_result["status_code"] != 200:
+            logging.error(f"crowdstrike get_device_details: API returned {detail_result['status_code']}")
+            raise Exception(f"crowdstrike get_device_details API error: {detail_result['status_code']}")
+        return detail_result["body"]["resources"]
+
+    def hosts(self):
+        logging.info('crowdstrike - hosts')
+        falcon = self.service(Hosts)
+        # -- the next page of ids is queried while the details of the previous pages are fetched
+        for host_detail in self.ordered(functools.partial(self.host_details, falcon, ids) for ids in self.host_pages(falcon)):
+            logging.info(f"Retrieved {len(host_detail)} host details")
+            self.collector.store_df('crowdstrike_hosts', self.host_mapper.frame(host_detail))
 
         self.collector.write_df('crowdstrike_hosts')
         return self.collector.df.get('crowdstrike_hosts', pd.DataFrame())
@@ -205,10 +290,10 @@ class Source:
             "remediation_level"             : item.get("cve", {}).get("remediation_level"),
             "severity"                      : item.get("cve", {}).get("severity"),
             "vector"                        : item.get("cve", {}).get("vector"),
-            "created_at"                    : datetime.datetime.strptime(item.get("created_timestamp"), "%Y-%m-%dT%H:%M:%SZ") if item.get("created_timestamp") else pd.NaT,
-            "updated_at"                    : datetime.datetime.strptime(item.get("updated_timestamp"), "%Y-%m-%dT%H:%M:%SZ") if item.get("updated_timestamp") else pd.NaT,
-            "published_on"                  : datetime.datetime.strptime(item.get("cve", {}).get("published_date"), "%Y-%m-%dT%H:%M:%SZ") if item.get("cve", {}).get("published_date") else pd.NaT,
-            "spotlight_published_at"        : datetime.datetime.strptime(item.get("cve", {}).get("spotlight_published_date"), "%Y-%m-%dT%H:%M:%SZ") if item.get("cve", {}).get("spotlight_published_date") else pd.NaT,
+            "created_at"                    : item.get("created_timestamp"),
+            "updated_at"                    : item.get("updated_timestamp"),
+            "published_on"                  : item.get("cve", {}).get("published_date"),
+            "spotlight_published_at"        : item.get("cve", {}).get("spotlight_published_date"),
             "is_cisa_kev"                   : bool(item.get("cve", {}).get("cisa_info", {}).get("is_cisa_kev", False)),
             "is_suppressed"                 : bool(item.get("suppression_info", {}).get("is_suppressed", False)),
             "exploit_status"                : int(item.get("cve", {}).get("exploit_status", 0)),
@@ -247,8 +332,7 @@ class Source:
                 raise
             logging.warning(f"Spotlight cursor expired mid-pagination. Clearing accumulated data and restarting from scratch.")
             for tag in ('crowdstrike_vulnerabilities', 'crowdstrike_vulnerabilities_remediation'):
-                self.collector.df[tag] = pd.DataFrame()
-                self.collector.row_count[tag] = 0
+                self.collector.reset(tag)
             cursor_restarted = True
             _paginate()
 
@@ -257,12 +341,9 @@ class Source:
         return self.collector.df.get('crowdstrike_vulnerabilities', pd.DataFrame())
         
     def query_spotlight(self, aft: str = None, query_filter: str = ''):
-        """Retrieve a batch of Spotlight Vulnerability matches with connection retry and 429 backoff."""
+        """Retrieve a batch of Spotlight Vulnerability matches with connection retry, paced by the shared CrowdStrike rate limiter."""
 
-        spotlight = SpotlightVulnerabilities(
-            client_id=os.environ["FALCON_CLIENT_ID"],
-            client_secret=os.environ["FALCON_SECRET"]
-        )
+        spotlight = self.service(SpotlightVulnerabilities)
 
         retry_wait = 0.5
         max_wait = 60
@@ -272,7 +353,9 @@ class Source:
         connect_attempts = 0
 
         while True:
+            self.limiter.acquire()
             try:
+                self.authenticate()
                 all_results = spotlight.query_vulnerabilities_combined(
                     filter=query_filter,
                     after=aft,
@@ -290,12 +373,14 @@ class Source:
                 raise
 
             stat = all_results["status_code"]
+            self.limiter.update(all_results.get("headers"))
 
             if stat == 429:
                 rate_limit_retries += 1
                 if rate_limit_retries <= max_rate_limit_retries:
-                    logging.warning(f"Rate limit met, retrying in {retry_wait:.2f}s (attempt {rate_limit_retries}/{max_rate_limit_retries}).")
-                    time.sleep(retry_wait)
+                    wait = self.limiter.retry_after(all_results.get("headers"), retry_wait)
+                    logging.warning(f"Rate limit met, retrying in {wait:.2f}s (attempt {rate_limit_retries}/{max_rate_limit_retries}).")
+                    self.limiter.pause(wait)
                     retry_wait = min(retry_wait * 2, max_wait)
                     continue
                 logging.error(f"Spotlight rate limit retries exhausted after {max_rate_limit_retries} attempts.")
@@ -323,7 +408,7 @@ class Source:
             "system_serial_number"      : item.get("system_serial_number"),
             "event_platform"            : item.get("event_platform"),
             "product_type_desc"         : item.get("product_type_desc"),
-            "modified_time"             : datetime.datetime.strptime(item["modified_time"], "%Y-%m-%dT%H:%M:%SZ") if item.get("modified_time") else pd.NaT,
+            "modified_time"             : item.get("modified_time"),
             "sensor_file_status"        : item.get("sensor_file_status"),
             "assessment_sensor_config"  : int(item.get("assessment",{}).get("sensor_config",0)),
             "assessment_overall"        : int(item.get("assessment",{}).get("overall",0)),
@@ -341,18 +426,17 @@ class Source:
             "signal_name"    : entity.get("signal_name", "")
         }
 
+    def assessments(self, zta, id_list):
+        result = self._call_with_retry(zta.get_assessment, ids=id_list)
+        if result["status_code"] != 200:
+            logging.error(f"crowdstrike zero_trust_assessment: API returned {result['status_code']}")
+            raise Exception(f"crowdstrike zero_trust_assessment API error: {result['status_code']}")
+        return id_list, result['body']['resources']
+
     def zero_trust_assessment(self):
         logging.info('crowdstrike - zero_trust_assessment')
-        zta = ZeroTrustAssessment(
-            client_id=os.environ["FALCON_CLIENT_ID"],
-            client_secret=os.environ["FALCON_SECRET"]
-        )
-        for id_list in self.host_list:
-            result = self._call_with_retry(zta.get_assessment, ids=id_list)
-            if result["status_code"] != 200:
-                logging.error(f"crowdstrike zero_trust_assessment: API returned {result['status_code']}")
-                raise Exception(f"crowdstrike zero_trust_assessment API error: {result['status_code']}")
-            response = result['body']['resources']
+        zta = self.service(ZeroTrustAssessment)
+        for id_list, response in self.ordered(functools.partial(self.assessments, zta, ids) for ids in self.host_list):
             logging.info(f"Retrieved {len(response)} ZTA records for batch of {len(id_list)} hosts")
             df = pd.DataFrame([self._zero_trust_assessment(item) for item in response])
             self.collector.store_df('crowdstrike_zero_trust_assessment', df)
@@ -374,3 +458,4 @@ if __name__ == '__main__':
     from collector import Collector
     C = Collector()
     S = Source(C)
+    sys.exit(C.close())
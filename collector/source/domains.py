@@ -54,10 +54,12 @@ class Source:
 
     def test_domain(self,domain):
         result = []
+        # -- single attempt per check; the pooled session keeps the connection to the domain open between the checks
+        http = lambda url, **kwargs: self.collector.http.get(url, timeout=5, retries=0, connect_retries=0, **kwargs)
 
         # Check port 80
         try:
-            response = requests.get(f"http://{domain}", timeout=5)
+            response = http(f"http://{domain}")
             if response.status_code == 200:
                 result.append(("port_80", True))
             else:
@@ -67,7 +69,7 @@ class Source:
 
         # Check port 443
         try:
-            response = requests.get(f"https://{domain}", timeout=5)
+            response = http(f"https://{domain}")
             if response.status_code == 200:
                 result.append(("port_443", True))
             else:
@@ -77,7 +79,7 @@ class Source:
 
         # Check if port 80 redirects to port 443
         try:
-            response = requests.get(f"http://{domain}", allow_redirects=False, timeout=5)
+            response = http(f"http://{domain}", allow_redirects=False)
             if response.status_code == 301 and 'Location' in response.headers and response.headers['Location'].startswith('https://'):
                 result.append(("redirect_80_to_443", True))
             else:
@@ -87,7 +89,7 @@ class Source:
                 
         # Check if port 443 has a valid SSL certificate
         try:   
-            response = requests.get(f"https://{domain}", timeout=5)
+            response = http(f"https://{domain}")
             if response.status_code == 200:
                 result.append(("ssl_certificate_valid", True))
             else:
@@ -106,4 +108,5 @@ if __name__ == '__main__':
     sys.path.append("./")
     from collector import Collector
     C = Collector()
-    S = Source(C)
\ No newline at end of file
+    S = Source(C)
+    sys.exit(C.close())
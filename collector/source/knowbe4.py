@@ -4,7 +4,6 @@ import sys
 import logging
 import datetime
 import pandas as pd
-import time
 from dotenv import load_dotenv
 
 logging.basicConfig(
@@ -15,8 +14,16 @@ logging.basicConfig(
 class Source:
     def __init__(self,C):
         self.collector = C
-        self.last_request_time = 0
-        self.request_delay = 0.25  # 4 requests per second = 0.25 seconds between requests
+        # 4 requests per second, and a burst limit of 50 requests per minute
+        self.limiter = C.http.limiter('knowbe4', [(4, 1), (50, 60)])
+
+        # -- timestamps are kept as the API's strings in the mappers, and converted by the collector
+        KNOWBE4_TIME = '%Y-%m-%dT%H:%M:%S.000Z'
+        C.set_timestamps('knowbe4_enrollments', {c: KNOWBE4_TIME for c in ('completion_date', 'enrollment_date', 'start_date')})
+        C.set_timestamps('knowbe4_psts', {'started_at': KNOWBE4_TIME})
+        C.set_timestamps('knowbe4_pst_recipients', {c: KNOWBE4_TIME for c in (
+            'scheduled_at', 'delivered_at', 'opened_at', 'clicked_at', 'replied_at', 'attachment_opened_at',
+            'macro_enabled_at', 'data_entered_at', 'qr_code_scanned_at', 'reported_at', 'bounced_at')})
 
         # -- check the environment variables that will define if this plugin runs
         if C.env({
@@ -69,51 +76,18 @@ class Source:
         - 50 requests per minute (burst limit)
         - 2,000 requests per day + licensed users
         """
-        # Proactive rate limiting: ensure minimum delay between requests
-        current_time = time.time()
-        time_since_last_request = current_time - self.last_request_time
-        if time_since_last_request < self.request_delay:
-            time.sleep(self.request_delay - time_since_last_request)
-
-        retry_delay = 15  # Start with 15 seconds for 429 errors (burst limit recovery)
-
-        for attempt in range(max_retries):
-            try:
-                self.last_request_time = time.time()
-                req = requests.get(url, headers=self.headers, timeout=30)
-                req.raise_for_status()
-                return req
-            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout, requests.exceptions.ChunkedEncodingError) as err:
-                if attempt < max_connect_retries:
-                    logging.warning(f"Connection error (attempt {attempt + 1}/{max_connect_retries + 1}). Retrying in 5s: {err}")
-                    time.sleep(5)
-                else:
-                    logging.error(f"Connection failed after {max_connect_retries + 1} attempts for URL: {url}: {err}")
-                    raise
-            except requests.exceptions.HTTPError as err:
-                if err.response.status_code == 429:
-                    if attempt < max_retries - 1:
-                        logging.warning(f"Rate limit hit (429). Retrying in {retry_delay}s (attempt {attempt + 1}/{max_retries}).")
-                        time.sleep(retry_delay)
-                        retry_delay = min(retry_delay * 2, 300)
-                    else:
-                        logging.error(f"Rate limit exceeded after {max_retries} attempts for URL: {url}")
-                        raise
-                else:
-                    raise
-
-        return None
+        return self.collector.http.get(url, headers=self.headers, retries=max_retries - 1, connect_retries=max_connect_retries, raise_for_status=True, limiter=self.limiter)
 
     def _enrollments(self,item):
         return {
             "campaign_name"         : item.get("campaign_name"),
-            "completion_date"       : datetime.datetime.strptime(item["completion_date"], "%Y-%m-%dT%H:%M:%S.000Z") if item.get("completion_date") else pd.NaT,
+            "completion_date"       : item.get("completion_date"),
             "content_type"          : item.get("content_type"),
-            "enrollment_date"       : datetime.datetime.strptime(item["enrollment_date"], "%Y-%m-%dT%H:%M:%S.000Z") if item.get("enrollment_date") else pd.NaT,
+            "enrollment_date"       : item.get("enrollment_date"),
             "enrollment_id"         : int(item["enrollment_id"]) if item.get("enrollment_id") not in [None, ""] else None,
             "module_name"           : item.get("module_name"),
             "policy_acknowledged"   : item.get("policy_acknowledged",False),
-            "start_date"            : datetime.datetime.strptime(item["start_date"], "%Y-%m-%dT%H:%M:%S.000Z") if item.get("start_date") else pd.NaT,
+            "start_date"            : item.get("start_date"),
             "status"                : item.get("status"),
             "time_spent"            : item.get("time_spent"),
             "email"                 : item.get("user",{}).get("email"),
@@ -130,7 +104,7 @@ class Source:
             "name": item.get("name"),
             "groups": str(item.get("groups")) if item.get("groups") else None,
             "phish_prone_percentage": float(item["phish_prone_percentage"]) if item.get("phish_prone_percentage") not in [None, ""] else None,
-            "started_at": datetime.datetime.strptime(item["started_at"], "%Y-%m-%dT%H:%M:%S.000Z") if item.get("started_at") else pd.NaT,
+            "started_at": item.get("started_at"),
             "duration": item.get("duration"),
             "categories": str(item.get("categories")) if item.get("categories") else None,
             "template_id": int(item["template_id"]) if item.get("template_id") not in (None, "") else None,
@@ -157,17 +131,17 @@ class Source:
             "user_last_name": item.get("user",{}).get("last_name"),
             "user_email": item.get("user",{}).get("email"),
             "template_name": item.get("template",{}).get("name"),
-            "scheduled_at": datetime.datetime.strptime(item["scheduled_at"], "%Y-%m-%dT%H:%M:%S.000Z") if item.get("scheduled_at") else pd.NaT,
-            "delivered_at": datetime.datetime.strptime(item["delivered_at"], "%Y-%m-%dT%H:%M:%S.000Z") if item.get("delivered_at") else pd.NaT,
-            "opened_at": datetime.datetime.strptime(item["opened_at"], "%Y-%m-%dT%H:%M:%S.000Z") if item.get("opened_at") else pd.NaT,
-            "clicked_at": datetime.datetime.strptime(item["clicked_at"], "%Y-%m-%dT%H:%M:%S.000Z") if item.get("clicked_at") else pd.NaT,
-            "replied_at": datetime.datetime.strptime(item["replied_at"], "%Y-%m-%dT%H:%M:%S.000Z") if item.get("replied_at") else pd.NaT,
-            "attachment_opened_at": datetime.datetime.strptime(item["attachment_opened_at"], "%Y-%m-%dT%H:%M:%S.000Z") if item.get("attachment_opened_at") else pd.NaT,
-            "macro_enabled_at": datetime.datetime.strptime(item["macro_enabled_at"], "%Y-%m-%dT%H:%M:%S.000Z") if item.get("macro_enabled_at") else pd.NaT,
-            "data_entered_at": datetime.datetime.strptime(item["data_entered_at"], "%Y-%m-%dT%H:%M:%S.000Z") if item.get("data_entered_at") else pd.NaT,
-            "qr_code_scanned_at": datetime.datetime.strptime(item["qr_code_scanned_at"], "%Y-%m-%dT%H:%M:%S.000Z") if item.get("qr_code_scanned_at") else pd.NaT,
-            "reported_at": datetime.datetime.strptime(item["reported_at"], "%Y-%m-%dT%H:%M:%S.000Z") if item.get("reported_at") else pd.NaT,
-            "bounced_at": datetime.datetime.strptime(item["bounced_at"], "%Y-%m-%dT%H:%M:%S.000Z") if item.get("bounced_at") else pd.NaT,
+            "scheduled_at": item.get("scheduled_at"),
+            "delivered_at": item.get("delivered_at"),
+            "opened_at": item.get("opened_at"),
+            "clicked_at": item.get("clicked_at"),
+            "replied_at": item.get("replied_at"),
+            "attachment_opened_at": item.get("attachment_opened_at"),
+            "macro_enabled_at": item.get("macro_enabled_at"),
+            "data_entered_at": item.get("data_entered_at"),
+            "qr_code_scanned_at": item.get("qr_code_scanned_at"),
+            "reported_at": item.get("reported_at"),
+            "bounced_at": item.get("bounced_at"),
             "ip": item.get("ip"),
             "ip_location": item.get("ip_location"),
             "browser": item.get("browser"),
@@ -273,4 +247,5 @@ if __name__ == '__main__':
     sys.path.append("./")
     from collector import Collector
     C = Collector()
-    S = Source(C)
\ No newline at end of file
+    S = Source(C)
+    sys.exit(C.close())
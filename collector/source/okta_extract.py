@@ -18,12 +18,272 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s: %(message)s'
 )
 
+# -- column -> path into the users of the Users API (see mapping.Mapper)
+USERS = {
+    "id"                            : "id",
+    "status"                        : "status",
+    "created"                       : "created",
+    "activated"                     : "activated",
+    "status_changed"                : "statusChanged",
+    "last_login"                    : "lastLogin",
+    "last_updated"                  : "lastUpdated",
+    "password_changed"              : "passwordChanged",
+    "type_id"                       : "type.id",
+    "profile_login"                 : "profile.login",
+    "profile_first_name"            : "profile.firstName",
+    "profile_last_name"             : "profile.lastName",
+    "profile_nick_name"             : "profile.nickName",
+    "profile_display_name"          : "profile.displayName",
+    "profile_email"                 : "profile.email",
+    "profile_secondEmail"           : "profile.secondEmail",
+    "profile_url"                   : "profile.profileUrl",
+    "profile_preferred_language"    : "profile.preferredLanguage",
+    "profile_user_type"             : "profile.userType",
+    "profile_organization"          : "profile.organization",
+    "profile_title"                 : "profile.title",
+    "profile_division"              : "profile.division",
+    "profile_department"            : "profile.department",
+    "profile_cost_center"           : "profile.costCenter",
+    "profile_employee_number"       : "profile.employeeNumber",
+    "profile_mobile_phone"          : "profile.mobilePhone",
+    "profile_primary_phone"         : "profile.primaryPhone",
+    "profile_street_address"        : "profile.streetAddress",
+    "profile_city"                  : "profile.city",
+    "profile_state"                 : "profile.state",
+    "profile_zip_code"              : "profile.zipCode",
+    "profile_country_code"          : "profile.countryCode",
+}
+
+# -- column -> path into the devices of the Devices API
+DEVICES = {
+    "id": "id",
+    "created": "created",
+    "status": "status",
+    "lastupdated": "lastUpdated",
+    "profile_displayname": "profile.displayName",
+    "profile_platform": "profile.platform",
+    "profile_manufacturer": "profile.manufacturer",
+    "profile_model": "profile.model",
+    "profile_osversion": "profile.osVersion",
+    "profile_registered": ("profile.registered", "boolean"),
+    "profile_securehardwarepresent": ("profile.secureHardwarePresent", "boolean"),
+    "profile_authenticatorappkey": "profile.authenticatorAppKey",
+    "profile_serialnumber": "profile.serialNumber",
+    "profile_udid": "profile.udid",
+    "profile_imei": "profile.imei",
+    "profile_meid": "profile.meid",
+    "profile_sid": "profile.sid",
+    "profile_diskencryptiontype": "profile.diskEncryptionType",
+    "profile_integrityjailbreak": ("profile.integrityJailbreak", "boolean"),
+    "profile_tpmpublickeyhash": "profile.tpmPublicKeyHash",
+    "resourcetype": "resourceType",
+    "resourcedisplayname_value": "resourceDisplayName.value",
+    "resourcedisplayname_sensitive": ("resourceDisplayName.sensitive", "boolean"),
+    "resourceid": "resourceId",
+    "resourcealternateid": "resourceAlternateId",
+}
+
+# -- column -> path into the users of a device.  The device's id is added to the records as _device_id
+DEVICE_USERS = {
+    "device_id": "_device_id",
+    "created": "created",
+    "managementstatus": "managementStatus",
+    "screenlocktype": "screenLockType",
+    "user_id": "user.id",
+    "user_status": "user.status",
+    "user_displayname": "user.displayName",
+    "user_profile_login": "user.profile.login",
+    "user_created": "user.created",
+}
+
+# -- column -> path into the System Log events (see mapping.Mapper)
+LOGS = {
+    "uuid": "uuid",
+    "published": "published",
+    "eventtype": "eventType",
+    "version": "version",
+    "severity": "severity",
+    "legacyeventtype": "legacyEventType",
+    "displaymessage": "displayMessage",
+    "actor_id": "actor.id",
+    "actor_type": "actor.type",
+    "actor_alternateid": "actor.alternateId",
+    "actor_displayname": "actor.displayName",
+    "client_useragent_rawuseragent": "client.userAgent.rawUserAgent",
+    "client_useragent_os": "client.userAgent.os",
+    "client_useragent_browser": "client.userAgent.browser",
+    "client_zone": "client.zone",
+    "client_device": "client.device",
+    "client_id": "client.id",
+    "client_ipaddress": "client.ipAddress",
+    "client_geographicalcontext_city": "client.geographicalContext.city",
+    "client_geographicalcontext_state": "client.geographicalContext.state",
+    "client_geographicalcontext_country": "client.geographicalContext.country",
+    "client_geographicalcontext_postalcode": "client.geographicalContext.postalCode",
+    "client_geographicalcontext_geolocation_lat": "client.geographicalContext.geolocation.lat",
+    "client_geographicalcontext_geolocation_lon": "client.geographicalContext.geolocation.lon",
+    "outcome_result": "outcome.result",
+    "outcome_reason": "outcome.reason",
+    "target_id": "target.0.id",
+    "target_type": "target.0.type",
+    "target_alternateid": "target.0.alternateId",
+    "target_displayname": "target.0.displayName",
+    "transaction_type": "transaction.type",
+    "transaction_id": "transaction.id",
+    "transaction_detail": ("transaction.detail", "json_nonempty"),
+    "debugcontext_debugdata_accessrequestapprovalsequenceid": "debugContext.debugData.accessRequestApprovalSequenceId",
+    "debugcontext_debugdata_accessrequestid": "debugContext.debugData.accessRequestId",
+    "debugcontext_debugdata_accessrequestmatchedconditionid": "debugContext.debugData.accessRequestMatchedConditionId",
+    "debugcontext_debugdata_accessrequestsubject": "debugContext.debugData.accessRequestSubject",
+    "debugcontext_debugdata_accessscopeid": "debugContext.debugData.accessScopeId",
+    "debugcontext_debugdata_accessscopetype": "debugContext.debugData.accessScopeType",
+    "debugcontext_debugdata_anonymizerstatus": "debugContext.debugData.anonymizerStatus",
+    "debugcontext_debugdata_appcontextname": "debugContext.debugData.appContextName",
+    "debugcontext_debugdata_appeventispersonal": "debugContext.debugData.appEventIsPersonal",
+    "debugcontext_debugdata_appname": "debugContext.debugData.appName",
+    "debugcontext_debugdata_appuserid": "debugContext.debugData.appUserId",
+    "debugcontext_debugdata_appusername": "debugContext.debugData.appUsername",
+    "debugcontext_debugdata_appname2": "debugContext.debugData.appname",
+    "debugcontext_debugdata_audience": "debugContext.debugData.audience",
+    "debugcontext_debugdata_authcode": "debugContext.debugData.authCode",
+    "debugcontext_debugdata_authmethodfifthenrollment": "debugContext.debugData.authMethodFifthEnrollment",
+    "debugcontext_debugdata_authmethodfifthtype": "debugContext.debugData.authMethodFifthType",
+    "debugcontext_debugdata_authmethodfifthverificationtime": "debugContext.debugData.authMethodFifthVerificationTime",
+    "debugcontext_debugdata_authmethodfirstenrollment": "debugContext.debugData.authMethodFirstEnrollment",
+    "debugcontext_debugdata_authmethodfirsttype": "debugContext.debugData.authMethodFirstType",
+    "debugcontext_debugdata_authmethodfirstverificationtime": "debugContext.debugData.authMethodFirstVerificationTime",
+    "debugcontext_debugdata_authmethodfourthenrollment": "debugContext.debugData.authMethodFourthEnrollment",
+    "debugcontext_debugdata_authmethodfourthtype": "debugContext.debugData.authMethodFourthType",
+    "debugcontext_debugdata_authmethodfourthverificationtime": "debugContext.debugData.authMethodFourthVerificationTime",
+    "debugcontext_debugdata_authmethodsecondenrollment": "debugContext.debugData.authMethodSecondEnrollment",
+    "debugcontext_debugdata_authmethodsecondtype": "debugContext.debugData.authMethodSecondType",
+    "debugcontext_debugdata_authmethodsecondverificationtime": "debugContext.debugData.authMethodSecondVerificationTime",
+    "debugcontext_debugdata_authmethodthirdenrollment": "debugContext.debugData.authMethodThirdEnrollment",
+    "debugcontext_debugdata_authmethodthirdtype": "debugContext.debugData.authMethodThirdType",
+    "debugcontext_debugdata_authmethodthirdverificationtime": "debugContext.debugData.authMethodThirdVerificationTime",
+    "debugcontext_debugdata_authtime": "debugContext.debugData.authTime",
+    "debugcontext_debugdata_authenticationclassref": "debugContext.debugData.authenticationClassRef",
+    "debugcontext_debugdata_authenticatormethodchallengetime": "debugContext.debugData.authenticatorMethodChallengeTime",
+    "debugcontext_debugdata_authnrequestid": "debugContext.debugData.authnRequestId",
+    "debugcontext_debugdata_behaviors": "debugContext.debugData.behaviors",
+    "debugcontext_debugdata_canceledat": "debugContext.debugData.canceledAt",
+    "debugcontext_debugdata_category": "debugContext.debugData.category",
+    "debugcontext_debugdata_causes": "debugContext.debugData.causes",
+    "debugcontext_debugdata_challengeauthenticatorslist": "debugContext.debugData.challengeAuthenticatorsList",
+    "debugcontext_debugdata_changedattributes": "debugContext.debugData.changedAttributes",
+    "debugcontext_debugdata_changeddevicesignals": "debugContext.debugData.changedDeviceSignals",
+    "debugcontext_debugdata_clientauthtype": "debugContext.debugData.clientAuthType",
+    "debugcontext_debugdata_clientsecret": "debugContext.debugData.clientSecret",
+    "debugcontext_debugdata_devicecategory": "debugContext.debugData.deviceCategory",
+    "debugcontext_debugdata_devicefingerprint": "debugContext.debugData.deviceFingerprint",
+    "debugcontext_debugdata_deviceplatform": "debugContext.debugData.devicePlatform",
+    "debugcontext_debugdata_dthash": "debugContext.debugData.dtHash",
+    "debugcontext_debugdata_emailprovider": "debugContext.debugData.emailProvider",
+    "debugcontext_debugdata_emailrequestid": "debugContext.debugData.emailRequestId",
+    "debugcontext_debugdata_endedsessionid": "debugContext.debugData.endedSessionId",
+    "debugcontext_debugdata_errormessage": "debugContext.debugData.errorMessage",
+    "debugcontext_debugdata_expirytime": "debugContext.debugData.expiryTime",
+    "debugcontext_debugdata_externalsessionid": "debugContext.debugData.externalSessionId",
+    "debugcontext_debugdata_factor": "debugContext.debugData.factor",
+    "debugcontext_debugdata_factorintent": "debugContext.debugData.factorIntent",
+    "debugcontext_debugdata_fedbrokermode": "debugContext.debugData.fedBrokerMode",
+    "debugcontext_debugdata_grantaction": "debugContext.debugData.grantAction",
+    "debugcontext_debugdata_grantid": "debugContext.debugData.grantId",
+    "debugcontext_debugdata_grantsource": "debugContext.debugData.grantSource",
+    "debugcontext_debugdata_granttype": "debugContext.debugData.grantType",
+    "debugcontext_debugdata_grantedscopes": "debugContext.debugData.grantedScopes",
+    "debugcontext_debugdata_idptype": "debugContext.debugData.idpType",
+    "debugcontext_debugdata_initiationtype": "debugContext.debugData.initiationType",
+    "debugcontext_debugdata_issuedat": "debugContext.debugData.issuedAt",
+    "debugcontext_debugdata_issuer": "debugContext.debugData.issuer",
+    "debugcontext_debugdata_jti": "debugContext.debugData.jti",
+    "debugcontext_debugdata_keytypeusedforauthentication": "debugContext.debugData.keyTypeUsedForAuthentication",
+    "debugcontext_debugdata_lastresolvedat": "debugContext.debugData.lastResolvedAt",
+    "debugcontext_debugdata_logonlysecuritydata": "debugContext.debugData.logOnlySecurityData",
+    "debugcontext_debugdata_loginresult": "debugContext.debugData.loginResult",
+    "debugcontext_debugdata_message": "debugContext.debugData.message",
+    "debugcontext_debugdata_newipaddress": "debugContext.debugData.newIpAddress",
+    "debugcontext_debugdata_o365immutableid": "debugContext.debugData.o365Immutableid",
+    "debugcontext_debugdata_oktauseragentextended": "debugContext.debugData.oktaUserAgentExtended",
+    "debugcontext_debugdata_oktausername": "debugContext.debugData.oktaUsername",
+    "debugcontext_debugdata_operationratelimitscopetype": "debugContext.debugData.operationRateLimitScopeType",
+    "debugcontext_debugdata_operationratelimitsecondsreset": "debugContext.debugData.operationRateLimitSecondsToReset",
+    "debugcontext_debugdata_operationratelimitsubtype": "debugContext.debugData.operationRateLimitSubtype",
+    "debugcontext_debugdata_operationratelimitthreshold": "debugContext.debugData.operationRateLimitThreshold",
+    "debugcontext_debugdata_operationratelimittimespan": "debugContext.debugData.operationRateLimitTimeSpan",
+    "debugcontext_debugdata_operationratelimittimeunit": "debugContext.debugData.operationRateLimitTimeUnit",
+    "debugcontext_debugdata_operationratelimittype": "debugContext.debugData.operationRateLimitType",
+    "debugcontext_debugdata_origin": "debugContext.debugData.origin",
+    "debugcontext_debugdata_permalinkid": "debugContext.debugData.permalinkId",
+    "debugcontext_debugdata_pluginversion": "debugContext.debugData.pluginVersion",
+    "debugcontext_debugdata_previousipaddress": "debugContext.debugData.previousIpAddress",
+    "debugcontext_debugdata_principalentitlementschangesurl": "debugContext.debugData.principalEntitlementsChangesUrl",
+    "debugcontext_debugdata_privilegegranted": "debugContext.debugData.privilegeGranted",
+    "debugcontext_debugdata_proxytype": "debugContext.debugData.proxyType",
+    "debugcontext_debugdata_pushonlyresponsetype": "debugContext.debugData.pushOnlyResponseType",
+    "debugcontext_debugdata_pushwithnumberchallengeresponsetype": "debugContext.debugData.pushWithNumberChallengeResponseType",
+    "debugcontext_debugdata_redirecturi": "debugContext.debugData.redirectUri",
+    "debugcontext_debugdata_requestid": "debugContext.debugData.requestId",
+    "debugcontext_debugdata_requesturi": "debugContext.debugData.requestUri",
+    "debugcontext_debugdata_requestedforid": "debugContext.debugData.requestedForId",
+    "debugcontext_debugdata_requestedresourceid": "debugContext.debugData.requestedResourceId",
+    "debugcontext_debugdata_requestedresourcetype": "debugContext.debugData.requestedResourceType",
+    "debugcontext_debugdata_requestedscopes": "debugContext.debugData.requestedScopes",
+    "debugcontext_debugdata_requesterid": "debugContext.debugData.requesterId",
+    "debugcontext_debugdata_responsemode": "debugContext.debugData.responseMode",
+    "debugcontext_debugdata_responsetime": "debugContext.debugData.responseTime",
+    "debugcontext_debugdata_responsetype": "debugContext.debugData.responseType",
+    "debugcontext_debugdata_risk": "debugContext.debugData.risk",
+    "debugcontext_debugdata_risksettingsrequestsubmissiontype": "debugContext.debugData.riskSettingsRequestSubmissionType",
+    "debugcontext_debugdata_ruleconflictdetails": "debugContext.debugData.ruleConflictDetails",
+    "debugcontext_debugdata_scriptname": "debugContext.debugData.scriptName",
+    "debugcontext_debugdata_signonmode": "debugContext.debugData.signOnMode",
+    "debugcontext_debugdata_source": "debugContext.debugData.source",
+    "debugcontext_debugdata_state": "debugContext.debugData.state",
+    "debugcontext_debugdata_subject": "debugContext.debugData.subject",
+    "debugcontext_debugdata_successfuldeactivations": "debugContext.debugData.successfulDeactivations",
+    "debugcontext_debugdata_successfuldeletions": "debugContext.debugData.successfulDeletions",
+    "debugcontext_debugdata_successfulsuspensions": "debugContext.debugData.successfulSuspensions",
+    "debugcontext_debugdata_targeteventhookids": "debugContext.debugData.targetEventHookIds",
+    "debugcontext_debugdata_threatsuspected": "debugContext.debugData.threatSuspected",
+    "debugcontext_debugdata_traceid": "debugContext.debugData.traceId",
+    "debugcontext_debugdata_tunnels": "debugContext.debugData.tunnels",
+    "debugcontext_debugdata_url": "debugContext.debugData.url",
+    "debugcontext_debugdata_userid": "debugContext.debugData.userId",
+    "debugcontext_debugdata_usercomment": "debugContext.debugData.usercomment",
+    "authenticationcontext_authenticationprovider": "authenticationContext.authenticationProvider",
+    "authenticationcontext_authenticationstep": "authenticationContext.authenticationStep",
+    "authenticationcontext_credentialprovider": "authenticationContext.credentialProvider",
+    "authenticationcontext_credentialtype": "authenticationContext.credentialType",
+    "authenticationcontext_issuer": "authenticationContext.issuer",
+    "authenticationcontext_externalSessionId": "authenticationContext.externalSessionId",
+    "securitycontext_aswellknown": "securityContext.asWellKnown",
+    "securitycontext_asos": "securityContext.asOrg",
+    "securitycontext_asisp": "securityContext.asIsp",
+    "securitycontext_domain": "securityContext.domain",
+    "securitycontext_isthreat": "securityContext.isThreat",
+    "securitycontext_istunnelinganonymizer": "securityContext.isTunnelingAnonymizer",
+    "securitycontext_istorexitnode": "securityContext.isTorExitNode",
+}
+
 class Source:
     def __init__(self, C):
         self.collector = C
         self.device_ids = []
         self.device_users_flatten = []
 
+        # -- timestamps are kept as the API's strings in the mappers, and converted by the collector
+        C.set_timestamps('okta_users', {c: '%Y-%m-%dT%H:%M:%S.000Z' for c in (
+            'created', 'activated', 'status_changed', 'last_login', 'last_updated', 'password_changed')})
+        C.set_timestamps('okta_devices', {'created': '%Y-%m-%dT%H:%M:%S.000Z', 'lastupdated': '%Y-%m-%dT%H:%M:%S.000Z'})
+        C.set_timestamps('okta_device_users', {'created': '%Y-%m-%dT%H:%M:%S.000Z', 'user_created': '%Y-%m-%dT%H:%M:%S.000Z'})
+        C.set_timestamps('okta_logs', {'published': '%Y-%m-%dT%H:%M:%S.%fZ'})
+        C.set_timestamps('okta_factors', {'last_updated': '%Y-%m-%dT%H:%M:%S.000Z'})
+        self.user_mapper = C.mapper(USERS)
+        self.device_mapper = C.mapper(DEVICES)
+        self.device_user_mapper = C.mapper(DEVICE_USERS)
+        self.log_mapper = C.mapper(LOGS)
+
         if C.env({
                 'OKTA_DOMAIN': None,
                 'OKTA_TOKEN': None,
@@ -54,7 +314,7 @@ class Source:
                 logging.info("Starting device users extraction...")
                 asyncio.run(self.device_users_concurrent())
                 if self.device_users_flatten:
-                    self.collector.store_df('okta_device_users', pd.DataFrame(self.device_users_flatten))
+                    self.collector.store_df('okta_device_users', self.device_user_mapper.frame(self.device_users_flatten))
                     self.collector.write_df('okta_device_users')
                 else:
                     self.collector.write_blank('okta_device_users', self._okta_device_users({}, ''))
@@ -71,36 +331,12 @@ class Source:
             self.collector.write_blank('okta_logs'        , self._logs({}))
     
     def _make_request(self, url: str, headers: dict, params: dict = None) -> requests.Response:
-        """Make a GET request with connection retry and header-driven 429 backoff."""
-        max_connect_retries = 2
-        max_rate_limit_retries = 5
-        rate_limit_retries = 0
-        connect_attempts = 0
-
-        while True:
-            try:
-                response = requests.get(url, headers=headers, params=params, timeout=30)
-            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout, requests.exceptions.ChunkedEncodingError) as e:
-                connect_attempts += 1
-                if connect_attempts <= max_connect_retries:
-                    logging.warning(f"Connection error (attempt {connect_attempts}/{max_connect_retries + 1}). Retrying in 5s: {e}")
-                    time.sleep(5)
-                    continue
-                logging.error(f"Connection failed after {max_connect_retries + 1} attempts: {e}")
-                raise
-
-            if response.status_code == 429:
-                rate_limit_retries += 1
-                if rate_limit_retries <= max_rate_limit_retries:
-                    reset = response.headers.get('X-Rate-Limit-Reset')
-                    wait_time = max(int(reset) - int(time.time()) + 1, 1) if reset else 60
-                    logging.warning(f"Rate limit hit. Waiting {wait_time}s (attempt {rate_limit_retries}/{max_rate_limit_retries}).")
-                    time.sleep(wait_time)
-                    continue
-                logging.error(f"Rate limit retries exhausted after {max_rate_limit_retries} attempts for {url}")
-                raise Exception(f"Okta rate limit retries exhausted for {url}")
-
-            return response
+        """Make a GET request on the collector's pooled HTTP client.  Requests are paced on the X-Rate-Limit-Remaining / Reset
+        headers so the org's quota isn't exhausted, and any 429 is waited out using X-Rate-Limit-Reset."""
+        response = self.collector.http.get(url, headers=headers, params=params, backoff=60, limiter=self.collector.http.limiter('okta'))
+        if response.status_code == 429:
+            raise Exception(f"Okta rate limit retries exhausted for {url}")
+        return response
 
     def is_rate_limit_error(self, exception):
         """Detect if the exception is a rate limit error"""
@@ -121,7 +357,7 @@ class Source:
             "profile_authenticator_name"    : getattr(getattr(factor, "profile", None), "authenticator_name", None),
             "profile_phone_number"          : getattr(getattr(factor, "profile", None), "phone_number", None),
             "profile_credential_id"         : getattr(getattr(factor, "profile", None), "credential_id", None),
-            "last_updated"                  : datetime.datetime.strptime(factor.last_updated, "%Y-%m-%dT%H:%M:%S.000Z") if getattr(factor, "last_updated", None) else pd.NaT,
+            "last_updated"                  : getattr(factor, "last_updated", None),
             "verify"                        : getattr(factor, "verify", None),
         }
 
@@ -198,40 +434,7 @@ class Source:
                 self.flatten.extend(user_factors)
 
     def _okta_users(self, user):
-        return {
-            "id"                            : getattr(user, "id", None),
-            "status"                        : getattr(user, "status", None),
-            "created"                       : datetime.datetime.strptime(user.created, "%Y-%m-%dT%H:%M:%S.000Z") if getattr(user, "created", None) else pd.NaT,
-            "activated"                     : datetime.datetime.strptime(user.activated, "%Y-%m-%dT%H:%M:%S.000Z") if getattr(user, "activated", None) else pd.NaT,
-            "status_changed"                : datetime.datetime.strptime(user.status_changed, "%Y-%m-%dT%H:%M:%S.000Z") if getattr(user, "status_changed", None) else pd.NaT,
-            "last_login"                    : datetime.datetime.strptime(user.last_login, "%Y-%m-%dT%H:%M:%S.000Z") if getattr(user, "last_login", None) else pd.NaT,
-            "last_updated"                  : datetime.datetime.strptime(user.last_updated, "%Y-%m-%dT%H:%M:%S.000Z") if getattr(user, "last_updated", None) else pd.NaT,
-            "password_changed"              : datetime.datetime.strptime(user.password_changed, "%Y-%m-%dT%H:%M:%S.000Z") if getattr(user, "password_changed", None) else pd.NaT,
-            "type_id"                       : getattr(getattr(user, "type", None), "id", None),
-            "profile_login"                 : getattr(getattr(user, "profile", None), "login", None),
-            "profile_first_name"            : getattr(getattr(user, "profile", None), "first_name", None),
-            "profile_last_name"             : getattr(getattr(user, "profile", None), "last_name", None),
-            "profile_nick_name"             : getattr(getattr(user, "profile", None), "nick_name", None),
-            "profile_display_name"          : getattr(getattr(user, "profile", None), "display_name", None),
-            "profile_email"                 : getattr(getattr(user, "profile", None), "email", None),
-            "profile_secondEmail"           : getattr(getattr(user, "profile", None), "secondEmail", None),
-            "profile_url"                   : getattr(getattr(user, "profile", None), "profile_url", None),
-            "profile_preferred_language"    : getattr(getattr(user, "profile", None), "preferred_language", None),
-            "profile_user_type"             : getattr(getattr(user, "profile", None), "user_type", None),
-            "profile_organization"          : getattr(getattr(user, "profile", None), "organization", None),
-            "profile_title"                 : getattr(getattr(user, "profile", None), "title", None),
-            "profile_division"              : getattr(getattr(user, "profile", None), "division", None),
-            "profile_department"            : getattr(getattr(user, "profile", None), "department", None),
-            "profile_cost_center"           : getattr(getattr(user, "profile", None), "cost_center", None),
-            "profile_employee_number"       : getattr(getattr(user, "profile", None), "employee_number", None),
-            "profile_mobile_phone"          : getattr(getattr(user, "profile", None), "mobile_phone", None),
-            "profile_primary_phone"         : getattr(getattr(user, "profile", None), "primary_phone", None),
-            "profile_street_address"        : getattr(getattr(user, "profile", None), "street_address", None),
-            "profile_city"                  : getattr(getattr(user, "profile", None), "city", None),
-            "profile_state"                 : getattr(getattr(user, "profile", None), "state", None),
-            "profile_zip_code"              : getattr(getattr(user, "profile", None), "zip_code", None),
-            "profile_country_code"          : getattr(getattr(user, "profile", None), "country_code", None),
-        }
+        return self.user_mapper.record(user)
 
     def _clean_user_profile(self, user_data):
         """Clean user profile data to handle empty strings that violate Pydantic validation"""
@@ -286,53 +489,8 @@ class Source:
                         # Clean the user data before processing
                         user_data = self._clean_user_profile(user_data)
 
-                        # Create a simple object to pass to _okta_users
-                        class UserObject:
-                            def __init__(self, data):
-                                self._data = data
-                                self.id = data.get('id')
-                                self.status = data.get('status')
-                                self.created = data.get('created')
-                                self.activated = data.get('activated')
-                                self.status_changed = data.get('statusChanged')
-                                self.last_login = data.get('lastLogin')
-                                self.last_updated = data.get('lastUpdated')
-                                self.password_changed = data.get('passwordChanged')
-
-                                # Type info
-                                self.type = type('obj', (object,), {'id': data.get('type', {}).get('id')})() if data.get('type') else None
-
-                                # Profile info
-                                profile_data = data.get('profile', {})
-                                self.profile = type('obj', (object,), {
-                                    'login': profile_data.get('login'),
-                                    'first_name': profile_data.get('firstName'),
-                                    'last_name': profile_data.get('lastName'),
-                                    'nick_name': profile_data.get('nickName'),
-                                    'display_name': profile_data.get('displayName'),
-                                    'email': profile_data.get('email'),
-                                    'secondEmail': profile_data.get('secondEmail'),
-                                    'profile_url': profile_data.get('profileUrl'),
-                                    'preferred_language': profile_data.get('preferredLanguage'),
-                                    'user_type': profile_data.get('userType'),
-                                    'organization': profile_data.get('organization'),
-                                    'title': profile_data.get('title'),
-                                    'division': profile_data.get('division'),
-                                    'department': profile_data.get('department'),
-                                    'cost_center': profile_data.get('costCenter'),
-                                    'employee_number': profile_data.get('employeeNumber'),
-                                    'mobile_phone': profile_data.get('mobilePhone'),
-                                    'primary_phone': profile_data.get('primaryPhone'),
-                                    'street_address': profile_data.get('streetAddress'),
-                                    'city': profile_data.get('city'),
-                                    'state': profile_data.get('state'),
-                                    'zip_code': profile_data.get('zipCode'),
-                                    'country_code': profile_data.get('countryCode'),
-                                })() if data.get('profile') else None
-
-                        user_obj = UserObject(user_data)
-                        self.users.append(user_obj.id)
-                        flatten_df.append(self._okta_users(user_obj))
+                        self.users.append(user_data.get('id'))
+                        flatten_df.append(user_data)
                     else:
                         logging.warning(f"Skipping invalid user entry: {user_data}")
 
@@ -350,7 +508,7 @@ class Source:
                 url = next_url
 
             if flatten_df:
-                self.collector.store_df('okta_users', pd.DataFrame(flatten_df))
+                self.collector.store_df('okta_users', self.user_mapper.frame(flatten_df))
                 logging.info(f"Successfully processed {len(flatten_df)} total users")
             else:
                 self.collector.write_blank('okta_users', self._okta_users({}))
@@ -364,46 +522,10 @@ class Source:
             raise
 
     def _okta_devices(self, device):
-        return {
-            "id": device.get("id"),
-            "created": datetime.datetime.strptime(device.get("created"), "%Y-%m-%dT%H:%M:%S.000Z") if device.get("created") else pd.NaT,
-            "status": device.get("status"),
-            "lastupdated": datetime.datetime.strptime(device.get("lastUpdated"), "%Y-%m-%dT%H:%M:%S.000Z") if device.get("lastUpdated") else pd.NaT,
-            "profile_displayname": device.get("profile", {}).get("displayName"),
-            "profile_platform": device.get("profile", {}).get("platform"),
-            "profile_manufacturer": device.get("profile", {}).get("manufacturer"),
-            "profile_model": device.get("profile", {}).get("model"),
-            "profile_osversion": device.get("profile", {}).get("osVersion"),
-            "profile_registered": bool(device.get("profile", {}).get("registered")) if device.get("profile", {}).get("registered") is not None else pd.NA,
-            "profile_securehardwarepresent": bool(device.get("profile", {}).get("secureHardwarePresent")) if device.get("profile", {}).get("secureHardwarePresent") is not None else pd.NA,
-            "profile_authenticatorappkey": device.get("profile", {}).get("authenticatorAppKey"),
-            "profile_serialnumber": device.get("profile", {}).get("serialNumber"),
-            "profile_udid": device.get("profile", {}).get("udid"),
-            "profile_imei": device.get("profile", {}).get("imei"),
-            "profile_meid": device.get("profile", {}).get("meid"),
-            "profile_sid": device.get("profile", {}).get("sid"),
-            "profile_diskencryptiontype": device.get("profile", {}).get("diskEncryptionType"),
-            "profile_integrityjailbreak": bool(device.get("profile", {}).get("integrityJailbreak")) if device.get("profile", {}).get("integrityJailbreak") is not None else pd.NA,
-            "profile_tpmpublickeyhash": device.get("profile", {}).get("tpmPublicKeyHash"),
-            "resourcetype": device.get("resourceType"),
-            "resourcedisplayname_value": device.get("resourceDisplayName", {}).get("value"),
-            "resourcedisplayname_sensitive": bool(device.get("resourceDisplayName", {}).get("sensitive")) if device.get("resourceDisplayName", {}).get("sensitive") is not None else pd.NA,
-            "resourceid": device.get("resourceId"),
-            "resourcealternateid": device.get("resourceAlternateId"),
-        }
+        return self.device_mapper.record(device)
 
     def _okta_device_users(self, device_user_data, device_id):
-        return {
-            "device_id": device_id,
-            "created": datetime.datetime.strptime(device_user_data.get("created"), "%Y-%m-%dT%H:%M:%S.000Z") if device_user_data.get("created") else pd.NaT,
-            "managementstatus": device_user_data.get("managementStatus"),
-            "screenlocktype": device_user_data.get("screenLockType"),
-            "user_id": device_user_data.get("user", {}).get("id") if device_user_data.get("user") else None,
-            "user_status": device_user_data.get("user", {}).get("status") if device_user_data.get("user") else None,
-            "user_displayname": device_user_data.get("user", {}).get("displayName") if device_user_data.get("user") else None,
-            "user_profile_login": device_user_data.get("user", {}).get("profile",{}).get("login") if device_user_data.get("user") else None,
-            "user_created": datetime.datetime.strptime(device_user_data.get("user", {}).get("created"), "%Y-%m-%dT%H:%M:%S.000Z") if device_user_data.get("user", {}).get("created") else pd.NaT,
-        }
+        return self.device_user_mapper.record({**device_user_data, '_device_id': device_id})
 
     async def extract_device_users_with_retry(self, device_id, max_retries=3):
         """Extract device users for a device with exponential backoff"""
@@ -449,7 +571,8 @@ class Source:
 
                     while True:
                         for device_user in device_users_data:
-                            device_user_records.append(self._okta_device_users(device_user, device_id))
+                            device_user['_device_id'] = device_id
+                            device_user_records.append(device_user)
 
                         # Handle pagination by checking Link header
                         headers = response.headers if response is not None else None
@@ -565,7 +688,7 @@ class Source:
 
                 for device in devices_data:
                     if device and isinstance(device, dict):
-                        flatten_df.append(self._okta_devices(device))
+                        flatten_df.append(device)
                     else:
                         logging.warning(f"Skipping invalid device entry: {device}")
 
@@ -595,7 +718,7 @@ class Source:
         self.device_ids = [d['id'] for d in flatten_df if d.get('id')]
 
         if flatten_df:
-            df = pd.DataFrame(flatten_df)
+            df = self.device_mapper.frame(flatten_df)
             bool_cols = ['profile_registered', 'profile_securehardwarepresent', 'profile_integrityjailbreak', 'resourcedisplayname_sensitive']
             for col in bool_cols:
                 if col in df.columns:
@@ -610,182 +733,17 @@ class Source:
     def _logs(self, log):
         if not log or not isinstance(log, dict):
             log = {}
-        
-        return {
-            "uuid": log.get("uuid"),
-            "published": datetime.datetime.strptime(log.get("published"), "%Y-%m-%dT%H:%M:%S.%fZ") if log.get("published") else pd.NaT,
-            "eventtype": log.get("eventType"),
-            "version": log.get("version"),
-            "severity": log.get("severity"),
-            "legacyeventtype": log.get("legacyEventType"),
-            "displaymessage": log.get("displayMessage"),
-            "actor_id": log.get("actor", {}).get("id") if log.get("actor") else None,
-            "actor_type": log.get("actor", {}).get("type") if log.get("actor") else None,
-            "actor_alternateid": log.get("actor", {}).get("alternateId") if log.get("actor") else None,
-            "actor_displayname": log.get("actor", {}).get("displayName") if log.get("actor") else None,
-            "client_useragent_rawuseragent": log.get("client", {}).get("userAgent", {}).get("rawUserAgent") if log.get("client") and log.get("client", {}).get("userAgent") else None,
-            "client_useragent_os": log.get("client", {}).get("userAgent", {}).get("os") if log.get("client") and log.get("client", {}).get("userAgent") else None,
-            "client_useragent_browser": log.get("client", {}).get("userAgent", {}).get("browser") if log.get("client") and log.get("client", {}).get("userAgent") else None,
-            "client_zone": log.get("client", {}).get("zone") if log.get("client") else None,
-            "client_device": log.get("client", {}).get("device") if log.get("client") else None,
-            "client_id": log.get("client", {}).get("id") if log.get("client") else None,
-            "client_ipaddress": log.get("client", {}).get("ipAddress") if log.get("client") else None,
-            "client_geographicalcontext_city": log.get("client", {}).get("geographicalContext", {}).get("city") if log.get("client") and log.get("client", {}).get("geographicalContext") else None,
-            "client_geographicalcontext_state": log.get("client", {}).get("geographicalContext", {}).get("state") if log.get("client") and log.get("client", {}).get("geographicalContext") else None,
-            "client_geographicalcontext_country": log.get("client", {}).get("geographicalContext", {}).get("country") if log.get("client") and log.get("client", {}).get("geographicalContext") else None,
-            "client_geographicalcontext_postalcode": log.get("client", {}).get("geographicalContext", {}).get("postalCode") if log.get("client") and log.get("client", {}).get("geographicalContext") else None,
-            "client_geographicalcontext_geolocation_lat": log.get("client", {}).get("geographicalContext", {}).get("geolocation", {}).get("lat") if log.get("client") and log.get("client", {}).get("geographicalContext") and log.get("client", {}).get("geographicalContext", {}).get("geolocation") else None,
-            "client_geographicalcontext_geolocation_lon": log.get("client", {}).get("geographicalContext", {}).get("geolocation", {}).get("lon") if log.get("client") and log.get("client", {}).get("geographicalContext") and log.get("client", {}).get("geographicalContext", {}).get("geolocation") else None,
-            "outcome_result": log.get("outcome", {}).get("result") if log.get("outcome") else None,
-            "outcome_reason": log.get("outcome", {}).get("reason") if log.get("outcome") else None,
-            "target_id": log.get("target", [{}])[0].get("id") if log.get("target") and len(log.get("target")) > 0 and log.get("target")[0] else None,
-            "target_type": log.get("target", [{}])[0].get("type") if log.get("target") and len(log.get("target")) > 0 and log.get("target")[0] else None,
-            "target_alternateid": log.get("target", [{}])[0].get("alternateId") if log.get("target") and len(log.get("target")) > 0 and log.get("target")[0] else None,
-            "target_displayname": log.get("target", [{}])[0].get("displayName") if log.get("target") and len(log.get("target")) > 0 and log.get("target")[0] else None,
-            "transaction_type": log.get("transaction", {}).get("type") if log.get("transaction") else None,
-            "transaction_id": log.get("transaction", {}).get("id") if log.get("transaction") else None,
-            "transaction_detail": json.dumps(log.get("transaction", {}).get("detail")) if log.get("transaction") and log.get("transaction", {}).get("detail") else None,
-            "debugcontext_debugdata_accessrequestapprovalsequenceid": log.get("debugContext", {}).get("debugData", {}).get("accessRequestApprovalSequenceId") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_accessrequestid": log.get("debugContext", {}).get("debugData", {}).get("accessRequestId") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_accessrequestmatchedconditionid": log.get("debugContext", {}).get("debugData", {}).get("accessRequestMatchedConditionId") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_accessrequestsubject": log.get("debugContext", {}).get("debugData", {}).get("accessRequestSubject") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_accessscopeid": log.get("debugContext", {}).get("debugData", {}).get("accessScopeId") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_accessscopetype": log.get("debugContext", {}).get("debugData", {}).get("accessScopeType") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_anonymizerstatus": log.get("debugContext", {}).get("debugData", {}).get("anonymizerStatus") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_appcontextname": log.get("debugContext", {}).get("debugData", {}).get("appContextName") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_appeventispersonal": log.get("debugContext", {}).get("debugData", {}).get("appEventIsPersonal") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_appname": log.get("debugContext", {}).get("debugData", {}).get("appName") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_appuserid": log.get("debugContext", {}).get("debugData", {}).get("appUserId") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_appusername": log.get("debugContext", {}).get("debugData", {}).get("appUsername") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_appname2": log.get("debugContext", {}).get("debugData", {}).get("appname") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_audience": log.get("debugContext", {}).get("debugData", {}).get("audience") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_authcode": log.get("debugContext", {}).get("debugData", {}).get("authCode") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_authmethodfifthenrollment": log.get("debugContext", {}).get("debugData", {}).get("authMethodFifthEnrollment") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_authmethodfifthtype": log.get("debugContext", {}).get("debugData", {}).get("authMethodFifthType") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_authmethodfifthverificationtime": log.get("debugContext", {}).get("debugData", {}).get("authMethodFifthVerificationTime") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_authmethodfirstenrollment": log.get("debugContext", {}).get("debugData", {}).get("authMethodFirstEnrollment") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_authmethodfirsttype": log.get("debugContext", {}).get("debugData", {}).get("authMethodFirstType") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_authmethodfirstverificationtime": log.get("debugContext", {}).get("debugData", {}).get("authMethodFirstVerificationTime") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_authmethodfourthenrollment": log.get("debugContext", {}).get("debugData", {}).get("authMethodFourthEnrollment") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_authmethodfourthtype": log.get("debugContext", {}).get("debugData", {}).get("authMethodFourthType") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_authmethodfourthverificationtime": log.get("debugContext", {}).get("debugData", {}).get("authMethodFourthVerificationTime") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_authmethodsecondenrollment": log.get("debugContext", {}).get("debugData", {}).get("authMethodSecondEnrollment") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_authmethodsecondtype": log.get("debugContext", {}).get("debugData", {}).get("authMethodSecondType") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_authmethodsecondverificationtime": log.get("debugContext", {}).get("debugData", {}).get("authMethodSecondVerificationTime") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_authmethodthirdenrollment": log.get("debugContext", {}).get("debugData", {}).get("authMethodThirdEnrollment") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_authmethodthirdtype": log.get("debugContext", {}).get("debugData", {}).get("authMethodThirdType") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_authmethodthirdverificationtime": log.get("debugContext", {}).get("debugData", {}).get("authMethodThirdVerificationTime") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_authtime": log.get("debugContext", {}).get("debugData", {}).get("authTime") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_authenticationclassref": log.get("debugContext", {}).get("debugData", {}).get("authenticationClassRef") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_authenticatormethodchallengetime": log.get("debugContext", {}).get("debugData", {}).get("authenticatorMethodChallengeTime") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_authnrequestid": log.get("debugContext", {}).get("debugData", {}).get("authnRequestId") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_behaviors": log.get("debugContext", {}).get("debugData", {}).get("behaviors") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_canceledat": log.get("debugContext", {}).get("debugData", {}).get("canceledAt") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_category": log.get("debugContext", {}).get("debugData", {}).get("category") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_causes": log.get("debugContext", {}).get("debugData", {}).get("causes") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_challengeauthenticatorslist": log.get("debugContext", {}).get("debugData", {}).get("challengeAuthenticatorsList") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_changedattributes": log.get("debugContext", {}).get("debugData", {}).get("changedAttributes") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_changeddevicesignals": log.get("debugContext", {}).get("debugData", {}).get("changedDeviceSignals") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_clientauthtype": log.get("debugContext", {}).get("debugData", {}).get("clientAuthType") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_clientsecret": log.get("debugContext", {}).get("debugData", {}).get("clientSecret") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_devicecategory": log.get("debugContext", {}).get("debugData", {}).get("deviceCategory") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_devicefingerprint": log.get("debugContext", {}).get("debugData", {}).get("deviceFingerprint") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_deviceplatform": log.get("debugContext", {}).get("debugData", {}).get("devicePlatform") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_dthash": log.get("debugContext", {}).get("debugData", {}).get("dtHash") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_emailprovider": log.get("debugContext", {}).get("debugData", {}).get("emailProvider") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_emailrequestid": log.get("debugContext", {}).get("debugData", {}).get("emailRequestId") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_endedsessionid": log.get("debugContext", {}).get("debugData", {}).get("endedSessionId") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_errormessage": log.get("debugContext", {}).get("debugData", {}).get("errorMessage") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_expirytime": log.get("debugContext", {}).get("debugData", {}).get("expiryTime") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_externalsessionid": log.get("debugContext", {}).get("debugData", {}).get("externalSessionId") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_factor": log.get("debugContext", {}).get("debugData", {}).get("factor") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_factorintent": log.get("debugContext", {}).get("debugData", {}).get("factorIntent") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_fedbrokermode": log.get("debugContext", {}).get("debugData", {}).get("fedBrokerMode") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_grantaction": log.get("debugContext", {}).get("debugData", {}).get("grantAction") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_grantid": log.get("debugContext", {}).get("debugData", {}).get("grantId") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_grantsource": log.get("debugContext", {}).get("debugData", {}).get("grantSource") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_granttype": log.get("debugContext", {}).get("debugData", {}).get("grantType") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_grantedscopes": log.get("debugContext", {}).get("debugData", {}).get("grantedScopes") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_idptype": log.get("debugContext", {}).get("debugData", {}).get("idpType") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_initiationtype": log.get("debugContext", {}).get("debugData", {}).get("initiationType") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_issuedat": log.get("debugContext", {}).get("debugData", {}).get("issuedAt") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_issuer": log.get("debugContext", {}).get("debugData", {}).get("issuer") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_jti": log.get("debugContext", {}).get("debugData", {}).get("jti") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_keytypeusedforauthentication": log.get("debugContext", {}).get("debugData", {}).get("keyTypeUsedForAuthentication") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_lastresolvedat": log.get("debugContext", {}).get("debugData", {}).get("lastResolvedAt") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_logonlysecuritydata": log.get("debugContext", {}).get("debugData", {}).get("logOnlySecurityData") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_loginresult": log.get("debugContext", {}).get("debugData", {}).get("loginResult") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_message": log.get("debugContext", {}).get("debugData", {}).get("message") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_newipaddress": log.get("debugContext", {}).get("debugData", {}).get("newIpAddress") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_o365immutableid": log.get("debugContext", {}).get("debugData", {}).get("o365Immutableid") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_oktauseragentextended": log.get("debugContext", {}).get("debugData", {}).get("oktaUserAgentExtended") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_oktausername": log.get("debugContext", {}).get("debugData", {}).get("oktaUsername") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_operationratelimitscopetype": log.get("debugContext", {}).get("debugData", {}).get("operationRateLimitScopeType") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_operationratelimitsecondsreset": log.get("debugContext", {}).get("debugData", {}).get("operationRateLimitSecondsToReset") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_operationratelimitsubtype": log.get("debugContext", {}).get("debugData", {}).get("operationRateLimitSubtype") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_operationratelimitthreshold": log.get("debugContext", {}).get("debugData", {}).get("operationRateLimitThreshold") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_operationratelimittimespan": log.get("debugContext", {}).get("debugData", {}).get("operationRateLimitTimeSpan") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_operationratelimittimeunit": log.get("debugContext", {}).get("debugData", {}).get("operationRateLimitTimeUnit") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_operationratelimittype": log.get("debugContext", {}).get("debugData", {}).get("operationRateLimitType") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_origin": log.get("debugContext", {}).get("debugData", {}).get("origin") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_permalinkid": log.get("debugContext", {}).get("debugData", {}).get("permalinkId") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_pluginversion": log.get("debugContext", {}).get("debugData", {}).get("pluginVersion") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_previousipaddress": log.get("debugContext", {}).get("debugData", {}).get("previousIpAddress") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_principalentitlementschangesurl": log.get("debugContext", {}).get("debugData", {}).get("principalEntitlementsChangesUrl") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_privilegegranted": log.get("debugContext", {}).get("debugData", {}).get("privilegeGranted") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_proxytype": log.get("debugContext", {}).get("debugData", {}).get("proxyType") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_pushonlyresponsetype": log.get("debugContext", {}).get("debugData", {}).get("pushOnlyResponseType") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_pushwithnumberchallengeresponsetype": log.get("debugContext", {}).get("debugData", {}).get("pushWithNumberChallengeResponseType") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_redirecturi": log.get("debugContext", {}).get("debugData", {}).get("redirectUri") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_requestid": log.get("debugContext", {}).get("debugData", {}).get("requestId") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_requesturi": log.get("debugContext", {}).get("debugData", {}).get("requestUri") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_requestedforid": log.get("debugContext", {}).get("debugData", {}).get("requestedForId") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_requestedresourceid": log.get("debugContext", {}).get("debugData", {}).get("requestedResourceId") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_requestedresourcetype": log.get("debugContext", {}).get("debugData", {}).get("requestedResourceType") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_requestedscopes": log.get("debugContext", {}).get("debugData", {}).get("requestedScopes") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_requesterid": log.get("debugContext", {}).get("debugData", {}).get("requesterId") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_responsemode": log.get("debugContext", {}).get("debugData", {}).get("responseMode") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_responsetime": log.get("debugContext", {}).get("debugData", {}).get("responseTime") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_responsetype": log.get("debugContext", {}).get("debugData", {}).get("responseType") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_risk": log.get("debugContext", {}).get("debugData", {}).get("risk") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_risksettingsrequestsubmissiontype": log.get("debugContext", {}).get("debugData", {}).get("riskSettingsRequestSubmissionType") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_ruleconflictdetails": log.get("debugContext", {}).get("debugData", {}).get("ruleConflictDetails") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_scriptname": log.get("debugContext", {}).get("debugData", {}).get("scriptName") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_signonmode": log.get("debugContext", {}).get("debugData", {}).get("signOnMode") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_source": log.get("debugContext", {}).get("debugData", {}).get("source") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_state": log.get("debugContext", {}).get("debugData", {}).get("state") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_subject": log.get("debugContext", {}).get("debugData", {}).get("subject") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_successfuldeactivations": log.get("debugContext", {}).get("debugData", {}).get("successfulDeactivations") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_successfuldeletions": log.get("debugContext", {}).get("debugData", {}).get("successfulDeletions") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_successfulsuspensions": log.get("debugContext", {}).get("debugData", {}).get("successfulSuspensions") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_targeteventhookids": log.get("debugContext", {}).get("debugData", {}).get("targetEventHookIds") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_threatsuspected": log.get("debugContext", {}).get("debugData", {}).get("threatSuspected") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_traceid": log.get("debugContext", {}).get("debugData", {}).get("traceId") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_tunnels": log.get("debugContext", {}).get("debugData", {}).get("tunnels") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_url": log.get("debugContext", {}).get("debugData", {}).get("url") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_userid": log.get("debugContext", {}).get("debugData", {}).get("userId") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "debugcontext_debugdata_usercomment": log.get("debugContext", {}).get("debugData", {}).get("usercomment") if log.get("debugContext") and log.get("debugContext", {}).get("debugData") else None,
-            "authenticationcontext_authenticationprovider": log.get("authenticationContext", {}).get("authenticationProvider") if log.get("authenticationContext") else None,
-            "authenticationcontext_authenticationstep": log.get("authenticationContext", {}).get("authenticationStep") if log.get("authenticationContext") else None,
-            "authenticationcontext_credentialprovider": log.get("authenticationContext", {}).get("credentialProvider") if log.get("authenticationContext") else None,
-            "authenticationcontext_credentialtype": log.get("authenticationContext", {}).get("credentialType") if log.get("authenticationContext") else None,
-            "authenticationcontext_issuer": log.get("authenticationContext", {}).get("issuer") if log.get("authenticationContext") else None,
-            "authenticationcontext_externalSessionId": log.get("authenticationContext", {}).get("externalSessionId") if log.get("authenticationContext") else None,
-            "securitycontext_aswellknown": log.get("securityContext", {}).get("asWellKnown") if log.get("securityContext") else None,
-            "securitycontext_asos": log.get("securityContext", {}).get("asOrg") if log.get("securityContext") else None,
-            "securitycontext_asisp": log.get("securityContext", {}).get("asIsp") if log.get("securityContext") else None,
-            "securitycontext_domain": log.get("securityContext", {}).get("domain") if log.get("securityContext") else None,
-            "securitycontext_isthreat": log.get("securityContext", {}).get("isThreat") if log.get("securityContext") else None,
-            "securitycontext_istunnelinganonymizer": log.get("securityContext", {}).get("isTunnelingAnonymizer") if log.get("securityContext") else None,
-            "securitycontext_istorexitnode": log.get("securityContext", {}).get("isTorExitNode") if log.get("securityContext") else None,
-        }
+        return self.log_mapper.record(log)
 
     def logs(self):
         try:
             domain = os.environ['OKTA_DOMAIN'].rstrip('/')
             token = os.environ['OKTA_TOKEN']
             
-            since = (datetime.datetime.now() - datetime.timedelta(hours=26)).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+            # -- with incremental collection, carry on from the last log event we loaded.  The events are appended, so the
+            #    ones older than the window are deleted from the table once the new ones are loaded
+            since = self.collector.since('okta_logs', (datetime.datetime.now() - datetime.timedelta(hours=26)).strftime('%Y-%m-%dT%H:%M:%S.000Z'))
+            self.collector.set_retention('okta_logs', 'published', datetime.timedelta(hours=26))
             
             url = f"{domain}/api/v1/logs"
             headers = {
@@ -822,7 +780,7 @@ class Source:
                 
                 for log in logs_data:
                     if log and isinstance(log, dict):
-                        flatten_df.append(self._logs(log))
+                        flatten_df.append(log)
                     else:
                         logging.warning(f"Skipping invalid log entry: {log}")
                 
@@ -839,8 +797,14 @@ class Source:
                 url = next_url
 
             if flatten_df:
-                self.collector.store_df('okta_logs', pd.DataFrame(flatten_df))
+                df = self.log_mapper.frame(flatten_df)
+                self.collector.store_df('okta_logs', df)
                 logging.info(f"Successfully processed {len(flatten_df)} total logs")
+
+                # -- since is inclusive, so start the next run just after the newest event
+                published = df['published'].max()
+                if pd.notna(published):
+                    self.collector.set_watermark('okta_logs', (published + datetime.timedelta(milliseconds=1)).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z')
             else:
                 self.collector.write_blank('okta_logs', self._logs({}))
 
@@ -861,3 +825,4 @@ if __name__ == '__main__':
     from collector import Collector
     C = Collector()
     S = Source(C)
+    sys.exit(C.close())
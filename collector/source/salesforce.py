@@ -94,4 +94,5 @@ if __name__ == '__main__':
     from collector import Collector
     load_dotenv()
     C = Collector()
-    S = Source(C)
\ No newline at end of file
+    S = Source(C)
+    sys.exit(C.close())
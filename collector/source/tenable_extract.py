@@ -3,19 +3,149 @@
 from tenable.io import TenableIO
 import os
 import sys
+import time
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import datetime
-import json
 
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s: %(message)s'
 )
 
+# -- column -> path into the Tenable export records (see mapping.Mapper)
+ASSETS = {
+    "id"                           : "id",
+    "has_agent"                    : ("has_agent", "bool"),
+    "has_plugin_results"           : ("has_plugin_results", "bool"),
+    "created_at"                   : "created_at",
+    "terminated_at"                : "terminated_at",
+    "terminated_by"                : "terminated_by",
+    "updated_at"                   : "updated_at",
+    "deleted_at"                   : "deleted_at",
+    "deleted_by"                   : "deleted_by",
+    "first_seen"                   : "first_seen",
+    "last_seen"                    : "last_seen",
+    "first_scan_time"              : "first_scan_time",
+    "last_scan_time"               : "last_scan_time",
+    "last_authenticated_scan_date" : "last_authenticated_scan_date",
+    "last_licensed_scan_date"      : "last_licensed_scan_date",
+    "last_scan_id"                 : "last_scan_id",
+    "last_schedule_id"             : "last_schedule_id",
+    "azure_vm_id"                  : "azure_vm_id",
+    "azure_resource_id"            : "azure_resource_id",
+    "gcp_project_id"               : "gcp_project_id",
+    "gcp_zone"                     : "gcp_zone",
+    "gcp_instance_id"              : "gcp_instance_id",
+    "aws_ec2_instance_ami_id"      : "aws_ec2_instance_ami_id",
+    "aws_ec2_instance_id"          : "aws_ec2_instance_id",
+    "agent_uuid"                   : "agent_uuid",
+    "bios_uuid"                    : "bios_uuid",
+    "network_id"                   : "network_id",
+    "network_name"                 : "network_name",
+    "aws_owner_id"                 : "aws_owner_id",
+    "aws_availability_zone"        : "aws_availability_zone",
+    "aws_region"                   : "aws_region",
+    "aws_vpc_id"                   : "aws_vpc_id",
+    "aws_ec2_instance_group_name"  : "aws_ec2_instance_group_name",
+    "aws_ec2_instance_state_name"  : "aws_ec2_instance_state_name",
+    "aws_ec2_instance_type"        : "aws_ec2_instance_type",
+    "aws_subnet_id"                : "aws_subnet_id",
+    "aws_ec2_product_code"         : "aws_ec2_product_code",
+    "aws_ec2_name"                 : "aws_ec2_name",
+    "mcafee_epo_guid"              : "mcafee_epo_guid",
+    "mcafee_epo_agent_guid"        : "mcafee_epo_agent_guid",
+    "servicenow_sysid"             : "servicenow_sysid",
+    "bigfix_asset_id"              : "bigfix_asset_id",
+    "ipv4s"                        : "ipv4s.0",
+    "ipv6s"                        : "ipv6s.0",
+    "fqdns"                        : "fqdns.0",
+    "mac_addresses"                : "mac_addresses.0",
+    "netbios_names"                : "netbios_names.0",
+    "operating_systems"            : "operating_systems.0",
+    "system_types"                 : "system_types.0",
+    "hostnames"                    : "hostnames.0",
+    "source_name"                  : "sources.0.name",
+    "source_first_seen"            : "sources.0.first_seen",
+    "source_last_seen"             : "sources.0.last_seen",
+    "serial_number"                : "serial_number",
+    "acr_score"                    : ("acr_score", "float"),
+    "exposure_score"               : ("exposure_score", "float"),
+    "rating_acr_score"             : "ratings.acr.score",
+    "rating_aes_score"             : "ratings.aes.score",
+}
+
+VULNERABILITIES = {
+    "id"                       : "finding_id",
+    "output"                   : "output",
+    #"port"                         : json.dumps(item.get("port",{})),
+    "protocol"                 : "protocol",
+    "severity"                 : "severity",
+    "state"                    : "state",
+    "first_found"              : "first_found",
+    "last_found"               : "last_found",
+
+    # Plugin info
+    "plugin_id"                : "plugin.id",
+    "plugin_name"              : "plugin.name",
+    "plugin_family"            : "plugin.family",
+    "plugin_modification_date" : "plugin.modification_date",
+    "plugin_published_date"    : "plugin.published_date",
+    "plugin_type"              : "plugin.type",
+    "plugin_description"       : "plugin.description",
+    "plugin_solution"          : "plugin.solution",
+    "plugin_synopsis"          : "plugin.synopsis",
+    "plugin_risk_factor"       : "plugin.risk_factor",
+    "plugin_see_also"          : ("plugin.see_also", None, []),
+    "plugin_cpe"               : ("plugin.cpe", "json", []),
+    "plugin_xrefs"             : ("plugin.xrefs", "json", [None]),
+
+    # CVSS v2
+    "cvss_v2_base_score"       : "plugin.cvss.base_score",
+    "cvss_v2_vector"           : "plugin.cvss.vector",
+    "cvss_v2_temporal_score"   : "plugin.cvss.temporal_score",
+    "cvss_v2_temporal_vector"  : "plugin.cvss.temporal_vector",
+
+    # CVSS v3
+    "cvss_v3_base_score"       : "plugin.cvss3.base_score",
+    "cvss_v3_vector"           : "plugin.cvss3.vector",
+    "cvss_v3_temporal_score"   : "plugin.cvss3.temporal_score",
+    "cvss_v3_temporal_vector"  : "plugin.cvss3.temporal_vector",
+
+    # Exploit data
+    "has_patch"                : ("plugin.has_patch", None, False),
+    "has_exploit"              : ("plugin.exploit_available", None, False),
+    "exploit_available"        : "plugin.exploit.available",
+    "exploit_frameworks"       : "plugin.exploit.frameworks.0",
+
+    # Asset info
+    "asset_uuid"               : "asset.uuid",
+    "asset_hostname"           : "asset.hostname",
+    "asset_ipv4"               : "asset.ipv4",
+    "asset_ipv6"               : "asset.ipv6",
+    "asset_mac_address"        : "asset.mac_address",
+    "asset_operating_system"   : "asset.operating_system.0",
+}
+
 class Source:
     def __init__(self,C):
         self.collector = C
+        self.asset_mapper = C.mapper(ASSETS)
+        self.vulnerability_mapper = C.mapper(VULNERABILITIES)
+
+        # -- timestamps are kept as the API's strings in the mappers, and converted by the collector.  The format only
+        #    has to match the start of the value, so any fraction of a second (and the Z) is dropped
+        C.set_timestamps('tenable_assets', {c: '%Y-%m-%dT%H:%M:%S' for c in (
+            'created_at', 'terminated_at', 'updated_at', 'deleted_at', 'first_seen', 'last_seen', 'first_scan_time',
+            'last_scan_time', 'last_authenticated_scan_date', 'last_licensed_scan_date', 'source_first_seen', 'source_last_seen')})
+        C.set_timestamps('tenable_vulnerabilities', {
+            'first_found'               : '%Y-%m-%dT%H:%M:%S',
+            'last_found'                : '%Y-%m-%dT%H:%M:%S',
+            'plugin_modification_date'  : '%Y-%m-%dT%H:%M:%SZ',
+            'plugin_published_date'     : '%Y-%m-%dT%H:%M:%SZ',
+        })
 
         if C.env({
             'TENABLE_ACCESS_KEY' : None,
@@ -32,20 +162,44 @@ class Source:
                 self.collector.write_blank('tenable_vulnerabilities', self._vulnerabilities({}))
                 raise
 
-            if self.assets().empty:
-                self.collector.write_blank('tenable_assets'         , self._assets({})          )
+            if os.environ.get('TENABLE_CONCURRENT_EXPORTS', 'false').lower() not in ('0', 'false', 'no'):
+                self.concurrent_exports()
             else:
-                self.collector.write_df('tenable_assets')
-            if self.vulnerabilities().empty:
-                self.collector.write_blank('tenable_vulnerabilities', self._vulnerabilities({}) )
-            else:
-                self.collector.write_df('tenable_vulnerabilities')
+                self.collect('tenable_assets'          , self.assets         , self._assets          )
+                self.collect('tenable_vulnerabilities' , self.vulnerabilities, self._vulnerabilities )
             #self.findings()
             #self.was()
         else:
             self.collector.write_blank('tenable_assets'         , self._assets({})          )
             self.collector.write_blank('tenable_vulnerabilities', self._vulnerabilities({}) )
 
+    def collect(self, tag, export, blank):
+        if not export():
+            self.collector.write_blank(tag, blank({}))
+        else:
+            self.collector.write_df(tag)
+
+    def concurrent_exports(self):
+        """Request the asset and the vulnerability export before downloading either, so Tenable prepares them at the
+        same time, then download and write both side by side"""
+        try:
+            assets = self.tio.exports.assets(**self.export_options('chunk_size'))
+            vulnerabilities = self.request_vulnerabilities()
+        except Exception as e:
+            logging.error(f"Error requesting the Tenable exports: {e}")
+            self.collector.write_blank('tenable_assets', self._assets({}))
+            self.collector.write_blank('tenable_vulnerabilities', self._vulnerabilities({}))
+            raise
+
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix='tenable') as executor:
+            jobs = [
+                executor.submit(self.collect, 'tenable_assets'          , lambda: self.assets(assets)                   , self._assets          ),
+                executor.submit(self.collect, 'tenable_vulnerabilities' , lambda: self.vulnerabilities(vulnerabilities) , self._vulnerabilities ),
+            ]
+        # -- one export failing doesn't stop the other, but still fails the plugin
+        for job in jobs:
+            job.result()
+
     # def findings(self):
     #     flatten = []
     #     for d in self.tio.exports.compliance():
@@ -54,79 +208,58 @@ class Source:
     #     self.collector.store('tenable_findings',flatten)
 
     def _assets(self,item):
-        return {
-            "id"                            : item.get("id"),
-            "has_agent"                     : item.get("has_agent",False) == True,
-            "has_plugin_results"            : item.get("has_plugin_results",False) == True,
-            "created_at"                    : datetime.datetime.strptime(item["created_at"].split('.')[0], "%Y-%m-%dT%H:%M:%S") if item.get("created_at") else pd.NaT,
-            "terminated_at"                 : datetime.datetime.strptime(item["terminated_at"].split('.')[0], "%Y-%m-%dT%H:%M:%S") if item.get("terminated_at") else pd.NaT,
-            "terminated_by"                 : item.get("terminated_by"),
-            "updated_at"                    : datetime.datetime.strptime(item["updated_at"].split('.')[0], "%Y-%m-%dT%H:%M:%S") if item.get("updated_at") else pd.NaT,
-            "deleted_at"                    : datetime.datetime.strptime(item["deleted_at"].split('.')[0], "%Y-%m-%dT%H:%M:%S") if item.get("deleted_at") else pd.NaT,
-            "deleted_by"                    : item.get("deleted_by"),
-            "first_seen"                    : datetime.datetime.strptime(item["first_seen"].split('.')[0], "%Y-%m-%dT%H:%M:%S") if item.get("first_seen") else pd.NaT,
-            "last_seen"                     : datetime.datetime.strptime(item["last_seen"].split('.')[0], "%Y-%m-%dT%H:%M:%S") if item.get("last_seen") else pd.NaT,
-            "first_scan_time"               : datetime.datetime.strptime(item["first_scan_time"].split('.')[0], "%Y-%m-%dT%H:%M:%S") if item.get("first_scan_time") else pd.NaT,
-            "last_scan_time"                : datetime.datetime.strptime(item["last_scan_time"].split('.')[0], "%Y-%m-%dT%H:%M:%S") if item.get("last_scan_time") else pd.NaT,
-            "last_authenticated_scan_date"  : datetime.datetime.strptime(item["last_authenticated_scan_date"].split('.')[0], "%Y-%m-%dT%H:%M:%S") if item.get("last_authenticated_scan_date") else pd.NaT,
-            "last_licensed_scan_date"       : datetime.datetime.strptime(item["last_licensed_scan_date"].split('.')[0], "%Y-%m-%dT%H:%M:%S") if item.get("last_licensed_scan_date") else pd.NaT,
-            "last_scan_id"                  : item.get("last_scan_id"),
-            "last_schedule_id"              : item.get("last_schedule_id"),
-            "azure_vm_id"                   : item.get("azure_vm_id"),
-            "azure_resource_id"             : item.get("azure_resource_id"),
-            "gcp_project_id"                : item.get("gcp_project_id"),
-            "gcp_zone"                      : item.get("gcp_zone"),
-            "gcp_instance_id"               : item.get("gcp_instance_id"),
-            "aws_ec2_instance_ami_id"       : item.get("aws_ec2_instance_ami_id"),
-            "aws_ec2_instance_id"           : item.get("aws_ec2_instance_id"),
-            "agent_uuid"                    : item.get("agent_uuid"),
-            "bios_uuid"                     : item.get("bios_uuid"),
-            "network_id"                    : item.get("network_id"),
-            "network_name"                  : item.get("network_name"),
-            "aws_owner_id"                  : item.get("aws_owner_id"),
-            "aws_availability_zone"         : item.get("aws_availability_zone"),
-            "aws_region"                    : item.get("aws_region"),
-            "aws_vpc_id"                    : item.get("aws_vpc_id"),
-            "aws_ec2_instance_group_name"   : item.get("aws_ec2_instance_group_name"),
-            "aws_ec2_instance_state_name"   : item.get("aws_ec2_instance_state_name"),
-            "aws_ec2_instance_type"         : item.get("aws_ec2_instance_type"),
-            "aws_subnet_id"                 : item.get("aws_subnet_id"),
-            "aws_ec2_product_code"          : item.get("aws_ec2_product_code"),
-            "aws_ec2_name"                  : item.get("aws_ec2_name"),
-            "mcafee_epo_guid"               : item.get("mcafee_epo_guid"),
-            "mcafee_epo_agent_guid"         : item.get("mcafee_epo_agent_guid"),
-            "servicenow_sysid"              : item.get("servicenow_sysid"),
-            "bigfix_asset_id"               : item.get("bigfix_asset_id"),
-            "ipv4s"                         : item.get("ipv4s", [None])[0] if item.get("ipv4s") else None,
-            "ipv6s"                         : item.get("ipv6s", [None])[0] if item.get("ipv6s") else None,
-            "fqdns"                         : item.get("fqdns", [None])[0] if item.get("fqdns") else None,
-            "mac_addresses"                 : item.get("mac_addresses", [None])[0] if item.get("mac_addresses") else None,
-            "netbios_names"                 : item.get("netbios_names", [None])[0] if item.get("netbios_names") else None,
-            "operating_systems"             : item.get("operating_systems", [None])[0] if item.get("operating_systems") else None,
-            "system_types"                  : item.get("system_types", [None])[0] if item.get("system_types") else None,
-            "hostnames"                     : item.get("hostnames", [None])[0] if item.get("hostnames") else None,
-            "source_name"                   : item.get("sources", [{}])[0].get("name") if item.get("sources") else None,
-            "source_first_seen"             : datetime.datetime.strptime(item["sources"][0].get("first_seen", "").split('.')[0], "%Y-%m-%dT%H:%M:%S") if item.get("sources",[{}])[0].get("first_seen") else pd.NaT,
-            "source_last_seen"              : datetime.datetime.strptime(item["sources"][0].get("last_seen", "").split('.')[0], "%Y-%m-%dT%H:%M:%S") if item.get("sources",[{}])[0].get("last_seen") else pd.NaT,
-            "serial_number"                 : item.get("serial_number"),
-            "acr_score"                     : float(item.get("acr_score") or 0),
-            "exposure_score"                : float(item.get("exposure_score") or 0),
-            "rating_acr_score"              : item.get("ratings", {}).get("acr", {}).get("score"),
-            "rating_aes_score"              : item.get("ratings", {}).get("aes", {}).get("score")
-        }
-    
-    def assets(self):
+        return self.asset_mapper.record(item)
+
+    def export(self, tag, iterator, mapper):
+        """Map the records of an export into store_df as they are downloaded, in batches of TENABLE_BATCH_SIZE.
+        With TENABLE_EXPORT_THREADS > 1 that many chunks of the export are downloaded and mapped at once.
+        Returns the number of records stored"""
+        threads = max(1, int(os.environ.get('TENABLE_EXPORT_THREADS', 1)))
+        stored = 0
+
+        if threads > 1:
+            lock = threading.Lock()
+
+            def store_chunk(data, **kwargs):
+                nonlocal stored
+                if data:
+                    self.collector.store_df(tag, mapper.frame(data))
+                    with lock:
+                        stored += len(data)
+
+            # -- pyTenable hands each chunk to a thread of its own, and returns the finished jobs
+            for job in iterator.run_threaded(store_chunk, num_threads=threads) or []:
+                job.result()
+            return stored
+
+        batch_size = max(1, int(os.environ.get('TENABLE_BATCH_SIZE', 50000)))
+        batch = []
+        for item in iterator:
+            batch.append(item)
+            if len(batch) >= batch_size:
+                self.collector.store_df(tag, mapper.frame(batch))
+                stored += len(batch)
+                batch = []
+        if batch:
+            self.collector.store_df(tag, mapper.frame(batch))
+            stored += len(batch)
+        return stored
+
+    @staticmethod
+    def export_options(chunk_option):
+        """The records per export chunk (TENABLE_CHUNK_SIZE) as the export's option, or nothing for Tenable's default"""
+        value = os.environ.get('TENABLE_CHUNK_SIZE')
+        return {chunk_option: int(value)} if value else {}
+
+    def assets(self, iterator=None):
         try:
-            result = list(self.tio.exports.assets())
+            if iterator is None:
+                iterator = self.tio.exports.assets(**self.export_options('chunk_size'))
+            return self.export('tenable_assets', iterator, self.asset_mapper)
         except Exception as e:
             logging.error(f"Error fetching Tenable assets: {e}")
             self.collector.write_blank('tenable_assets', self._assets({}))
             raise
-        if len(result) == 0:
-            return pd.DataFrame()
-        df = pd.DataFrame([self._assets(item) for item in result])
-        self.collector.store_df('tenable_assets', df)
-        return df
 
 
         #     # "agent_names": item["agent_names"],  # empty list
@@ -150,70 +283,46 @@ class Source:
     #     self.collector.store('tenable_was',flatten)
 
     def _vulnerabilities(self, item):
-        return {
-            "id"                           : item.get("id"),
-            "output"                       : item.get("output"),
-            #"port"                         : json.dumps(item.get("port",{})),
-            "protocol"                     : item.get("protocol"),
-            "severity"                     : item.get("severity"),
-            "state"                        : item.get("state"),
-            "first_found"                  : datetime.datetime.strptime(item["first_found"].rstrip('Z').split('.')[0], "%Y-%m-%dT%H:%M:%S") if item.get("first_found") else pd.NaT,
-            "last_found"                   : datetime.datetime.strptime(item["last_found"].rstrip('Z').split('.')[0] , "%Y-%m-%dT%H:%M:%S") if item.get("last_found") else pd.NaT,
-
-            # Plugin info
-            "plugin_id"                    : item.get("plugin", {}).get("id"),
-            "plugin_name"                  : item.get("plugin", {}).get("name"),
-            "plugin_family"                : item.get("plugin", {}).get("family"),
-            "plugin_modification_date"     : datetime.datetime.strptime(item["plugin"]["modification_date"], "%Y-%m-%dT%H:%M:%SZ") if item.get("plugin", {}).get("modification_date") else pd.NaT,
-            "plugin_published_date"        : datetime.datetime.strptime(item["plugin"]["published_date"], "%Y-%m-%dT%H:%M:%SZ") if item.get("plugin", {}).get("published_date") else pd.NaT,
-            "plugin_type"                  : item.get("plugin", {}).get("type"),
-            "plugin_description"           : item.get("plugin", {}).get("description"),
-            "plugin_solution"              : item.get("plugin", {}).get("solution"),
-            "plugin_synopsis"              : item.get("plugin", {}).get("synopsis"),
-            "plugin_risk_factor"           : item.get("plugin", {}).get("risk_factor"),
-            "plugin_see_also"              : item.get("plugin", {}).get("see_also", []),
-            "plugin_cpe"                   : json.dumps(item.get("plugin", {}).get("cpe", [])),
-            "plugin_xrefs"                 : json.dumps(item.get("plugin", {}).get("xrefs", [None])),
-
-            # CVSS v2
-            "cvss_v2_base_score"           : item.get("plugin", {}).get("cvss", {}).get("base_score"),
-            "cvss_v2_vector"               : item.get("plugin", {}).get("cvss", {}).get("vector"),
-            "cvss_v2_temporal_score"       : item.get("plugin", {}).get("cvss", {}).get("temporal_score"),
-            "cvss_v2_temporal_vector"      : item.get("plugin", {}).get("cvss", {}).get("temporal_vector"),
-
-            # CVSS v3
-            "cvss_v3_base_score"           : item.get("plugin", {}).get("cvss3", {}).get("base_score"),
-            "cvss_v3_vector"               : item.get("plugin", {}).get("cvss3", {}).get("vector"),
-            "cvss_v3_temporal_score"       : item.get("plugin", {}).get("cvss3", {}).get("temporal_score"),
-            "cvss_v3_temporal_vector"      : item.get("plugin", {}).get("cvss3", {}).get("temporal_vector"),
-
-            # Exploit data
-            "has_patch"                    : item.get("plugin", {}).get("has_patch",False),
-            "has_exploit"                  : item.get("plugin", {}).get("exploit_available",False),
-            "exploit_available"            : item.get("plugin", {}).get("exploit", {}).get("available"),
-            "exploit_frameworks"           : item.get("plugin", {}).get("exploit", {}).get("frameworks", [ None])[0],
-
-            # Asset info
-            "asset_uuid"                   : item.get("asset", {}).get("uuid"),
-            "asset_hostname"               : item.get("asset", {}).get("hostname"),
-            "asset_ipv4"                   : item.get("asset", {}).get("ipv4"),
-            "asset_ipv6"                   : item.get("asset", {}).get("ipv6"),
-            "asset_mac_address"            : item.get("asset", {}).get("mac_address"),
-            "asset_operating_system"       : item.get("asset", {}).get("operating_system",[ None]) [0],
-        }
-
-    def vulnerabilities(self):
+        return self.vulnerability_mapper.record(item)
+
+    @property
+    def full_export_key(self):
+        return f"{os.environ.get('TENANCY', 'default')}:tenable_vulnerabilities"
+
+    def request_vulnerabilities(self):
+        """Request the vulnerability export.  On incremental runs (COLLECTOR_INCREMENTAL) only the findings that changed
+        since the last successful export are requested, and merged into the table on their id.  Every
+        TENABLE_FULL_EXPORT_DAYS days the whole table is exported again"""
+        tag = 'tenable_vulnerabilities'
+        # -- vulnerability chunks are sized in assets, not in findings
+        options = self.export_options('num_assets')
+        started = int(time.time())
+
+        full_export_days = float(os.environ.get('TENABLE_FULL_EXPORT_DAYS', 7))
+        last_full_export = self.collector.state.get('tenable_full_exports', self.full_export_key, 0)
+        since = None if started - last_full_export >= full_export_days * 86400 else self.collector.since(tag)
+        if since is not None:
+            # -- fixed findings are included, so the findings that were fixed since the last run are updated as well
+            self.collector.set_mode(tag, 'index', 'id')
+            options.update(since=int(float(since)), state=['open', 'reopened', 'fixed'])
+            logging.info(f"{tag} - Exporting the findings that changed since {datetime.datetime.fromtimestamp(int(float(since)))}")
+        self.full_export = started if since is None else None
+        self.collector.set_watermark(tag, started)
+        return self.tio.exports.vulns(**options)
+
+    def vulnerabilities(self, iterator=None):
         try:
-            result = list(self.tio.exports.vulns())
+            if iterator is None:
+                iterator = self.request_vulnerabilities()
+            stored = self.export('tenable_vulnerabilities', iterator, self.vulnerability_mapper)
+            if self.full_export and self.collector.incremental():
+                # -- only counts as the last full export once the table is written, or later runs would merge into a bad baseline
+                self.collector.set_state_on_write('tenable_vulnerabilities', 'tenable_full_exports', self.full_export_key, self.full_export)
+            return stored
         except Exception as e:
             logging.error(f"Error fetching Tenable vulnerabilities: {e}")
             self.collector.write_blank('tenable_vulnerabilities', self._vulnerabilities({}))
             raise
-        if len(result) == 0:
-            return pd.DataFrame()
-        df = pd.DataFrame([self._vulnerabilities(item) for item in result])
-        self.collector.store_df('tenable_vulnerabilities', df)
-        return df
 
 # == we create the __main__ bit to allow the plugin to be manually run when needed.
 if __name__ == '__main__':
@@ -222,4 +331,5 @@ if __name__ == '__main__':
     sys.path.append("./")
     from collector import Collector
     C = Collector()
-    S = Source(C)
\ No newline at end of file
+    S = Source(C)
+    sys.exit(C.close())
@@ -30,67 +30,31 @@ class Source:
 
     def _authenticate(self) -> None:
         token_url = os.environ['WORKSPACEONE_TOKEN_URL']
-        max_connect_retries = 2
 
-        for attempt in range(max_connect_retries + 1):
-            try:
-                req = requests.post(
-                    token_url,
-                    data={
-                        'grant_type':    'client_credentials',
-                        'client_id':     os.environ['WORKSPACEONE_CLIENTID'],
-                        'client_secret': os.environ['WORKSPACEONE_CLIENTSECRET'],
-                    },
-                    timeout=30,
-                )
-                req.raise_for_status()
-                access_token = req.json()['access_token']
-                self.headers = {
-                    'Authorization': f'Bearer {access_token}',
-                    'Accept':        'application/json;version=3',
-                    'Content-Type':  'application/json',
-                }
-                logging.info('WorkspaceOne authentication succeeded')
-                return
-            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as err:
-                if attempt < max_connect_retries:
-                    logging.warning(f'Auth connection error (attempt {attempt + 1}/{max_connect_retries + 1}). Retrying in 5s: {err}')
-                    time.sleep(5)
-                else:
-                    logging.error(f'WorkspaceOne authentication failed after {max_connect_retries + 1} attempts: {err}')
-                    raise
-            except requests.exceptions.HTTPError as err:
-                logging.error(f'WorkspaceOne authentication failed: {err}')
-                raise
+        try:
+            req = self.collector.http.post(
+                token_url,
+                data={
+                    'grant_type':    'client_credentials',
+                    'client_id':     os.environ['WORKSPACEONE_CLIENTID'],
+                    'client_secret': os.environ['WORKSPACEONE_CLIENTSECRET'],
+                },
+                raise_for_status=True,
+            )
+        except requests.exceptions.RequestException as err:
+            logging.error(f'WorkspaceOne authentication failed: {err}')
+            raise
+
+        access_token = req.json()['access_token']
+        self.headers = {
+            'Authorization': f'Bearer {access_token}',
+            'Accept':        'application/json;version=3',
+            'Content-Type':  'application/json',
+        }
+        logging.info('WorkspaceOne authentication succeeded')
 
     def _make_request(self, url: str, params: dict = None, max_retries: int = 5, max_connect_retries: int = 2) -> requests.Response:
-        retry_delay = 15
-
-        for attempt in range(max_retries):
-            try:
-                req = requests.get(url, headers=self.headers, params=params, timeout=60)
-                req.raise_for_status()
-                return req
-            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as err:
-                if attempt < max_connect_retries:
-                    logging.warning(f'Connection error (attempt {attempt + 1}/{max_connect_retries + 1}). Retrying in 5s: {err}')
-                    time.sleep(5)
-                else:
-                    logging.error(f'Connection failed after {max_connect_retries + 1} attempts for URL: {url}: {err}')
-                    raise
-            except requests.exceptions.HTTPError as err:
-                if err.response.status_code == 429:
-                    if attempt < max_retries - 1:
-                        logging.warning(f'Rate limit hit (429). Retrying in {retry_delay}s (attempt {attempt + 1}/{max_retries}).')
-                        time.sleep(retry_delay)
-                        retry_delay = min(retry_delay * 2, 300)
-                    else:
-                        logging.error(f'Rate limit exceeded after {max_retries} attempts for URL: {url}')
-                        raise
-                else:
-                    raise
-
-        return None
+        return self.collector.http.get(url, headers=self.headers, params=params, timeout=60, retries=max_retries - 1, connect_retries=max_connect_retries, raise_for_status=True)
 
     def _computer(self, item: dict) -> dict:
         id_field = item.get('Id', {})
@@ -182,3 +146,4 @@ if __name__ == '__main__':
     from collector import Collector
     C = Collector()
     S = Source(C)
+    sys.exit(C.close())
@@ -0,0 +1,110 @@
+import os
+import json
+import logging
+import datetime
+import tempfile
+import threading
+import contextlib
+try:
+    import fcntl
+except ImportError:
+    # -- not available on Windows, where only the threads of one process are kept apart
+    fcntl = None
+
+class StateStore:
+    """Small JSON file that keeps the collector's state between runs.
+
+    The state is split in sections (e.g. 'plugins' holds the run time and row count of
+    each plugin).  Every update re-reads the file and writes it back while holding an
+    exclusive lock on a sidecar lock file (<state file>.lock), so collectors running in
+    other threads or processes don't lose each other's changes.
+
+    The file is set with COLLECTOR_STATE_FILE (default collector_state.json).
+    """
+
+    # -- shared by every StateStore in the process, as flock doesn't keep threads of the same process apart
+    _thread_lock = threading.Lock()
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get('COLLECTOR_STATE_FILE', 'collector_state.json')
+        self._lock = threading.Lock()
+        self.data = self._load()
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """Hold the state file for a read-modify-write, against the other threads and processes"""
+        with StateStore._thread_lock:
+            if fcntl is None:
+                yield
+                return
+            folder = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(folder, exist_ok=True)
+            with open(f"{self.path}.lock", 'a') as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logging.warning(f"Unable to read the collector state file {self.path} ({e}) - starting with an empty state")
+            return {}
+
+    def _save(self):
+        # -- write to a temporary file first, so a crash never leaves a half written state file
+        folder = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(folder, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix='.state_', dir=folder)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self.data, f, indent=2, default=str)
+            os.replace(tmp, self.path)
+        except Exception:
+            os.remove(tmp)
+            raise
+
+    def get(self, section, key, default=None):
+        with self._lock:
+            return self.data.get(section, {}).get(key, default)
+
+    def set(self, section, key, value):
+        self.update(section, key, lambda _: value)
+
+    def update(self, section, key, change):
+        """Replace a value with change(current value), using the file's latest content"""
+        with self._lock:
+            try:
+                with self._locked():
+                    self.data = self._load()
+                    values = self.data.setdefault(section, {})
+                    values[key] = change(values.get(key))
+                    self._save()
+            except Exception as e:
+                logging.error(f"Unable to write the collector state file {self.path}: {e}")
+
+    def plugin_stats(self, plugin):
+        '''Run time and row count of a plugin's previous runs'''
+        return self.get('plugins', plugin, {})
+
+    def record_plugin(self, plugin, status, duration, rows):
+        '''Record a plugin run.  Failed runs are kept, but don't count towards the run time EMA'''
+        def change(stats):
+            stats = dict(stats or {})
+            if status != 'FAILED':
+                # -- exponential moving average (weight 1/2) of the run time, kept under 'average' so existing state files still read
+                previous = stats.get('average')
+                stats['average'] = round(duration if previous is None else (previous + duration) / 2, 3)
+            stats.update({
+                'status'    : status,
+                'duration'  : round(duration, 3),
+                'rows'      : rows,
+                'finished'  : datetime.datetime.now(datetime.UTC).isoformat(timespec='seconds'),
+            })
+            return stats
+        self.update('plugins', plugin, change)